@@ -15,6 +15,10 @@ if __name__ == "__main__":
 
         asyncio.run(BatchRunner().run())
     elif mode == "server":
+        from .config import get_env, prepare_metric_dir
+
+        if get_env().worker_count > 0:
+            prepare_metric_dir()  # before .app imports prometheus_client
         from .app import run_server
 
         run_server()
@@ -2,12 +2,11 @@ import asyncio
 import logging
 
 from pyutils import log
-from redis.asyncio import Redis
 
 from .stream_utils import get_live_state, read_conf
 from ..config import get_env
 from ..data.live import LiveStateService
-from ..data.redis import create_redis_pool
+from ..data.redis import RedisPoolRegistry
 from ..recorder import RecorderResolver
 from ..utils import disable_streamlink_log, fetch_my_public_ip
 
@@ -21,7 +20,8 @@ class BatchRunner:
     def __init__(self):
         self.__env = get_env()
         my_public_ip = fetch_my_public_ip()
-        self.__recorder_resolver = RecorderResolver(self.__env, my_public_ip)
+        self.__redis_pools = RedisPoolRegistry(self.__env.redis_master, self.__env.redis_replica, self.__env.redis_data)
+        self.__recorder_resolver = RecorderResolver(self.__env, my_public_ip, self.__redis_pools)
 
     async def run(self):
         log.set_level(logging.DEBUG)
@@ -31,10 +31,7 @@ class BatchRunner:
             raise ValueError("Config path not set")
         conf = read_conf(self.__env.config_path)
 
-        live_service = LiveStateService(
-            master=Redis(connection_pool=create_redis_pool(self.__env.redis_master)),
-            replica=Redis(connection_pool=create_redis_pool(self.__env.redis_replica)),
-        )
+        live_service = LiveStateService(master=self.__redis_pools.master(), replica=self.__redis_pools.replica())
 
         live_state = await get_live_state(
             live_url=conf.url,
@@ -50,13 +47,14 @@ class BatchRunner:
         if self.__env.env == "dev":
             await async_input("Press any key to exit")
             recorder.cancel()
-            if recorder.recording_thread is not None:
-                recorder.recording_thread.join()
+            recorder.join()
 
         while True:
             if recorder.is_done:
-                if recorder.recording_thread is not None:
-                    recorder.recording_thread.join()
+                recorder.join()
                 log.info("Recording done")
                 break
             await asyncio.sleep(1)
+
+        self.__recorder_resolver.close()
+        await self.__redis_pools.close_loop()
@@ -1,3 +1,5 @@
+import asyncio
+
 import aiohttp
 from fastapi import APIRouter, HTTPException, Depends
 from fastapi.security import OAuth2PasswordBearer
@@ -7,7 +9,8 @@ from starlette.responses import Response
 
 from ..common import PlatformType
 from ..data.live import LiveStateService
-from ..recorder import RecordingScheduler
+from ..metric import metric, get_metric_registry
+from ..recorder import RecordingScheduler, RecordingWorkerPool
 from ..utils import HttpRequestError
 
 bearer_scheme = OAuth2PasswordBearer(tokenUrl="token")
@@ -22,7 +25,7 @@ class MainController:
     def __init__(
         self,
         api_token: str,
-        scheduler: RecordingScheduler,
+        scheduler: RecordingScheduler | RecordingWorkerPool,
         live_service: LiveStateService,
     ):
         self.__api_token = api_token
@@ -55,7 +58,8 @@ class MainController:
     def metrics(self, token: str = Depends(bearer_scheme)):
         if token != self.__api_token:
             raise HTTPException(status_code=401, detail="Invalid api token")
-        return Response(content=generate_latest(), media_type="text/plain")
+        metric.refresh_gauges()
+        return Response(content=generate_latest(get_metric_registry()), media_type="text/plain")
 
     async def record(self, record_id: str, token: str = Depends(bearer_scheme)):
         if token != self.__api_token:
@@ -65,7 +69,7 @@ class MainController:
         if state is None:
             raise HTTPException(status_code=404, detail="Not found LiveState")
 
-        for summary in self.__scheduler.get_recorder_summaries():
+        for summary in await asyncio.to_thread(self.__scheduler.get_recorder_summaries):
             if (
                 summary.platform == state.platform
                 and summary.channel_id == state.channel_id
@@ -73,7 +77,7 @@ class MainController:
             ):
                 raise HTTPException(status_code=422, detail="Already recording live")
 
-        self.__scheduler.record(state)
+        await asyncio.to_thread(self.__scheduler.record, state)
         return "ok"
 
     async def cancel(self, record_id: str, token: str = Depends(bearer_scheme)):
@@ -84,7 +88,7 @@ class MainController:
         if state is None:
             raise HTTPException(status_code=404, detail="live state not found")
 
-        self.__scheduler.cancel(state)
+        await asyncio.to_thread(self.__scheduler.cancel, state)
         return "ok"
 
     async def get_status(self, fields: str | None = None, token: str = Depends(bearer_scheme)):
@@ -1,17 +1,19 @@
+import asyncio
 import logging
+from contextlib import asynccontextmanager
 
 import uvicorn
 from fastapi import FastAPI, Request, Response
 from pyutils import log, stacktrace
-from redis.asyncio import Redis
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.responses import JSONResponse
 
 from .server_main_router import MainController
 from ..config import get_env
 from ..data.live import LiveStateService
-from ..data.redis import create_redis_pool
-from ..recorder import RecordingScheduler
+from ..data.redis import RedisPoolRegistry
+from ..metric import is_multiprocess
+from ..recorder import RecordingScheduler, RecordingWorkerPool
 from ..utils import disable_streamlink_log, fetch_my_public_ip
 
 
@@ -40,19 +42,30 @@ def run_server():
     my_public_ip = fetch_my_public_ip()
     log.info(f"Public IP: {my_public_ip}")
 
-    scheduler = RecordingScheduler(env, my_public_ip)
+    redis_pools = RedisPoolRegistry(env.redis_master, env.redis_replica, env.redis_data)
+    scheduler: RecordingScheduler | RecordingWorkerPool
+    if env.worker_count > 0:
+        if not is_multiprocess():
+            raise ValueError("PROMETHEUS_MULTIPROC_DIR must be set before prometheus_client is imported")
+        scheduler = RecordingWorkerPool(env.worker_count, my_public_ip)
+        log.info(f"Started {env.worker_count} recording workers")
+    else:
+        scheduler = RecordingScheduler(env, my_public_ip, redis_pools)
 
-    live_service = LiveStateService(
-        master=Redis(connection_pool=create_redis_pool(env.redis_master)),
-        replica=Redis(connection_pool=create_redis_pool(env.redis_replica)),
-    )
+    live_service = LiveStateService(master=redis_pools.master(), replica=redis_pools.replica())
     main_controller = MainController(
         api_token=env.api_token,
         scheduler=scheduler,
         live_service=live_service,
     )
 
-    app = FastAPI()
+    @asynccontextmanager
+    async def lifespan(_: FastAPI):
+        yield
+        await asyncio.to_thread(scheduler.close)
+        await redis_pools.close_loop()
+
+    app = FastAPI(lifespan=lifespan)
     app.add_middleware(BaseHTTPMiddleware, dispatch=handle_error)
     app.include_router(main_controller.router)
 
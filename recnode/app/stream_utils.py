@@ -12,7 +12,21 @@ from ..utils import StreamLinkSessionArgs, get_streams, AsyncHttpClient, FIREFOX
 
 
 async def get_live_state(live_url: str, fs_name: str, platform_cookie: str | None, stream_params_str: str | None):
-    fetcher = PlatformFetcher(AsyncHttpClient())
+    http = AsyncHttpClient()
+    try:
+        return await _get_live_state(http, live_url, fs_name, platform_cookie, stream_params_str)
+    finally:
+        await http.aclose()
+
+
+async def _get_live_state(
+    http: AsyncHttpClient,
+    live_url: str,
+    fs_name: str,
+    platform_cookie: str | None,
+    stream_params_str: str | None,
+):
+    fetcher = PlatformFetcher(http)
     if "User-Agent" not in fetcher.headers:
         fetcher.headers["User-Agent"] = FIREFOX_USER_AGENT
     if platform_cookie is not None:
@@ -5,6 +5,7 @@ from .config_proxy import ProxyServerConfig, read_proxy_server_config, ProxyConf
 from .config_redis import RedisConfig, RedisDataConfig
 from .config_request import RequestConfig, read_request_config
 from .config_stream import StreamConfig
+from .env_metric import prepare_metric_dir
 from .env_proxy import ProxyEnv, get_proxy_env
 from .env_server import Env, get_env
 
@@ -13,6 +14,7 @@ targets = [
     "config_redis",
     "config_request",
     "config_stream",
+    "env_metric",
     "env_proxy",
     "env_server",
 ]
@@ -1,8 +1,10 @@
 import os
+from typing import Literal
 
 from pydantic import BaseModel, constr, conint, confloat
 
 
+# Redis >= 7 is required (PEXPIRE NX, used by pipelined RedisString.incr)
 class RedisConfig(BaseModel):
     host: constr(min_length=1)
     port: conint(ge=1)
@@ -13,9 +15,15 @@ class RedisConfig(BaseModel):
 
 class RedisDataConfig(BaseModel):
     lock_expire_sec: conint(ge=1)
-    lock_wait_sec: confloat(ge=1)
     live_expire_sec: conint(ge=1)
     seg_expire_sec: conint(ge=1)
+    seg_num_mirror_enabled: bool
+    seg_num_mirror_resync_sec: confloat(gt=0)
+    seg_num_set_type: Literal["zset", "bitmap"]
+    seg_state_storage: Literal["keys", "hash"]
+    seg_state_encoding: Literal["json", "compact"]
+    pool_connection_budget: conint(ge=1) | None
+    pool_wait_timeout_sec: confloat(gt=0)  # wait for a free connection (pool size and budget) before failing
 
 
 def read_redis_master_config():
@@ -41,7 +49,13 @@ def read_redis_replica_config():
 def read_redis_data_config():
     return RedisDataConfig(
         lock_expire_sec=os.getenv("REDIS_LOCK_EXPIRE_SEC"),  # type: ignore
-        lock_wait_sec=os.getenv("REDIS_LOCK_WAIT_SEC"),  # type: ignore
         live_expire_sec=os.getenv("REDIS_LIVE_EXPIRE_SEC"),  # type: ignore
         seg_expire_sec=os.getenv("REDIS_SEG_EXPIRE_SEC"),  # type: ignore
+        seg_num_mirror_enabled=os.getenv("REDIS_SEG_NUM_MIRROR_ENABLED") == "true",
+        seg_num_mirror_resync_sec=os.getenv("REDIS_SEG_NUM_MIRROR_RESYNC_SEC") or 30,  # type: ignore
+        seg_num_set_type=os.getenv("REDIS_SEG_NUM_SET_TYPE") or "zset",  # type: ignore
+        seg_state_storage=os.getenv("REDIS_SEG_STATE_STORAGE") or "keys",  # type: ignore
+        seg_state_encoding=os.getenv("REDIS_SEG_STATE_ENCODING") or "json",  # type: ignore
+        pool_connection_budget=os.getenv("REDIS_POOL_CONNECTION_BUDGET") or None,  # type: ignore
+        pool_wait_timeout_sec=os.getenv("REDIS_POOL_WAIT_TIMEOUT_SEC") or 10,  # type: ignore
     )
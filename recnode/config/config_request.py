@@ -1,4 +1,5 @@
 import os
+from typing import Literal
 
 from pydantic import BaseModel, conint, confloat
 
@@ -11,6 +12,18 @@ class RequestConfig(BaseModel):
     seg_failure_threshold_ratio: conint(ge=0)
     interval_wait_weight_sec: confloat(ge=0)
     interval_min_time_sec: confloat(ge=0)
+    interval_adaptive_platforms: list[Literal["chzzk", "soop", "twitch"]]
+    interval_changed_target_ratio: confloat(gt=0)
+    interval_unchanged_target_ratio: confloat(gt=0)
+    http_pool_max_idle_per_host: conint(ge=0)
+    http_pool_idle_timeout_sec: confloat(ge=0)
+    http_connect_timeout_sec: confloat(gt=0)
+    http_read_timeout_sec: confloat(gt=0)
+    seg_local_retry_limit: conint(ge=0)
+    seg_local_retry_base_delay_sec: confloat(ge=0)
+    seg_local_retry_max_delay_sec: confloat(ge=0)
+    seg_node_concurrency_limit: conint(ge=0)  # 0: unlimited
+    seg_retry_expire_grace_sec: confloat(ge=0)
 
 
 def read_request_config() -> RequestConfig:
@@ -22,4 +35,22 @@ def read_request_config() -> RequestConfig:
         seg_failure_threshold_ratio=os.getenv("SEG_FAILURE_THRESHOLD_RATIO"),  # type: ignore
         interval_wait_weight_sec=os.getenv("INTERVAL_WAIT_WEIGHT_SEC"),  # type: ignore
         interval_min_time_sec=os.getenv("INTERVAL_MIN_TIME_SEC"),  # type: ignore
+        interval_adaptive_platforms=read_list(os.getenv("INTERVAL_ADAPTIVE_PLATFORMS")),  # type: ignore
+        interval_changed_target_ratio=os.getenv("INTERVAL_CHANGED_TARGET_RATIO") or 1.0,  # type: ignore
+        interval_unchanged_target_ratio=os.getenv("INTERVAL_UNCHANGED_TARGET_RATIO") or 0.5,  # type: ignore
+        http_pool_max_idle_per_host=os.getenv("HTTP_POOL_MAX_IDLE_PER_HOST") or 32,  # type: ignore
+        http_pool_idle_timeout_sec=os.getenv("HTTP_POOL_IDLE_TIMEOUT_SEC") or 90,  # type: ignore
+        http_connect_timeout_sec=os.getenv("HTTP_CONNECT_TIMEOUT_SEC") or 3,  # type: ignore
+        http_read_timeout_sec=os.getenv("HTTP_READ_TIMEOUT_SEC") or 5,  # type: ignore
+        seg_local_retry_limit=os.getenv("SEG_LOCAL_RETRY_LIMIT") or 0,  # type: ignore
+        seg_local_retry_base_delay_sec=os.getenv("SEG_LOCAL_RETRY_BASE_DELAY_SEC") or 0.1,  # type: ignore
+        seg_local_retry_max_delay_sec=os.getenv("SEG_LOCAL_RETRY_MAX_DELAY_SEC") or 1.0,  # type: ignore
+        seg_node_concurrency_limit=os.getenv("SEG_NODE_CONCURRENCY_LIMIT") or 0,  # type: ignore
+        seg_retry_expire_grace_sec=os.getenv("SEG_RETRY_EXPIRE_GRACE_SEC") or 0,  # type: ignore
     )
+
+
+def read_list(value: str | None) -> list[str]:  # comma separated
+    if value is None:
+        return []
+    return [elem.strip() for elem in value.split(",") if elem.strip() != ""]
@@ -0,0 +1,17 @@
+import glob
+import os
+import tempfile
+
+from pyutils import log
+
+
+# Must run before prometheus_client is imported: it picks its value class from PROMETHEUS_MULTIPROC_DIR at import time
+def prepare_metric_dir():
+    # workers write metrics to PROMETHEUS_MULTIPROC_DIR; /metrics aggregates them
+    dir_path = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+    if dir_path is None:
+        dir_path = tempfile.mkdtemp(prefix="recnode-metrics-")
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = dir_path
+        log.info("PROMETHEUS_MULTIPROC_DIR is not set, using a temporary directory", {"dir": dir_path})
+    for file_path in glob.glob(os.path.join(dir_path, "*.db")):
+        os.remove(file_path)
@@ -18,6 +18,7 @@ from .config_stream import StreamConfig, read_stream_config
 class Env(BaseModel):
     env: constr(min_length=1)
     port: conint(ge=0)
+    worker_count: conint(ge=0)  # 0: record in the server process
     api_token: constr(min_length=1)
     fs_config_path: constr(min_length=1)
     out_dir_path: constr(min_length=1) | None
@@ -42,6 +43,7 @@ def get_env() -> Env:
     return Env(
         env=env,
         port=os.getenv("SERVER_PORT") or 9083,  # type: ignore
+        worker_count=os.getenv("SERVER_WORKER_COUNT") or 0,  # type: ignore
         api_token=os.getenv("SERVER_API_TOKEN"),  # type: ignore
         fs_config_path=os.getenv("FS_CONFIG_PATH"),
         out_dir_path=os.getenv("OUT_DIR_PATH") or None,
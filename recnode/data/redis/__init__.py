@@ -1,9 +1,13 @@
 import os
 import sys
 
+from .redis_bitmap_set import RedisBitmapSet, BITMAP_SET_LUA
 from .redis_errors import RedisError
+from .redis_hash import RedisHash
 from .redis_lock_pubsub import RedisPubSubLock
 from .redis_lock_spin import RedisSpinLock
+from .redis_pipeline import RedisPipeline
+from .redis_pool_registry import RedisPoolRegistry, count_pool_connections
 from .redis_queue import RedisQueue
 from .redis_sorted_set import RedisSortedSet
 from .redis_string import RedisString
@@ -11,9 +15,13 @@ from .redis_utils import create_redis_pool, get_keys, inc_count
 
 
 targets = [
+    "redis_bitmap_set",
     "redis_errors",
+    "redis_hash",
     "redis_lock_pubsub",
     "redis_lock_spin",
+    "redis_pipeline",
+    "redis_pool_registry",
     "redis_queue",
     "redis_sorted_set",
     "redis_string",
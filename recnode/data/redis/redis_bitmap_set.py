@@ -0,0 +1,166 @@
+from redis.asyncio import Redis
+
+from .redis_utils import redis_metric, is_queued
+
+# Set of non-negative integers stored as a bitmap: bit (num - base) of `key`, base stored in `key:base`.
+# The base is fixed by the first added number (minus a margin, so slightly older numbers still fit).
+BITMAP_BASE_MARGIN = 4096
+
+# Lua helpers shared with other scripts that read or write bitmap sets (num_has / num_add / num_rem)
+# They also access `key:base`, which is derived from the declared key instead of being passed in KEYS,
+# so the scripts require a non-cluster Redis deployment (standalone or master/replica), not Redis Cluster
+BITMAP_SET_LUA = rf"""
+local function num_base(key)
+    local base = redis.call('GET', key .. ':base')
+    if base then
+        return tonumber(base)
+    end
+    return nil
+end
+
+local function num_has(key, num)
+    num = tonumber(num)
+    local base = num_base(key)
+    if not base or num < base then
+        return false
+    end
+    return redis.call('GETBIT', key, num - base) == 1
+end
+
+local function num_add(key, num)
+    num = tonumber(num)
+    local base = num_base(key)
+    if not base then
+        base = math.max(num - {BITMAP_BASE_MARGIN}, 0)
+        redis.call('SET', key .. ':base', base)
+    end
+    if num < base then
+        error('number ' .. num .. ' is below the bitmap base ' .. base)
+    end
+    redis.call('SETBIT', key, num - base, 1)
+end
+
+local function num_rem(key, num)
+    if not num_has(key, num) then
+        return false
+    end
+    redis.call('SETBIT', key, tonumber(num) - num_base(key), 0)
+    return true
+end
+"""
+
+_ADD_SCRIPT = BITMAP_SET_LUA + "num_add(KEYS[1], ARGV[1])\nreturn 1"
+
+_REMOVE_SCRIPT = BITMAP_SET_LUA + "return num_rem(KEYS[1], ARGV[1]) and 1 or 0"
+
+_CONTAINS_SCRIPT = BITMAP_SET_LUA + "return num_has(KEYS[1], ARGV[1]) and 1 or 0"
+
+_RANGE_SCRIPT = (
+    BITMAP_SET_LUA
+    + r"""
+-- ARGV[1] = min num, ARGV[2] = max num ('' for no upper bound)
+local base = num_base(KEYS[1])
+if not base then
+    return {}
+end
+local s = math.max(tonumber(ARGV[1]) - base, 0)
+local e = redis.call('STRLEN', KEYS[1]) * 8 - 1
+if ARGV[2] ~= '' then
+    e = math.min(e, tonumber(ARGV[2]) - base)
+end
+
+local result = {}
+while s <= e do
+    local pos = redis.call('BITPOS', KEYS[1], 1, s, e, 'BIT')
+    if pos < 0 then
+        break
+    end
+    table.insert(result, base + pos)
+    s = pos + 1
+end
+return result
+"""
+)
+
+_HIGHEST_SCRIPT = (
+    BITMAP_SET_LUA
+    + r"""
+local base = num_base(KEYS[1])
+if not base then
+    return false
+end
+for i = redis.call('STRLEN', KEYS[1]) - 1, 0, -1 do
+    local byte = string.byte(redis.call('GETRANGE', KEYS[1], i, i))
+    if byte ~= 0 then
+        local bit = 7
+        while byte % 2 == 0 do
+            byte = byte / 2
+            bit = bit - 1
+        end
+        return base + i * 8 + bit
+    end
+end
+return false
+"""
+)
+
+
+class RedisBitmapSet:
+    # Same interface as the RedisSortedSet methods used for number sets (value == score == the number)
+    def __init__(self, client: Redis):
+        self.__redis = client
+        self.__add = client.register_script(_ADD_SCRIPT)
+        self.__remove = client.register_script(_REMOVE_SCRIPT)
+        self.__contains = client.register_script(_CONTAINS_SCRIPT)
+        self.__range = client.register_script(_RANGE_SCRIPT)
+        self.__highest = client.register_script(_HIGHEST_SCRIPT)
+
+    @redis_metric
+    async def set_pexpire(self, key: str, px_ms: int) -> bool:  # return True if set
+        result = await self.__redis.pexpire(name=key, time=px_ms)
+        await self.__redis.pexpire(name=f"{key}:base", time=px_ms)
+        return result
+
+    @redis_metric
+    async def set(self, key: str, value: str, score: int):  # return added count (== 1)
+        return await self.__add(keys=[key], args=[int(value)])
+
+    @redis_metric
+    async def get_highest(self, key: str) -> str | None:
+        result = await self.__highest(keys=[key])
+        if is_queued(result) or result is None:
+            return None
+        return str(result)
+
+    @redis_metric
+    async def range_by_score(self, key: str, min_score: int, max_score: int) -> list[str]:
+        result = await self.__range(keys=[key], args=[min_score, max_score])
+        if is_queued(result):
+            return result
+        return [str(num) for num in result]
+
+    @redis_metric
+    async def list(self, key: str) -> list[str]:
+        result = await self.__range(keys=[key], args=[0, ""])
+        if is_queued(result):
+            return result
+        return [str(num) for num in result]
+
+    @redis_metric
+    async def contains_by_value(self, key: str, value: str) -> bool:
+        result = await self.__contains(keys=[key], args=[int(value)])
+        if is_queued(result):
+            return result
+        return result == 1
+
+    @redis_metric
+    async def remove_by_value(self, key: str, value: str) -> int:  # return removed count
+        return await self.__remove(keys=[key], args=[int(value)])
+
+    @redis_metric
+    async def size(self, key: str) -> int:
+        return await self.__redis.bitcount(key)
+
+    @redis_metric
+    async def clear(self, key: str) -> int:  # return deleted count
+        return await self.__redis.delete(key, f"{key}:base")
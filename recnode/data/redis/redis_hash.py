@@ -0,0 +1,54 @@
+from redis.asyncio import Redis
+
+from .redis_errors import RedisError
+from .redis_utils import redis_metric, is_queued
+
+
+class RedisHash:
+    def __init__(self, client: Redis):
+        self.__redis = client
+
+    @redis_metric
+    async def set_pexpire(self, key: str, px_ms: int) -> bool:  # return True if set
+        return await self.__redis.pexpire(name=key, time=px_ms)
+
+    @redis_metric
+    async def get_pttl(self, key: str) -> int:  # -2 if the key does not exist, -1 if it has no expiry
+        return await self.__redis.pttl(key)
+
+    @redis_metric
+    async def set(self, key: str, field: str, value: str, nx: bool = False) -> bool:  # return True if set
+        result = await (self.__redis.hsetnx(key, field, value) if nx else self.__redis.hset(key, field, value))
+        if is_queued(result):
+            return result
+        return result == 1 if nx else True
+
+    @redis_metric
+    async def get(self, key: str, field: str) -> str | None:
+        return await self.__redis.hget(key, field)
+
+    @redis_metric
+    async def mget(self, key: str, fields: list[str]) -> list[str | None]:
+        results = await self.__redis.hmget(key, fields)
+        if is_queued(results):
+            return results
+        if not isinstance(results, list):
+            raise RedisError("Expected list data", 500)
+        return results
+
+    @redis_metric
+    async def incr(self, key: str, field: str, amount: int = 1) -> int:
+        result = await self.__redis.hincrby(key, field, amount)
+        if is_queued(result):
+            return result
+        if not isinstance(result, int):
+            raise RedisError("Expected integer data", 500)
+        return result
+
+    @redis_metric
+    async def delete(self, key: str, *fields: str) -> int:  # return deleted field count
+        return await self.__redis.hdel(key, *fields)
+
+    @redis_metric
+    async def clear(self, key: str) -> int:  # return deleted count
+        return await self.__redis.delete(key)
@@ -0,0 +1,73 @@
+import time
+
+from redis.asyncio import Redis
+from redis.asyncio.client import Pipeline
+
+from .redis_bitmap_set import RedisBitmapSet
+from .redis_hash import RedisHash
+from .redis_queue import RedisQueue
+from .redis_sorted_set import RedisSortedSet
+from .redis_string import RedisString
+from ...metric import metric
+
+
+# Batches wrapper calls into one round trip:
+#
+#   async with RedisPipeline(client) as p:
+#       await p.string().set_pexpire(key1, px)
+#       await p.sorted_set().set_pexpire(key2, px)
+#   p.results  # raw command results, in call order
+#
+# Wrapper calls on a pipeline only queue their command, so their return values are meaningless.
+# Commands are flushed when the context exits without an exception (or by an explicit execute()).
+class RedisPipeline:
+    def __init__(self, client: Redis, transaction: bool = False):
+        self.__client = client
+        self.__transaction = transaction
+        self.__pipe: Pipeline | None = None
+        self.results: list = []
+
+    async def __aenter__(self) -> "RedisPipeline":
+        self.__pipe = self.__client.pipeline(transaction=self.__transaction)
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        try:
+            if exc_type is None:
+                await self.execute()
+        finally:
+            await self.__get_pipe().reset()
+            self.__pipe = None
+
+    def string(self) -> RedisString:
+        return RedisString(self.__get_pipe())
+
+    def sorted_set(self) -> RedisSortedSet:
+        return RedisSortedSet(self.__get_pipe())
+
+    def bitmap_set(self) -> RedisBitmapSet:
+        return RedisBitmapSet(self.__get_pipe())
+
+    def hash(self) -> RedisHash:
+        return RedisHash(self.__get_pipe())
+
+    def queue(self) -> RedisQueue:
+        return RedisQueue(self.__get_pipe())
+
+    def size(self) -> int:  # number of queued commands
+        return len(self.__get_pipe())
+
+    async def execute(self) -> list:
+        pipe = self.__get_pipe()
+        cmd_count = len(pipe)
+        if cmd_count == 0:
+            return self.results
+        start = time.perf_counter()
+        self.results = await pipe.execute()
+        metric.set_redis_pipeline(duration=time.perf_counter() - start, cmd_count=cmd_count)
+        return self.results
+
+    def __get_pipe(self) -> Pipeline:
+        if self.__pipe is None:
+            raise ValueError("RedisPipeline is not entered")
+        return self.__pipe
@@ -0,0 +1,197 @@
+import asyncio
+import threading
+
+from redis.asyncio import Redis, ConnectionPool, BlockingConnectionPool
+from redis.exceptions import ConnectionError
+
+from .redis_utils import get_pool_kwargs
+from ...config import RedisConfig, RedisDataConfig
+from ...metric import metric
+
+ROLE_MASTER = "master"
+ROLE_REPLICA = "replica"
+# the budget is shared across loops, whose releases do not wake this loop's waiters, so they also poll
+BUDGET_POLL_INTERVAL_SEC = 0.05
+
+
+class RedisConnectionBudget:
+    # node-wide cap on open Redis connections, shared by every pool (and thread) of the registry
+    def __init__(self, limit: int | None):
+        self.__limit = limit
+        self.__used = 0
+        self.__lock = threading.Lock()
+
+    def acquire(self) -> bool:
+        with self.__lock:
+            if self.__limit is not None and self.__used >= self.__limit:
+                return False
+            self.__used += 1
+            return True
+
+    def release(self, amount: int = 1):
+        with self.__lock:
+            self.__used = max(self.__used - amount, 0)
+
+    def has_room(self) -> bool:
+        return self.__limit is None or self.__used < self.__limit
+
+    def used(self) -> int:
+        return self.__used
+
+
+# Blocking pool of one event loop: a command waits (up to the timeout) for a connection of this pool
+# and for room in the node-wide budget instead of failing right away.
+# The overrides rely on redis-py internals of the pinned version (5.2.1): _condition, _available_connections,
+# _in_use_connections and get_available_connection. Re-check them whenever the redis pin is bumped.
+class BudgetedConnectionPool(BlockingConnectionPool):
+    def __init__(self, budget: RedisConnectionBudget, timeout: float, **kwargs):
+        super().__init__(timeout=timeout, **kwargs)
+        self.__budget = budget
+
+    def can_get_connection(self) -> bool:
+        if len(self._available_connections) > 0:
+            return True
+        return len(self._in_use_connections) < self.max_connections and self.__budget.has_room()
+
+    def make_connection(self):
+        if not self.__budget.acquire():
+            raise ConnectionError("Redis connection budget exhausted")
+        return super().make_connection()
+
+    async def get_connection(self, command_name, *keys, **options):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.timeout
+        async with self._condition:
+            while True:
+                if self.can_get_connection():
+                    try:
+                        connection = self.get_available_connection()
+                        break
+                    except ConnectionError:  # another loop took the last budget slot in between
+                        pass
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    raise ConnectionError("No connection available")
+                try:
+                    await asyncio.wait_for(self._condition.wait(), min(remaining, BUDGET_POLL_INTERVAL_SEC))
+                except asyncio.TimeoutError:
+                    pass
+        try:
+            await self.ensure_connection(connection)
+            return connection
+        except BaseException:
+            await self.release(connection)
+            raise
+
+    def count_in_use(self) -> int:
+        return len(self._in_use_connections)
+
+    def count_available(self) -> int:
+        return len(self._available_connections)
+
+    def discard(self):  # drop every connection without I/O (e.g. its event loop is already closed)
+        created = self.count_in_use() + self.count_available()
+        self.reset()
+        self.__budget.release(created)
+
+    async def close(self):
+        try:
+            await self.disconnect()
+        finally:
+            self.discard()
+
+
+# redis.asyncio pools (their connections and lock) are bound to one event loop,
+# so this pool routes every call to a pool owned by the running loop, created on first use
+class LoopLocalConnectionPool(ConnectionPool):
+    def __init__(self, conf: RedisConfig, budget: RedisConnectionBudget, wait_timeout_sec: float):
+        self.__kwargs = get_pool_kwargs(conf)
+        super().__init__(**self.__kwargs)
+        self.__budget = budget
+        self.__wait_timeout_sec = wait_timeout_sec
+        self.__pools: dict[asyncio.AbstractEventLoop, BudgetedConnectionPool] = {}
+        self.__lock = threading.Lock()
+
+    async def get_connection(self, command_name, *keys, **options):
+        return await self.__get_pool().get_connection(command_name, *keys, **options)
+
+    def get_available_connection(self):
+        return self.__get_pool().get_available_connection()
+
+    def can_get_connection(self) -> bool:
+        return self.__get_pool().can_get_connection()
+
+    async def release(self, connection):
+        await self.__get_pool().release(connection)
+
+    async def disconnect(self, inuse_connections: bool = True):
+        await self.__get_pool().disconnect(inuse_connections)
+
+    async def aclose(self):
+        await self.close_loop()
+
+    async def close_loop(self):  # close the pool of the running loop
+        with self.__lock:
+            pool = self.__pools.pop(asyncio.get_running_loop(), None)
+        if pool is not None:
+            await pool.close()
+
+    def count_in_use(self) -> int:
+        return sum(pool.count_in_use() for pool in self.__live_pools())
+
+    def count_available(self) -> int:
+        return sum(pool.count_available() for pool in self.__live_pools())
+
+    def __get_pool(self) -> BudgetedConnectionPool:
+        loop = asyncio.get_running_loop()
+        pool = self.__pools.get(loop)
+        if pool is not None:
+            return pool
+        with self.__lock:
+            pool = self.__pools.get(loop)
+            if pool is None:
+                self.__discard_closed()
+                pool = BudgetedConnectionPool(self.__budget, self.__wait_timeout_sec, **self.__kwargs)
+                self.__pools[loop] = pool
+            return pool
+
+    def __live_pools(self) -> list[BudgetedConnectionPool]:
+        with self.__lock:
+            self.__discard_closed()
+            return list(self.__pools.values())
+
+    def __discard_closed(self):  # caller holds the lock
+        for loop in [loop for loop in self.__pools if loop.is_closed()]:
+            self.__pools.pop(loop).discard()
+
+
+# Node-wide Redis connection pools: one pool per (event loop, role), all within one connection budget.
+# Clients are cheap and may be created per recording; they share the pools.
+class RedisPoolRegistry:
+    def __init__(self, master_conf: RedisConfig, replica_conf: RedisConfig, data_conf: RedisDataConfig):
+        self.__budget = RedisConnectionBudget(data_conf.pool_connection_budget)
+        self.__pools = {
+            ROLE_MASTER: LoopLocalConnectionPool(master_conf, self.__budget, data_conf.pool_wait_timeout_sec),
+            ROLE_REPLICA: LoopLocalConnectionPool(replica_conf, self.__budget, data_conf.pool_wait_timeout_sec),
+        }
+        for role, pool in self.__pools.items():
+            metric.set_redis_pool_connection_source(role, pool.count_in_use, pool.count_available)
+        metric.set_redis_budget_connection_source(self.used_connections)
+
+    def master(self) -> Redis:
+        return Redis(connection_pool=self.__pools[ROLE_MASTER])
+
+    def replica(self) -> Redis:
+        return Redis(connection_pool=self.__pools[ROLE_REPLICA])
+
+    async def close_loop(self):  # close the pools of the running loop (call before the loop stops)
+        await asyncio.gather(*[pool.close_loop() for pool in self.__pools.values()])
+
+    def used_connections(self) -> int:
+        return self.__budget.used()
+
+
+def count_pool_connections(pool: ConnectionPool) -> tuple[int, int]:  # (in use, available)
+    if isinstance(pool, LoopLocalConnectionPool):
+        return pool.count_in_use(), pool.count_available()
+    return len(pool._in_use_connections), len(pool._available_connections)
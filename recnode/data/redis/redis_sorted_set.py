@@ -3,7 +3,7 @@ from typing import Union, Mapping
 from redis.asyncio import Redis
 
 from .redis_errors import RedisError
-from .redis_utils import redis_metric
+from .redis_utils import redis_metric, is_queued
 
 
 class RedisSortedSet:
@@ -25,6 +25,8 @@ class RedisSortedSet:
     @redis_metric
     async def get_highest(self, key: str) -> str | None:
         lst = await self.__redis.zrevrange(key, 0, 0)
+        if is_queued(lst):
+            return lst
         if len(lst) == 0:
             return None
         return lst[0]
@@ -32,6 +34,8 @@ class RedisSortedSet:
     @redis_metric
     async def get_by_score(self, key: str, score: Union[int, float, str]) -> str | None:
         lst = await self.__redis.zrangebyscore(key, score, score, start=0, num=1)
+        if is_queued(lst):
+            return lst
         if len(lst) == 0:
             return None
         return lst[0]
@@ -52,15 +56,22 @@ class RedisSortedSet:
     @redis_metric
     async def contains_by_value(self, key: str, value: str) -> bool:
         score = await self.__redis.zscore(key, value)
+        if is_queued(score):
+            return score
         return score is not None
 
     @redis_metric
     async def contains_by_score(self, key: str, score: Union[int, float, str]) -> bool:
-        return len(await self.__redis.zrangebyscore(key, score, score, start=0, num=1)) != 0
+        lst = await self.__redis.zrangebyscore(key, score, score, start=0, num=1)
+        if is_queued(lst):
+            return lst
+        return len(lst) != 0
 
     @redis_metric
     async def exists(self, key: str) -> bool:
         result = await self.__redis.exists(key)
+        if is_queued(result):
+            return result
         if not isinstance(result, int):
             raise RedisError("Expected integer data", 500)
         return result == 1
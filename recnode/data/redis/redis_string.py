@@ -1,7 +1,7 @@
 from redis.asyncio import Redis
 
 from .redis_errors import RedisError
-from .redis_utils import redis_metric
+from .redis_utils import redis_metric, is_queued
 
 
 class RedisString:
@@ -12,6 +12,10 @@ class RedisString:
     async def set_pexpire(self, key: str, px_ms: int) -> bool:  # return True if set
         return await self.__redis.pexpire(name=key, time=px_ms)
 
+    @redis_metric
+    async def get_pttl(self, key: str) -> int:  # -2 if the key does not exist, -1 if it has no expiry
+        return await self.__redis.pttl(key)
+
     @redis_metric
     async def set(
         self,
@@ -22,6 +26,8 @@ class RedisString:
         px: int | None = None,
     ) -> bool:  # return True if set
         ok = await self.__redis.set(name=key, value=value, nx=nx, xx=xx, px=px)
+        if is_queued(ok):
+            return ok
         if ok is None:
             return False
         if not isinstance(ok, bool):
@@ -35,6 +41,8 @@ class RedisString:
     @redis_metric
     async def mget(self, keys: list[str]) -> list[str | None]:
         results = await self.__redis.mget(keys=keys)
+        if is_queued(results):
+            return results
         if not isinstance(results, list):
             raise RedisError("Expected list data", 500)
         return results
@@ -45,6 +53,8 @@ class RedisString:
     @redis_metric
     async def exists(self, key: str) -> bool:
         result = await self.__redis.exists(key)
+        if is_queued(result):
+            return result
         if not isinstance(result, int):
             raise RedisError("Expected integer data", 500)
         return result == 1
@@ -52,6 +62,10 @@ class RedisString:
     @redis_metric
     async def incr(self, key: str, amount: int = 1, px: int | None = None) -> int:
         result = await self.__redis.incr(name=key, amount=amount)
+        if is_queued(result):
+            if px is not None:  # the count is unknown until the flush, so expire only if no TTL is set yet (Redis >= 7)
+                await self.__redis.pexpire(name=key, time=px, nx=True)
+            return result
         if not isinstance(result, int):
             raise RedisError("Expected integer data", 500)
         if px is not None and result == 1:
@@ -2,32 +2,29 @@ import functools
 import time
 
 from redis.asyncio import Redis, ConnectionPool, SSLConnection
+from redis.asyncio.client import Pipeline
 
 from ...config import RedisConfig
 from ...metric import metric
 
 
 def create_redis_pool(conf: RedisConfig) -> ConnectionPool:
+    return ConnectionPool(**get_pool_kwargs(conf))
+
+
+def get_pool_kwargs(conf: RedisConfig) -> dict:
+    kwargs = dict(
+        host=conf.host,
+        port=conf.port,
+        password=conf.password,
+        db=0,
+        decode_responses=True,
+        max_connections=conf.pool_size_limit,
+    )
     if conf.ca_path is not None:
-        return ConnectionPool(
-            host=conf.host,
-            port=conf.port,
-            password=conf.password,
-            db=0,
-            decode_responses=True,
-            max_connections=conf.pool_size_limit,
-            connection_class=SSLConnection,
-            ssl_ca_certs=conf.ca_path,
-        )
-    else:
-        return ConnectionPool(
-            host=conf.host,
-            port=conf.port,
-            password=conf.password,
-            db=0,
-            decode_responses=True,
-            max_connections=conf.pool_size_limit,
-        )
+        kwargs["connection_class"] = SSLConnection
+        kwargs["ssl_ca_certs"] = conf.ca_path
+    return kwargs
 
 
 def create_redis_client(conf: RedisConfig) -> Redis:
@@ -67,6 +64,8 @@ def redis_metric(func):
     async def wrapper(*args, **kwargs):
         start = time.perf_counter()
         result = await func(*args, **kwargs)
+        if is_queued(result):  # measured once per pipeline (see RedisPipeline)
+            return result
         duration = time.perf_counter() - start
         metric.set_redis_request_duration(duration=duration)
         return result
@@ -74,6 +73,10 @@ def redis_metric(func):
     return wrapper
 
 
+def is_queued(result) -> bool:  # True if the command was only queued on a pipeline
+    return isinstance(result, Pipeline)
+
+
 def inc_count(use_master: bool, amount: float = 1):
     if use_master:
         metric.inc_redis_master_request_count(amount=amount)
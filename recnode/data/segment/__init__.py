@@ -1,14 +1,23 @@
 import os
 import sys
 
-from .seg_num_set import SegmentNumberSet
-from .seg_state_service import SegmentStateService, SegmentState
+from .seg_num_mirror import SegmentNumberMirror, SegmentNumberMirrorHub
+from .seg_num_set import SegmentNumberSet, SegmentNumberSetType
+from .seg_state import SegmentState
+from .seg_state_codec import SegmentStateCodec, SegmentStateEncoding
+from .seg_state_store import SegmentStateStorage
+from .seg_state_service import SegmentStateService, SegmentLock, SegmentFailureState
 from .seg_state_validator import SegmentStateValidator, SegmentInspect, ok, no, critical
 
 
 targets = [
+    "seg_num_mirror",
     "seg_num_set",
+    "seg_scripts",
+    "seg_state",
+    "seg_state_codec",
     "seg_state_service",
+    "seg_state_store",
     "seg_state_validator",
 ]
 if os.getenv("PY_ENV") != "prod":
@@ -0,0 +1,255 @@
+import asyncio
+import bisect
+import threading
+from typing import Awaitable, Callable
+
+from pyutils import log, error_dict
+from redis.asyncio import Redis
+
+from ..redis import RedisPoolRegistry
+
+RECONNECT_DELAY_SEC = 1
+STOP_TIMEOUT_SEC = 10
+
+OP_ADD = "add"
+OP_REMOVE = "rem"
+OP_CLEAR = "clr"
+
+EVENTS_CHANNEL_PATTERN = "live:*:segments:events"
+
+
+def get_events_channel(live_record_id: str) -> str:
+    return f"live:{live_record_id}:segments:events"
+
+
+def to_event(op: str, key: str, num: int | None = None) -> str:
+    return f"{op} {key}" if num is None else f"{op} {key} {num}"
+
+
+# written by the hub thread, read by the recording loops
+class SortedNumSet:
+    def __init__(self, nums: list[int] | None = None):
+        self.__nums: list[int] = []
+        self.__members: set[int] = set()
+        self.__lock = threading.Lock()
+        if nums is not None:
+            self.replace(nums)
+
+    def replace(self, nums: list[int]):
+        members = set(nums)
+        sorted_nums = sorted(members)
+        with self.__lock:
+            self.__members = members
+            self.__nums = sorted_nums
+
+    def add(self, num: int):
+        with self.__lock:
+            if num in self.__members:
+                return
+            self.__members.add(num)
+            bisect.insort(self.__nums, num)
+
+    def remove(self, num: int):
+        with self.__lock:
+            if num not in self.__members:
+                return
+            self.__members.remove(num)
+            self.__nums.pop(bisect.bisect_left(self.__nums, num))
+
+    def clear(self):
+        self.replace([])
+
+    def contains(self, num: int) -> bool:
+        with self.__lock:
+            return num in self.__members
+
+    def highest(self) -> int | None:
+        with self.__lock:
+            if len(self.__nums) == 0:
+                return None
+            return self.__nums[-1]
+
+    def range(self, start: int, end: int) -> list[int]:
+        with self.__lock:
+            return self.__nums[bisect.bisect_left(self.__nums, start) : bisect.bisect_right(self.__nums, end)]
+
+    def all(self) -> list[int]:
+        with self.__lock:
+            return list(self.__nums)
+
+    def size(self) -> int:
+        with self.__lock:
+            return len(self.__nums)
+
+
+# Node-local copy of the segment number sets of a recording, kept up to date by the node-wide hub.
+# Writers publish every change to the events channel; a periodic full resync from the replica covers lost messages.
+class SegmentNumberMirror:
+    def __init__(self, hub: "SegmentNumberMirrorHub", live_record_id: str, attr: dict):
+        self.__hub = hub
+        self.channel = get_events_channel(live_record_id)
+        self.attr = attr
+        self.__sets: dict[str, SortedNumSet] = {}
+        self.__loaders: dict[str, Callable[[Redis], Awaitable[list[int]]]] = {}
+        self.ready = False
+
+    # loader: full read of the set with the given replica client (it runs on the hub loop)
+    def track(self, key: str, loader: Callable[[Redis], Awaitable[list[int]]]):
+        self.__sets.setdefault(key, SortedNumSet())
+        self.__loaders[key] = loader
+
+    def get(self, key: str) -> SortedNumSet | None:  # None until the first resync completes
+        if not self.ready:
+            return None
+        return self.__sets.get(key)
+
+    def start(self):
+        self.__hub.register(self)
+
+    async def stop(self):
+        self.ready = False
+        self.__hub.unregister(self)
+
+    async def resync(self, replica: Redis):
+        keys = list(self.__sets.keys())
+        results = await asyncio.gather(*[self.__loaders[key](replica) for key in keys])
+        for key, nums in zip(keys, results):
+            self.__sets[key].replace(nums)
+        self.ready = True
+
+    def apply(self, data: str):
+        parts = data.split(" ")
+        nums = self.__sets.get(parts[1]) if len(parts) > 1 else None
+        if nums is None:
+            return
+        if parts[0] == OP_ADD:
+            nums.add(int(parts[2]))
+        elif parts[0] == OP_REMOVE:
+            nums.remove(int(parts[2]))
+        elif parts[0] == OP_CLEAR:
+            nums.clear()
+
+
+# One pattern subscription for the mirrors of every recording on the node, run on its own thread and event loop.
+# Its replica connections come from the pool registry, so they count against the node connection budget.
+class SegmentNumberMirrorHub:
+    def __init__(self, redis_pools: RedisPoolRegistry, resync_sec: float):
+        self.__redis_pools = redis_pools
+        self.__resync_sec = resync_sec
+        self.__mirrors: dict[str, SegmentNumberMirror] = {}  # events channel -> mirror
+        self.__lock = threading.Lock()
+        self.__loop: asyncio.AbstractEventLoop | None = None
+        self.__thread: threading.Thread | None = None
+        self.__task: asyncio.Task | None = None
+        self.__replica: Redis | None = None
+
+    def register(self, mirror: SegmentNumberMirror):
+        with self.__lock:
+            self.__mirrors[mirror.channel] = mirror
+            loop = self.__start()
+        loop.call_soon_threadsafe(self.__schedule_resync, mirror)
+
+    def unregister(self, mirror: SegmentNumberMirror):
+        with self.__lock:
+            if self.__mirrors.get(mirror.channel) is mirror:
+                del self.__mirrors[mirror.channel]
+
+    def stop(self):
+        with self.__lock:
+            loop, thread = self.__loop, self.__thread
+            self.__loop, self.__thread = None, None
+        if loop is None or thread is None:
+            return
+        future = asyncio.run_coroutine_threadsafe(self.__shutdown(), loop)
+        try:
+            future.result(timeout=STOP_TIMEOUT_SEC)
+        except Exception as ex:
+            log.error("Failed to stop segment mirror hub", error_dict(ex))
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout=STOP_TIMEOUT_SEC)
+
+    def __start(self) -> asyncio.AbstractEventLoop:  # caller holds the lock
+        if self.__loop is not None:
+            return self.__loop
+        loop = asyncio.new_event_loop()
+        self.__loop = loop
+        self.__thread = threading.Thread(target=self.__run_loop, args=(loop,), name="seg-mirror-hub", daemon=True)
+        self.__thread.start()
+        return loop
+
+    def __run_loop(self, loop: asyncio.AbstractEventLoop):
+        asyncio.set_event_loop(loop)
+        self.__replica = self.__redis_pools.replica()
+        self.__task = loop.create_task(self.__run(), name="seg-mirror-hub")
+        try:
+            loop.run_forever()
+        finally:
+            loop.close()
+
+    async def __shutdown(self):
+        if self.__task is not None:
+            self.__task.cancel()
+            try:
+                await self.__task
+            except asyncio.CancelledError:
+                pass
+        await self.__redis_pools.close_loop()
+
+    async def __run(self):
+        while True:
+            try:
+                await self.__subscribe()
+            except asyncio.CancelledError:
+                raise
+            except Exception as ex:
+                for mirror in self.__list_mirrors():
+                    mirror.ready = False
+                log.error("Segment mirror hub disconnected", error_dict(ex))
+                await asyncio.sleep(RECONNECT_DELAY_SEC)
+
+    async def __subscribe(self):
+        loop = asyncio.get_running_loop()
+        pubsub = self.__get_replica().pubsub(ignore_subscribe_messages=True)
+        try:
+            # subscribe before the first resync so that no change between the two is missed
+            await pubsub.psubscribe(EVENTS_CHANNEL_PATTERN)
+            await self.__resync_all()
+            next_resync = loop.time() + self.__resync_sec
+            while True:
+                timeout = max(next_resync - loop.time(), 0)
+                msg = await pubsub.get_message(ignore_subscribe_messages=True, timeout=timeout)
+                if msg is not None:
+                    with self.__lock:
+                        mirror = self.__mirrors.get(msg["channel"])
+                    if mirror is not None:
+                        mirror.apply(msg["data"])
+                if loop.time() >= next_resync:
+                    await self.__resync_all()
+                    next_resync = loop.time() + self.__resync_sec
+        finally:
+            await pubsub.aclose()
+
+    def __schedule_resync(self, mirror: SegmentNumberMirror):
+        asyncio.create_task(self.__resync(mirror), name=f"seg-mirror-resync:{mirror.channel}")
+
+    async def __resync_all(self):
+        await asyncio.gather(*[self.__resync(mirror) for mirror in self.__list_mirrors()])
+
+    async def __resync(self, mirror: SegmentNumberMirror):
+        try:
+            await mirror.resync(self.__get_replica())
+        except Exception as ex:
+            mirror.ready = False
+            attr = mirror.attr.copy()
+            for k, v in error_dict(ex).items():
+                attr[k] = v
+            log.error("Segment mirror resync failed", attr)
+
+    def __list_mirrors(self) -> list[SegmentNumberMirror]:
+        with self.__lock:
+            return list(self.__mirrors.values())
+
+    def __get_replica(self) -> Redis:
+        if self.__replica is None:
+            raise ValueError("Segment mirror hub is not started")
+        return self.__replica
@@ -1,15 +1,20 @@
 import asyncio
+from enum import Enum
 
 from pyutils import log, error_dict
 from redis.asyncio import Redis
-from redis.asyncio.lock import Lock
 
-from ..redis import RedisSortedSet, inc_count
+from .seg_num_mirror import SegmentNumberMirror, OP_ADD, OP_REMOVE, OP_CLEAR, get_events_channel, to_event
+from ..redis import RedisBitmapSet, RedisSortedSet, inc_count
 
-LOCK_RETRY_INTERVAL_SEC = 0.1
 RENEW_THRESHOLD_MS = 60 * 1000  # 1 minute
 
 
+class SegmentNumberSetType(Enum):
+    ZSET = "zset"
+    BITMAP = "bitmap"  # compact encoding for dense number ranges (see RedisBitmapSet)
+
+
 class SegmentNumberSet:
     def __init__(
         self,
@@ -18,20 +23,29 @@ class SegmentNumberSet:
         live_record_id: str,
         key_suffix: str,
         seg_expire_sec: float,
-        lock_expire_sec: float,
-        lock_wait_timeout_sec: float,
         attr: dict,
+        mirror: SegmentNumberMirror | None = None,
+        set_type: SegmentNumberSetType = SegmentNumberSetType.ZSET,
     ):
         self.__master = master
         self.__replica = replica
-        self.__sorted_set_master = RedisSortedSet(self.__master)
-        self.__sorted_set_replica = RedisSortedSet(self.__replica)
+        self.set_type = set_type
+        self.__set_master = create_num_set(self.__master, set_type)
+        self.__set_replica = create_num_set(self.__replica, set_type)
         self.__live_record_id = live_record_id
         self.__key_suffix = key_suffix
         self.__seg_expire_ms = int(seg_expire_sec * 1000)
-        self.__lock_expire_sec = lock_expire_sec
-        self.__lock_wait_timeout_sec = lock_wait_timeout_sec
         self.__attr = attr
+        # with a mirror, changes are published and replica reads are answered from local memory
+        self.__mirror = mirror
+        if mirror is not None:
+            mirror.track(self.__get_key(), self.__load_mirror)
+
+    @property
+    def events_channel(self) -> str | None:
+        if self.__mirror is None:
+            return None
+        return get_events_channel(self.__live_record_id)
 
     async def renew(self):
         key = self.__get_key()
@@ -43,30 +57,45 @@ class SegmentNumberSet:
         start_time = asyncio.get_event_loop().time()
         inc_count(use_master=True)
         try:
-            await self.__sorted_set_master.set_pexpire(key, self.__seg_expire_ms)
+            await self.__set_master.set_pexpire(key, self.__seg_expire_ms)
         except Exception as ex:
             extra = {"duration": asyncio.get_event_loop().time() - start_time}
             log.error("Renew failed", self.__error_attr(ex, extra))
 
     async def set_num(self, num: int):
         inc_count(use_master=True)
-        await self.__sorted_set_master.set(self.__get_key(), str(num), num)
+        await self.__set_master.set(self.__get_key(), str(num), num)
+        await self.__publish(OP_ADD, num)
 
     async def all(self, use_master: bool) -> list[int]:
+        if not use_master and (local := self.__local()) is not None:
+            return local.all()
+        return await self.__load(use_master)
+
+    async def __load_mirror(self, replica: Redis) -> list[int]:  # runs on the mirror hub loop with its own client
+        inc_count(use_master=False)
+        result = await create_num_set(replica, self.set_type).list(self.__get_key())
+        return [int(i) for i in result]
+
+    async def __load(self, use_master: bool) -> list[int]:
         inc_count(use_master=use_master)
-        result = await self.__get_sorted_set(use_master).list(self.__get_key())
+        result = await self.__get_set(use_master).list(self.__get_key())
         return [int(i) for i in result]
 
     async def get_highest(self, use_master: bool) -> int | None:
+        if not use_master and (local := self.__local()) is not None:
+            return local.highest()
         inc_count(use_master=use_master)
-        result = await self.__get_sorted_set(use_master).get_highest(self.__get_key())
+        result = await self.__get_set(use_master).get_highest(self.__get_key())
         if result is None:
             return None
         return int(result)
 
     async def range(self, start: int, end: int, use_master: bool) -> list[int]:
+        if not use_master and (local := self.__local()) is not None:
+            return local.range(start, end)
         inc_count(use_master=use_master)
-        result = await self.__get_sorted_set(use_master).range_by_score(self.__get_key(), start, end)
+        result = await self.__get_set(use_master).range_by_score(self.__get_key(), start, end)
         return [int(i) for i in result]
 
     async def remove(self, num: int, check_replica: bool = True):
@@ -76,34 +105,51 @@ class SegmentNumberSet:
                 return
         inc_count(use_master=False)
         # If replica check is performed, data might not be deleted
-        await self.__sorted_set_master.remove_by_value(self.__get_key(), str(num))
+        await self.__set_master.remove_by_value(self.__get_key(), str(num))
+        await self.__publish(OP_REMOVE, num)
 
     async def contains(self, num: int, use_master: bool) -> bool:
+        if not use_master and (local := self.__local()) is not None:
+            return local.contains(num)
         inc_count(use_master=use_master)
-        return await self.__get_sorted_set(use_master).contains_by_value(self.__get_key(), str(num))
+        return await self.__get_set(use_master).contains_by_value(self.__get_key(), str(num))
 
     async def size(self, use_master: bool) -> int:
+        if not use_master and (local := self.__local()) is not None:
+            return local.size()
         inc_count(use_master=use_master)
-        return await self.__get_sorted_set(use_master).size(self.__get_key())
+        return await self.__get_set(use_master).size(self.__get_key())
 
     async def clear(self):
         inc_count(use_master=True)
-        await self.__sorted_set_master.clear(self.__get_key())
-
-    def lock(self) -> Lock:
-        inc_count(use_master=True, amount=2)
-        return Lock(
-            redis=self.__master,
-            name=f"{self.__get_key()}:lock",
-            sleep=LOCK_RETRY_INTERVAL_SEC,
-            timeout=self.__lock_expire_sec,
-            blocking=True,
-            blocking_timeout=self.__lock_wait_timeout_sec,
-        )
+        await self.__set_master.clear(self.__get_key())
+        await self.__publish(OP_CLEAR)
+
+    @property
+    def key(self) -> str:
+        return self.__get_key()
+
+    @property
+    def renew_keys(self) -> list[str]:  # every Redis key backing this set
+        if self.set_type == SegmentNumberSetType.BITMAP:
+            return [self.__get_key(), f"{self.__get_key()}:base"]
+        return [self.__get_key()]
 
     def __get_key(self):
         return f"live:{self.__live_record_id}:segments:{self.__key_suffix}"
 
+    def __local(self):
+        if self.__mirror is None:
+            return None
+        return self.__mirror.get(self.__get_key())
+
+    async def __publish(self, op: str, num: int | None = None):
+        channel = self.events_channel
+        if channel is None:
+            return
+        inc_count(use_master=True)
+        await self.__master.publish(channel, to_event(op, self.__get_key(), num))
+
     def __error_attr(self, ex: Exception, extra: dict | None = None):
         attr = self.__attr.copy()
         for k, v in error_dict(ex).items():
@@ -113,5 +159,11 @@ class SegmentNumberSet:
                 attr[k] = v
         return attr
 
-    def __get_sorted_set(self, use_master: bool) -> RedisSortedSet:
-        return self.__sorted_set_master if use_master else self.__sorted_set_replica
+    def __get_set(self, use_master: bool) -> RedisSortedSet | RedisBitmapSet:
+        return self.__set_master if use_master else self.__set_replica
+
+
+def create_num_set(client: Redis, set_type: SegmentNumberSetType) -> RedisSortedSet | RedisBitmapSet:
+    if set_type == SegmentNumberSetType.BITMAP:
+        return RedisBitmapSet(client)
+    return RedisSortedSet(client)
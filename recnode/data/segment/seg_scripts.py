@@ -0,0 +1,159 @@
+from .seg_num_set import SegmentNumberSetType
+from .seg_state_store import SegmentStateStorage, get_state_lua
+from ..redis import BITMAP_SET_LUA
+
+# Lua scripts for segment state transitions (each runs as a single round trip on the master)
+# Number sets are accessed through num_has / num_add / num_rem, defined by the prelude of the set type (with_num_set)
+# Segment states and retry counts are accessed through state_set / retry_get / retry_incr / retry_del,
+# defined by the prelude of the state storage (with_state_storage); KEYS[1] is the state store key of the segment
+# Number set changes are published to the events channel (see seg_num_mirror) unless the channel is ''
+# Some keys are derived inside the preludes and not declared in KEYS (`key:base` of bitmap sets, `key:retry` of the
+# key storage), so the scripts require a non-cluster Redis deployment
+
+ZSET_SET_LUA = r"""
+local function num_has(key, num)
+    return redis.call('ZSCORE', key, num) ~= false
+end
+
+local function num_add(key, num)
+    redis.call('ZADD', key, num, num)
+end
+
+local function num_rem(key, num)
+    return redis.call('ZREM', key, num) == 1
+end
+"""
+
+# Segment locks are a counting semaphore: a ZSET of lease tokens scored by their expiry time (ms).
+# Returns {code, held leases}: code >= 0 is the acquired lease index, otherwise
+#   -1: already handled (in one of the skip sets), -2: all leases are taken, -3: segment state already exists
+ACQUIRE_SCRIPT = r"""
+-- KEYS[1] = state store key, KEYS[2] = lease set, KEYS[3..n] = segment number sets to skip
+-- ARGV[1] = seg num, ARGV[2] = lease token, ARGV[3] = lease expire ms, ARGV[4] = parallel limit
+-- ARGV[5] = segment state to SET NX ('' to skip), ARGV[6] = segment expire ms
+for i = 3, #KEYS do
+    if num_has(KEYS[i], ARGV[1]) then
+        return {-1, 0}
+    end
+end
+
+local time = redis.call('TIME')
+local now_ms = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', now_ms)
+local held = redis.call('ZCARD', KEYS[2])
+if held >= tonumber(ARGV[4]) then
+    return {-2, held}
+end
+
+if ARGV[5] ~= '' then
+    if not state_set(KEYS[1], ARGV[1], ARGV[5], ARGV[6], true) then
+        return {-3, held}
+    end
+end
+
+redis.call('ZADD', KEYS[2], now_ms + tonumber(ARGV[3]), ARGV[2])
+redis.call('PEXPIRE', KEYS[2], ARGV[3])
+return {held, held + 1}
+"""
+
+# Returns the retry count of the segment before it was cleared, or -1 if it was already committed
+COMMIT_SUCCESS_SCRIPT = r"""
+-- KEYS[1] = state store key, KEYS[2] = success set, KEYS[3] = retrying set, KEYS[4] = failed set
+-- ARGV[1] = seg num, ARGV[2] = segment state, ARGV[3] = segment expire ms, ARGV[4] = events channel
+if num_has(KEYS[2], ARGV[1]) then
+    return -1
+end
+
+local retry_count = retry_get(KEYS[1], ARGV[1])
+num_add(KEYS[2], ARGV[1])
+state_set(KEYS[1], ARGV[1], ARGV[2], ARGV[3], false)
+retry_del(KEYS[1], ARGV[1])
+local removed_retrying = num_rem(KEYS[3], ARGV[1])
+local removed_failed = num_rem(KEYS[4], ARGV[1])
+if ARGV[4] ~= '' then
+    redis.call('PUBLISH', ARGV[4], 'add ' .. KEYS[2] .. ' ' .. ARGV[1])
+    if removed_retrying then
+        redis.call('PUBLISH', ARGV[4], 'rem ' .. KEYS[3] .. ' ' .. ARGV[1])
+    end
+    if removed_failed then
+        redis.call('PUBLISH', ARGV[4], 'rem ' .. KEYS[4] .. ' ' .. ARGV[1])
+    end
+end
+return retry_count
+"""
+
+# Returns {state, retry count}: state 0 = already succeeded, 1 = retrying, 2 = failed (retries exhausted)
+RECORD_FAILURE_SCRIPT = r"""
+-- KEYS[1] = state store key, KEYS[2] = success set, KEYS[3] = retrying set, KEYS[4] = failed set
+-- ARGV[1] = seg num, ARGV[2] = retrying segment state ('' if the segment was already retrying)
+-- ARGV[3] = failure threshold, ARGV[4] = segment expire ms, ARGV[5] = events channel
+if num_has(KEYS[2], ARGV[1]) then
+    return {0, 0}
+end
+
+if ARGV[2] ~= '' then
+    num_add(KEYS[3], ARGV[1])
+    state_set(KEYS[1], ARGV[1], ARGV[2], ARGV[4], false)
+    if ARGV[5] ~= '' then
+        redis.call('PUBLISH', ARGV[5], 'add ' .. KEYS[3] .. ' ' .. ARGV[1])
+    end
+    return {1, 0}
+end
+
+local retry_count = retry_incr(KEYS[1], ARGV[1], ARGV[4])
+if retry_count < tonumber(ARGV[3]) then
+    return {1, retry_count}
+end
+
+num_add(KEYS[4], ARGV[1])
+num_rem(KEYS[3], ARGV[1])
+retry_del(KEYS[1], ARGV[1])
+if ARGV[5] ~= '' then
+    redis.call('PUBLISH', ARGV[5], 'add ' .. KEYS[4] .. ' ' .. ARGV[1])
+    redis.call('PUBLISH', ARGV[5], 'rem ' .. KEYS[3] .. ' ' .. ARGV[1])
+end
+return {2, retry_count}
+"""
+
+# Moves a retrying segment that left the playlist window to the failed set, without counting another retry.
+# Returns its retry count, or -1 if it was not retrying (already committed, failed or abandoned).
+ABANDON_SCRIPT = r"""
+-- KEYS[1] = state store key, KEYS[2] = retrying set, KEYS[3] = failed set
+-- ARGV[1] = seg num, ARGV[2] = events channel
+if not num_has(KEYS[2], ARGV[1]) then
+    return -1
+end
+
+local retry_count = retry_get(KEYS[1], ARGV[1])
+num_add(KEYS[3], ARGV[1])
+num_rem(KEYS[2], ARGV[1])
+retry_del(KEYS[1], ARGV[1])
+if ARGV[2] ~= '' then
+    redis.call('PUBLISH', ARGV[2], 'add ' .. KEYS[3] .. ' ' .. ARGV[1])
+    redis.call('PUBLISH', ARGV[2], 'rem ' .. KEYS[2] .. ' ' .. ARGV[1])
+end
+return retry_count
+"""
+
+# Extends the TTL of every given key that expires within the threshold (one round trip for all per-recording keys)
+RENEW_SCRIPT = r"""
+-- KEYS = keys to renew, ARGV[1] = expire ms, ARGV[2] = renew threshold ms
+local renewed = 0
+for i = 1, #KEYS do
+    local ttl = redis.call('PTTL', KEYS[i])
+    if ttl ~= -2 and ttl <= tonumber(ARGV[2]) then
+        redis.call('PEXPIRE', KEYS[i], ARGV[1])
+        renewed = renewed + 1
+    end
+end
+return renewed
+"""
+
+
+def with_num_set(script: str, set_type: SegmentNumberSetType) -> str:
+    prelude = BITMAP_SET_LUA if set_type == SegmentNumberSetType.BITMAP else ZSET_SET_LUA
+    return prelude + script
+
+
+def with_state_storage(script: str, storage: SegmentStateStorage) -> str:
+    return get_state_lua(storage) + script
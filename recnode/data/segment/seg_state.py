@@ -0,0 +1,31 @@
+from datetime import datetime
+
+from pydantic import BaseModel, Field
+
+INIT_PARALLEL_LIMIT = 1
+
+
+class SegmentState(BaseModel):
+    num: int
+    url: str
+    duration: float
+    size: int | None = Field(default=None)
+    parallel_limit: int
+    is_retrying: bool = Field(default=False)
+    created_at: datetime
+    updated_at: datetime
+
+    def to_dict(self):
+        return self.model_dump(mode="json", by_alias=True)
+
+    @staticmethod
+    def new(url: str, num: int, duration: float, now: datetime, size: int | None = None) -> "SegmentState":
+        return SegmentState(
+            url=url,
+            num=num,
+            duration=duration,
+            size=size,
+            parallel_limit=INIT_PARALLEL_LIMIT,
+            created_at=now,
+            updated_at=now,
+        )
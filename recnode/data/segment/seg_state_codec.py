@@ -0,0 +1,82 @@
+import json
+from datetime import datetime
+from enum import Enum
+
+from .seg_state import SegmentState
+
+# Compact text encoding of SegmentState (Redis clients use decode_responses=True, so values stay str):
+#   {version}|{duration}|{size}|{parallel_limit}|{is_retrying}|{created_at ms}|{updated_at ms}|{url}
+# - num is not stored: it is part of the key (or hash field) the value is read from
+# - url is last so it may contain the separator; "~" + suffix of the recording URL prefix, or "=" + full URL
+# Readers accept every version (and legacy JSON), so the writer encoding is switched only after all nodes can read it.
+COMPACT_VERSION = "1"
+SEPARATOR = "|"
+FIELD_COUNT = 8
+URL_SUFFIX_MARK = "~"
+URL_FULL_MARK = "="
+
+
+class SegmentStateEncoding(Enum):
+    JSON = "json"
+    COMPACT = "compact"
+
+
+class SegmentStateCodec:
+    def __init__(self, encoding: SegmentStateEncoding = SegmentStateEncoding.JSON, url_prefix: str | None = None):
+        self.__encoding = encoding
+        self.__url_prefix = url_prefix  # e.g. the stream base URL of the recording, known to every node
+
+    def encode(self, state: SegmentState) -> str:
+        if self.__encoding == SegmentStateEncoding.JSON:
+            return state.model_dump_json(by_alias=True)
+        size = "" if state.size is None else str(state.size)
+        fields = [
+            COMPACT_VERSION,
+            repr(state.duration),
+            size,
+            str(state.parallel_limit),
+            "1" if state.is_retrying else "0",
+            str(to_ms(state.created_at)),
+            str(to_ms(state.updated_at)),
+            self.__encode_url(state.url),
+        ]
+        return SEPARATOR.join(fields)
+
+    def decode(self, txt: str, num: int) -> SegmentState:
+        if txt.startswith("{"):
+            return SegmentState(**json.loads(txt))
+
+        fields = txt.split(SEPARATOR, FIELD_COUNT - 1)
+        if fields[0] != COMPACT_VERSION or len(fields) != FIELD_COUNT:
+            raise ValueError(f"Unsupported segment state encoding: {txt[:16]}")
+        # fields were validated when encoded, so skip pydantic validation
+        return SegmentState.model_construct(
+            num=num,
+            url=self.__decode_url(fields[7]),
+            duration=float(fields[1]),
+            size=None if fields[2] == "" else int(fields[2]),
+            parallel_limit=int(fields[3]),
+            is_retrying=fields[4] == "1",
+            created_at=from_ms(int(fields[5])),
+            updated_at=from_ms(int(fields[6])),
+        )
+
+    def __encode_url(self, url: str) -> str:
+        if self.__url_prefix is not None and url.startswith(self.__url_prefix):
+            return URL_SUFFIX_MARK + url[len(self.__url_prefix) :]
+        return URL_FULL_MARK + url
+
+    def __decode_url(self, value: str) -> str:
+        if value.startswith(URL_SUFFIX_MARK):
+            if self.__url_prefix is None:
+                raise ValueError("Segment state URL is relative, but no URL prefix is configured")
+            return self.__url_prefix + value[1:]
+        return value[1:]
+
+
+def to_ms(dt: datetime) -> int:
+    return round(dt.timestamp() * 1000)
+
+
+def from_ms(ms: int) -> datetime:
+    return datetime.fromtimestamp(ms / 1000)
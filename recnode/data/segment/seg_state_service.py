@@ -1,16 +1,33 @@
-import json
+import asyncio
 import uuid
 from datetime import datetime
+from enum import Enum
 from uuid import UUID
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel
 from pyutils import error_dict, log
 from redis.asyncio import Redis
 
-from .seg_num_set import SegmentNumberSet
-from ..redis import RedisString, inc_count
+from .seg_num_set import SegmentNumberSet, SegmentNumberSetType, RENEW_THRESHOLD_MS
+from .seg_state import SegmentState, INIT_PARALLEL_LIMIT
+from .seg_scripts import (
+    ABANDON_SCRIPT,
+    ACQUIRE_SCRIPT,
+    COMMIT_SUCCESS_SCRIPT,
+    RECORD_FAILURE_SCRIPT,
+    RENEW_SCRIPT,
+    with_num_set,
+    with_state_storage,
+)
+from .seg_state_codec import SegmentStateCodec
+from .seg_state_store import SegmentStateStorage, create_state_store
+from ..redis import RedisPipeline, inc_count
 
-INIT_PARALLEL_LIMIT = 1
+
+class SegmentFailureState(Enum):
+    SUCCESS = 0  # another request already committed the segment
+    RETRYING = 1
+    FAILED = 2
 
 
 class SegmentLock(BaseModel):
@@ -19,30 +36,13 @@ class SegmentLock(BaseModel):
     lock_num: int
 
 
-class SegmentState(BaseModel):
-    num: int
-    url: str
-    duration: float
-    size: int | None = Field(default=None)
-    parallel_limit: int
-    is_retrying: bool = Field(default=False)
-    created_at: datetime
-    updated_at: datetime
-
-    def to_dict(self):
-        return self.model_dump(mode="json", by_alias=True)
-
-    @staticmethod
-    def new(url: str, num: int, duration: float, now: datetime, size: int | None = None) -> "SegmentState":
-        return SegmentState(
-            url=url,
-            num=num,
-            duration=duration,
-            size=size,
-            parallel_limit=INIT_PARALLEL_LIMIT,
-            created_at=now,
-            updated_at=now,
-        )
+def to_success(state: SegmentState, size: int) -> SegmentState:
+    new_state = state.copy()
+    new_state.is_retrying = False
+    new_state.size = size
+    new_state.parallel_limit = INIT_PARALLEL_LIMIT
+    new_state.updated_at = datetime.now()
+    return new_state
 
 
 class SegmentStateService:
@@ -55,145 +55,200 @@ class SegmentStateService:
         lock_expire_sec: float,
         retry_parallel_retry_limit: int,
         attr: dict,
+        num_set_type: SegmentNumberSetType = SegmentNumberSetType.ZSET,
+        state_storage: SegmentStateStorage = SegmentStateStorage.KEYS,
+        codec: SegmentStateCodec | None = None,
     ):
         self.__master = master
         self.__replica = replica
-        self.__str_master = RedisString(self.__master)
-        self.__str_replica = RedisString(self.__replica)
         self.__seg_expire_ms = int(seg_expire_sec * 1000)
         self.__lock_expire_ms = int(lock_expire_sec * 1000)
         self.__retry_parallel_retry_limit = retry_parallel_retry_limit
         self.__attr = attr
+        self.__state_storage = state_storage
+        self.__codec = codec if codec is not None else SegmentStateCodec()
+        self.__store = create_state_store(state_storage, master, replica, live_record_id, self.__seg_expire_ms)
+        self.__acquire_script = self.__register_script(ACQUIRE_SCRIPT, num_set_type)
+        self.__commit_success_script = self.__register_script(COMMIT_SUCCESS_SCRIPT, num_set_type)
+        self.__record_failure_script = self.__register_script(RECORD_FAILURE_SCRIPT, num_set_type)
+        self.__abandon_script = self.__register_script(ABANDON_SCRIPT, num_set_type)
+        self.__renew_script = self.__master.register_script(RENEW_SCRIPT)
 
         self.live_record_id = live_record_id
 
     async def get_seg(self, num: int, use_master: bool) -> SegmentState | None:
-        inc_count(use_master=use_master)
-        txt = await self.__get_str_redis(use_master).get(self.__get_key(num))
+        txt = await self.__store.get(num, use_master)
         if txt is None:
             return None
-        return SegmentState(**json.loads(txt))
+        return self.__codec.decode(txt, num)
 
     async def get_batch(self, nums: list[int], use_master: bool) -> list[SegmentState]:
-        inc_count(use_master=use_master)
-        keys = [self.__get_key(num) for num in nums]
-        texts = await self.__get_str_redis(use_master).mget(keys)
+        texts = await self.__store.mget(nums, use_master)
         result: list[SegmentState] = []
         for i, txt in enumerate(texts):
             if txt is not None:
-                result.append(SegmentState(**json.loads(txt)))
+                result.append(self.__codec.decode(txt, nums[i]))
             else:
-                log.error("SegmentState not found", {"key": keys[i]})
+                log.error("SegmentState not found", {"key": self.__store.script_key(nums[i]), "num": nums[i]})
         return result
 
     async def set_seg(self, state: SegmentState, nx: bool) -> bool:
-        inc_count(use_master=True)
-        return await self.__str_master.set(
-            key=self.__get_key(state.num),
-            value=state.model_dump_json(by_alias=True),
-            nx=nx,
-            px=self.__seg_expire_ms,
-        )
+        return await self.__store.set(state.num, self.__codec.encode(state), nx=nx)
 
     async def set_seg_nx(self, state: SegmentState) -> bool:
         return await self.set_seg(state=state, nx=True)
 
-    async def update_to_success(self, state: SegmentState, size: int) -> bool:
-        new_state = state.copy()
-        new_state.is_retrying = False
-        new_state.size = size
-        new_state.parallel_limit = INIT_PARALLEL_LIMIT
-        new_state.updated_at = datetime.now()
-        return await self.set_seg(state=new_state, nx=False)
+    async def commit_success(
+        self,
+        state: SegmentState,
+        size: int,
+        success_nums: SegmentNumberSet,
+        retrying_nums: SegmentNumberSet,
+        failed_nums: SegmentNumberSet,
+    ) -> int | None:  # return the retry count, or None if the segment was already committed
+        # add to success set + update state + clear retry count + remove from retrying/failed sets, atomically
+        inc_count(use_master=True)
+        result = await self.__commit_success_script(
+            keys=[self.__store.script_key(state.num), success_nums.key, retrying_nums.key, failed_nums.key],
+            args=[
+                state.num,
+                self.__codec.encode(to_success(state, size)),
+                self.__seg_expire_ms,
+                success_nums.events_channel or "",
+            ],
+        )
+        retry_count = int(result)
+        if retry_count < 0:
+            return None
+        return retry_count
+
+    async def record_failure(
+        self,
+        state: SegmentState,
+        threshold: float,
+        success_nums: SegmentNumberSet,
+        retrying_nums: SegmentNumberSet,
+        failed_nums: SegmentNumberSet,
+    ) -> tuple[SegmentFailureState, int]:  # (new state, retry count)
+        # first failure -> retrying, retry failure -> retry count +1 and failed once the threshold is reached
+        inc_count(use_master=True)
+        result = await self.__record_failure_script(
+            keys=[self.__store.script_key(state.num), success_nums.key, retrying_nums.key, failed_nums.key],
+            args=[
+                state.num,
+                "" if state.is_retrying else self.__codec.encode(self.__to_retrying(state)),
+                threshold,
+                self.__seg_expire_ms,
+                success_nums.events_channel or "",
+            ],
+        )
+        return SegmentFailureState(int(result[0])), int(result[1])
+
+    async def abandon_retry(
+        self,
+        state: SegmentState,
+        retrying_nums: SegmentNumberSet,
+        failed_nums: SegmentNumberSet,
+    ) -> int | None:  # retry count if the segment moved from retrying to failed, None if it was not retrying
+        # the segment can no longer be downloaded: move it to the failed set regardless of the retry count
+        inc_count(use_master=True)
+        result = await self.__abandon_script(
+            keys=[self.__store.script_key(state.num), retrying_nums.key, failed_nums.key],
+            args=[state.num, retrying_nums.events_channel or ""],
+        )
+        retry_count = int(result)
+        if retry_count < 0:
+            return None
+        return retry_count
 
-    async def update_to_retrying(self, state: SegmentState) -> bool:
+    def __to_retrying(self, state: SegmentState) -> SegmentState:
         new_state = state.copy()
         new_state.is_retrying = True
         new_state.parallel_limit = self.__retry_parallel_retry_limit
         new_state.updated_at = datetime.now()
-        return await self.set_seg(state=new_state, nx=False)
+        return new_state
 
-    async def acquire_lock(self, state: SegmentState) -> SegmentLock | None:
-        for lock_num in range(state.parallel_limit):
-            lock = await self._acquire_lock(seg_num=state.num, lock_num=lock_num)
-            if lock is not None:
-                return lock
-        return None
+    async def try_acquire(self, state: SegmentState, skip_sets: list[SegmentNumberSet]) -> SegmentLock | None:
+        # skip-set check + lease acquisition (+ SET NX of the state for a first request) in one round trip
+        return await self.__acquire(state, skip_sets=skip_sets, new_state=None if state.is_retrying else state)
 
-    async def _acquire_lock(self, seg_num: int, lock_num: int) -> SegmentLock | None:
+    async def __acquire(
+        self,
+        state: SegmentState,
+        skip_sets: list[SegmentNumberSet],
+        new_state: SegmentState | None,
+    ) -> SegmentLock | None:
         inc_count(use_master=True)
         token = uuid.uuid4()
-        result = await self.__str_master.set(
-            key=self.__get_lock_key(seg_num=seg_num, lock_num=lock_num),
-            value=str(token),
-            nx=True,
-            px=self.__lock_expire_ms,
+        result = await self.__acquire_script(
+            keys=[self.__store.script_key(state.num), self.__get_lock_key(state.num), *[nums.key for nums in skip_sets]],
+            args=[
+                state.num,
+                str(token),
+                self.__lock_expire_ms,
+                state.parallel_limit,
+                "" if new_state is None else self.__codec.encode(new_state),
+                self.__seg_expire_ms,
+            ],
         )
-        if result:
-            return SegmentLock(token=token, seg_num=seg_num, lock_num=lock_num)
-        else:
+        lock_num = int(result[0])
+        if lock_num < 0:
             return None
+        return SegmentLock(token=token, seg_num=state.num, lock_num=lock_num)
 
     async def release_lock(self, lock: SegmentLock):
-        key = self.__get_lock_key(seg_num=lock.seg_num, lock_num=lock.lock_num)
-        inc_count(use_master=True)
-        # When using the replica client, a mismatch error occurs if the lock is deleted immediately after creation
-        current_token = await self.__str_master.get(key)
-        if current_token is None:
-            raise ValueError("Lock does not exist")
-        if current_token != str(lock.token):
-            raise ValueError(f"Lock Token mismatch: expected={lock.token}, actual={current_token}")
-        inc_count(use_master=True)
-        await self.__str_master.delete(key)
-
-    async def is_locked(self, seg_num: int, lock_num: int, use_master: bool) -> bool:
-        inc_count(use_master=use_master)
-        key = self.__get_lock_key(seg_num=seg_num, lock_num=lock_num)
-        return await self.__get_str_redis(use_master).exists(key)
-
-    async def increment_retry_count(self, seg_num: int) -> int:
         inc_count(use_master=True)
-        key = self.__get_retry_key(seg_num=seg_num)
-        result = await self.__str_master.incr(key, px=self.__seg_expire_ms)
-        if result == 1:
-            inc_count(use_master=True)
-        return result
-
-    async def get_retry_count(self, seg_num: int, use_master: bool) -> int:
-        inc_count(use_master=use_master)
-        key = self.__get_retry_key(seg_num=seg_num)
-        count = await self.__get_str_redis(use_master).get(key)
-        if count is None:
-            return 0
-        return int(count)
-
-    async def clear_retry_count(self, seg_num: int, check_replica: bool = True):
-        await self._delete(self.__get_retry_key(seg_num=seg_num), check_replica)
+        removed = await self.__master.zrem(self.__get_lock_key(lock.seg_num), str(lock.token))
+        if removed == 0:
+            raise ValueError(f"Lock does not exist: token={lock.token}")
 
     async def delete(self, num: int, check_replica: bool = True):
-        await self._delete(self.__get_key(num), check_replica)
-
-    async def _delete(self, key: str, check_replica: bool = True):
-        if check_replica:
-            inc_count(use_master=False)
-            if not await self.__str_replica.exists(key):
-                return
-        inc_count(use_master=True)
-        await self.__str_master.delete(key)  # If replica check is performed, data might not be deleted
+        await self.__store.delete(num, check_replica)
 
     async def delete_mapped(self, nums: SegmentNumberSet):
-        for num in await nums.all(use_master=True):
-            await self.delete(num)
+        await self.__store.delete_all(await nums.all(use_master=True))
         await nums.clear()
 
+    async def renew(self, sets: list[SegmentNumberSet]):
+        start_time = asyncio.get_event_loop().time()
+        try:
+            if self.__state_storage == SegmentStateStorage.KEYS:
+                await self.__renew_sets(sets)
+                return
+
+            # hash storage: the state hash and the number sets share one TTL, extended in a single round trip
+            keys = self.__store.renew_keys()
+            for nums in sets:
+                keys.extend(nums.renew_keys)
+            inc_count(use_master=True)
+            await self.__renew_script(keys=keys, args=[self.__seg_expire_ms, RENEW_THRESHOLD_MS])
+        except Exception as ex:
+            extra = {"duration": asyncio.get_event_loop().time() - start_time}
+            log.error("Renew failed", self.__error_attr(ex, extra))
+
     def __get_key(self, num: int) -> str:
         return f"live:{self.live_record_id}:segment:{num}"
 
-    def __get_lock_key(self, seg_num: int, lock_num: int) -> str:
-        return f"{self.__get_key(seg_num)}:lock:{lock_num}"
+    async def __renew_sets(self, sets: list[SegmentNumberSet]):
+        # one pipelined PTTL read on the replica, then one pipelined PEXPIRE on the master for the expiring sets
+        inc_count(use_master=False)
+        async with RedisPipeline(self.__replica) as p:
+            strings = p.string()
+            for nums in sets:
+                await strings.get_pttl(nums.key)
+        expiring = [nums for nums, ttl in zip(sets, p.results) if ttl != -2 and ttl <= RENEW_THRESHOLD_MS]
+        if len(expiring) == 0:
+            return
+
+        inc_count(use_master=True)
+        async with RedisPipeline(self.__master) as p:
+            strings = p.string()
+            for nums in expiring:
+                for key in nums.renew_keys:
+                    await strings.set_pexpire(key, self.__seg_expire_ms)
 
-    def __get_retry_key(self, seg_num: int) -> str:
-        return f"{self.__get_key(seg_num)}:retry"
+    def __get_lock_key(self, seg_num: int) -> str:
+        return f"{self.__get_key(seg_num)}:lock"
 
     def __error_attr(self, ex: Exception, extra: dict | None = None) -> dict:
         attr = self.__attr.copy()
@@ -204,5 +259,5 @@ class SegmentStateService:
                 attr[k] = v
         return attr
 
-    def __get_str_redis(self, use_master: bool = True) -> RedisString:
-        return self.__str_master if use_master else self.__str_replica
+    def __register_script(self, script: str, num_set_type: SegmentNumberSetType):
+        return self.__master.register_script(with_state_storage(with_num_set(script, num_set_type), self.__state_storage))
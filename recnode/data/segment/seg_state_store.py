@@ -0,0 +1,198 @@
+from enum import Enum
+
+from redis.asyncio import Redis
+
+from ..redis import RedisHash, RedisPipeline, RedisString, inc_count
+
+
+class SegmentStateStorage(Enum):
+    KEYS = "keys"  # one key per segment state / retry counter, each with its own TTL
+    HASH = "hash"  # all segment states and retry counters of a recording in one hash with a single TTL
+
+
+# Lua helpers used by the segment scripts: KEYS[1] of those scripts is the store key of the segment (script_key)
+# The retry counter key (`key:retry`) is derived inside the scripts instead of being passed in KEYS,
+# so the key storage requires a non-cluster Redis deployment (standalone or master/replica), not Redis Cluster
+KEYS_STATE_LUA = r"""
+local function state_set(key, num, value, px, nx)
+    if nx then
+        return redis.call('SET', key, value, 'NX', 'PX', px) ~= false
+    end
+    redis.call('SET', key, value, 'PX', px)
+    return true
+end
+
+local function retry_get(key, num)
+    return tonumber(redis.call('GET', key .. ':retry') or '0')
+end
+
+local function retry_incr(key, num, px)
+    local count = redis.call('INCR', key .. ':retry')
+    if count == 1 then
+        redis.call('PEXPIRE', key .. ':retry', px)
+    end
+    return count
+end
+
+local function retry_del(key, num)
+    redis.call('DEL', key .. ':retry')
+end
+"""
+
+HASH_STATE_LUA = r"""
+local function state_set(key, num, value, px, nx)
+    local ok = true
+    if nx then
+        ok = redis.call('HSETNX', key, num, value) == 1
+    else
+        redis.call('HSET', key, num, value)
+    end
+    if redis.call('PTTL', key) == -1 then
+        redis.call('PEXPIRE', key, px)
+    end
+    return ok
+end
+
+local function retry_get(key, num)
+    return tonumber(redis.call('HGET', key, num .. ':retry') or '0')
+end
+
+local function retry_incr(key, num, px)
+    return redis.call('HINCRBY', key, num .. ':retry', 1)
+end
+
+local function retry_del(key, num)
+    redis.call('HDEL', key, num .. ':retry')
+end
+"""
+
+
+class SegmentStateKeyStore:
+    def __init__(self, master: Redis, replica: Redis, live_record_id: str, seg_expire_ms: int):
+        self.__master = master
+        self.__str_master = RedisString(master)
+        self.__str_replica = RedisString(replica)
+        self.__live_record_id = live_record_id
+        self.__seg_expire_ms = seg_expire_ms
+
+    def script_key(self, num: int) -> str:
+        return self.__get_key(num)
+
+    async def get(self, num: int, use_master: bool) -> str | None:
+        inc_count(use_master=use_master)
+        return await self.__get_str_redis(use_master).get(self.__get_key(num))
+
+    async def mget(self, nums: list[int], use_master: bool) -> list[str | None]:
+        inc_count(use_master=use_master)
+        return await self.__get_str_redis(use_master).mget([self.__get_key(num) for num in nums])
+
+    async def set(self, num: int, value: str, nx: bool) -> bool:
+        inc_count(use_master=True)
+        return await self.__str_master.set(key=self.__get_key(num), value=value, nx=nx, px=self.__seg_expire_ms)
+
+    async def delete(self, num: int, check_replica: bool):
+        await self.__delete(self.__get_key(num), check_replica)
+        await self.__delete(self.__get_retry_key(num), check_replica)
+
+    async def delete_all(self, nums: list[int]):
+        if len(nums) == 0:
+            return
+        inc_count(use_master=True)
+        async with RedisPipeline(self.__master) as p:
+            strings = p.string()
+            for num in nums:
+                await strings.delete(self.__get_key(num))
+                await strings.delete(self.__get_retry_key(num))
+
+    async def __delete(self, key: str, check_replica: bool):
+        if check_replica:
+            inc_count(use_master=False)
+            if not await self.__str_replica.exists(key):
+                return
+        inc_count(use_master=True)
+        await self.__str_master.delete(key)  # If replica check is performed, data might not be deleted
+
+    def __get_key(self, num: int) -> str:
+        return f"live:{self.__live_record_id}:segment:{num}"
+
+    def __get_retry_key(self, num: int) -> str:
+        return f"{self.__get_key(num)}:retry"
+
+    def __get_str_redis(self, use_master: bool) -> RedisString:
+        return self.__str_master if use_master else self.__str_replica
+
+
+class SegmentStateHashStore:
+    def __init__(self, master: Redis, replica: Redis, live_record_id: str, seg_expire_ms: int):
+        self.__master = master
+        self.__hash_master = RedisHash(master)
+        self.__hash_replica = RedisHash(replica)
+        self.__live_record_id = live_record_id
+        self.__seg_expire_ms = seg_expire_ms
+
+    def script_key(self, num: int) -> str:
+        return self.__get_key()
+
+    async def get(self, num: int, use_master: bool) -> str | None:
+        inc_count(use_master=use_master)
+        return await self.__get_hash_redis(use_master).get(self.__get_key(), str(num))
+
+    async def mget(self, nums: list[int], use_master: bool) -> list[str | None]:
+        if len(nums) == 0:
+            return []
+        inc_count(use_master=use_master)
+        return await self.__get_hash_redis(use_master).mget(self.__get_key(), [str(num) for num in nums])
+
+    async def set(self, num: int, value: str, nx: bool) -> bool:
+        key = self.__get_key()
+        inc_count(use_master=True)
+        ok = await self.__hash_master.set(key, str(num), value, nx=nx)
+        # the hash gets its TTL once, on creation; after that it is only extended by renew
+        inc_count(use_master=True)
+        if await self.__hash_master.get_pttl(key) == -1:
+            inc_count(use_master=True)
+            await self.__hash_master.set_pexpire(key, self.__seg_expire_ms)
+        return ok
+
+    async def delete(self, num: int, check_replica: bool):
+        inc_count(use_master=True)
+        await self.__hash_master.delete(self.__get_key(), str(num), get_retry_field(num))
+
+    async def delete_all(self, nums: list[int]):
+        if len(nums) == 0:
+            return
+        key = self.__get_key()
+        inc_count(use_master=True)
+        async with RedisPipeline(self.__master) as p:
+            hashes = p.hash()
+            for num in nums:
+                await hashes.delete(key, str(num), get_retry_field(num))
+
+    def renew_keys(self) -> list[str]:
+        return [self.__get_key()]
+
+    def __get_key(self) -> str:
+        return f"live:{self.__live_record_id}:segments:state"
+
+    def __get_hash_redis(self, use_master: bool) -> RedisHash:
+        return self.__hash_master if use_master else self.__hash_replica
+
+
+def get_retry_field(num: int) -> str:
+    return f"{num}:retry"
+
+
+def create_state_store(
+    storage: SegmentStateStorage,
+    master: Redis,
+    replica: Redis,
+    live_record_id: str,
+    seg_expire_ms: int,
+) -> SegmentStateKeyStore | SegmentStateHashStore:
+    if storage == SegmentStateStorage.HASH:
+        return SegmentStateHashStore(master, replica, live_record_id, seg_expire_ms)
+    return SegmentStateKeyStore(master, replica, live_record_id, seg_expire_ms)
+
+
+def get_state_lua(storage: SegmentStateStorage) -> str:
+    return HASH_STATE_LUA if storage == SegmentStateStorage.HASH else KEYS_STATE_LUA
@@ -103,39 +103,14 @@ class SegmentStateValidator:
             log.error("Validate segments failed", self.__error_attr(ex))
             return no()
 
-    async def validate_segment(
-        self,
-        seg: SegmentState,
-        latest_num: int | None,
-        success_nums: SegmentNumberSet,
-    ) -> SegmentInspect:
-        try:
-            if latest_num is None:
-                return ok()  # init recording
-
-            if self.__is_invalid_num(seg.num, latest_num):
-                attr = self.__seg_attr(seg)
-                attr["latest_num"] = latest_num
-                log.error("Segment number difference is too large", attr)
-                return critical()
-
-            if not await success_nums.contains(seg.num, use_master=False):
-                return ok()  # unsuccessful segment
-
-            seg_state = await self.__seg_service.get_seg(seg.num, use_master=False)
-            if seg_state is None:
-                log.error(f"Segment {seg.num} not found", self.__seg_attr(seg))
-                return no()
-
-            if not self.__validate_segment_pair(seg, seg_state):
-                log.error("Invalid duplicated segment", self.__pair_attr(seg, seg_state))
-                return critical()
-            else:
-                # log.debug("Duplicated segment", self.__seg_attr(seg))
-                return no()
-        except BaseException as ex:
-            log.error("Failed to validate segment", self.__error_attr(ex))
-            return no()
+    def validate_segment_num(self, seg: SegmentState, latest_num: int | None) -> SegmentInspect:
+        # duplicate checks are done by SegmentStateService.try_acquire
+        if latest_num is None or not self.__is_invalid_num(seg.num, latest_num):
+            return ok()
+        attr = self.__seg_attr(seg)
+        attr["latest_num"] = latest_num
+        log.error("Segment number difference is too large", attr)
+        return critical()
 
     def __is_invalid_num(self, num: int, latest_num: int) -> bool:
         return abs(num - latest_num) > self.__invalid_seg_num_diff_threshold
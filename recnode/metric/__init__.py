@@ -2,7 +2,7 @@ import os
 import sys
 
 from .histogram import Histogram
-from .metric_manager import MetricManager, metric
+from .metric_manager import MetricManager, metric, get_metric_registry, is_multiprocess
 
 targets = [
     "histogram",
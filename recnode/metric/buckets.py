@@ -100,3 +100,15 @@ object_write_duration_buckets = [
     13.0,
     float("inf"),
 ]
+
+redis_pipeline_command_buckets = [
+    1.0,
+    2.0,
+    5.0,
+    10.0,
+    25.0,
+    50.0,
+    100.0,
+    250.0,
+    float("inf"),
+]
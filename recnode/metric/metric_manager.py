@@ -1,4 +1,7 @@
-from prometheus_client import Histogram as PromHistogram, Counter
+import os
+from typing import Callable
+
+from prometheus_client import Histogram as PromHistogram, Counter, Gauge, CollectorRegistry, REGISTRY, multiprocess
 
 from .buckets import (
     segment_request_duration_buckets,
@@ -7,10 +10,14 @@ from .buckets import (
     segment_request_retry_buckets,
     object_write_duration_buckets,
     interval_duration_buckets,
+    redis_pipeline_command_buckets,
 )
 from .histogram import Histogram
 from ..common import PlatformType
-from ..utils import AsyncCounter
+from ..utils import AsyncCounter, ResponseMeta
+
+# checked in order; the first header present decides the cache status
+CDN_CACHE_HEADERS = ["cf-cache-status", "x-cache-status", "x-cache"]
 
 
 class MetricManager:
@@ -26,6 +33,28 @@ class MetricManager:
             "Duration of Redis requests in seconds",
             buckets=api_request_duration_buckets,
         )
+        self.__redis_pipeline_duration_hist = PromHistogram(
+            "redis_pipeline_duration_seconds",
+            "Duration of Redis pipeline round trips in seconds",
+            buckets=api_request_duration_buckets,
+        )
+        self.__redis_pipeline_command_hist = PromHistogram(
+            "redis_pipeline_commands",
+            "Count of commands flushed per Redis pipeline",
+            buckets=redis_pipeline_command_buckets,
+        )
+        self.__redis_pool_connection_gauge = Gauge(
+            "redis_pool_connections",
+            "Count of Redis pool connections by state (in_use, available)",
+            ["role", "state"],
+            multiprocess_mode="livesum",
+        )
+        self.__redis_budget_connection_gauge = Gauge(
+            "redis_budget_connections",
+            "Count of open Redis connections counted against the node connection budget",
+            multiprocess_mode="livesum",
+        )
+        self.__gauge_sources: list[tuple[Gauge, Callable[[], int]]] = []
         self.__redis_master_request_counter = Counter(
             "redis_master_requests",
             "Count of Redis master requests",
@@ -57,6 +86,33 @@ class MetricManager:
             ["platform"],
             buckets=segment_request_duration_buckets,
         )
+        self.__segment_ttfb_hist = PromHistogram(
+            "segment_ttfb_seconds",
+            "Time to first byte (response headers) of HLS segment requests in seconds",
+            ["platform"],
+            buckets=segment_request_duration_buckets,
+        )
+        self.__segment_transfer_duration_hist = PromHistogram(
+            "segment_transfer_duration_seconds",
+            "Duration of HLS segment body transfers in seconds",
+            ["platform"],
+            buckets=segment_request_duration_buckets,
+        )
+        self.__segment_cache_status_counter = Counter(
+            "segment_cdn_cache_status",
+            "Count of HLS segment responses by CDN cache status",
+            ["platform", "status"],
+        )
+        self.__segment_local_retry_counter = Counter(
+            "segment_local_retries",
+            "Count of HLS segment retries done inside the downloader before reporting a result",
+            ["platform"],
+        )
+        self.__segment_schedule_wait_hist = PromHistogram(
+            "segment_schedule_wait_seconds",
+            "Time HLS segment downloads waited for a node-wide download slot",
+            buckets=api_request_duration_buckets,
+        )
         self.__segment_request_retry_hist = PromHistogram(
             "segment_request_retries",
             "Count of HLS segment request retries",
@@ -82,6 +138,28 @@ class MetricManager:
     def set_redis_request_duration(self, duration: float):
         self.__redis_request_duration_hist.observe(duration)
 
+    def set_redis_pipeline(self, duration: float, cmd_count: int):
+        self.__redis_pipeline_duration_hist.observe(duration)
+        self.__redis_pipeline_command_hist.observe(cmd_count)
+
+    def set_redis_pool_connection_source(self, role: str, in_use: Callable[[], int], available: Callable[[], int]):
+        for state, source in [("in_use", in_use), ("available", available)]:
+            gauge = self.__redis_pool_connection_gauge.labels(role=role, state=state)
+            if is_multiprocess():
+                self.__gauge_sources.append((gauge, source))  # exported only when set, see refresh_gauges
+            else:
+                gauge.set_function(source)
+
+    def set_redis_budget_connection_source(self, used: Callable[[], int]):
+        if is_multiprocess():
+            self.__gauge_sources.append((self.__redis_budget_connection_gauge, used))
+        else:
+            self.__redis_budget_connection_gauge.set_function(used)
+
+    def refresh_gauges(self):
+        for gauge, source in self.__gauge_sources:
+            gauge.set(source())
+
     def inc_redis_master_request_count(self, amount: float = 1):
         self.__redis_master_request_counter.inc(amount=amount)
 
@@ -106,6 +184,17 @@ class MetricManager:
         if extra is not None:
             await extra.observe(duration)
 
+    def set_segment_schedule_wait(self, duration: float):
+        self.__segment_schedule_wait_hist.observe(duration)
+
+    def set_segment_response_meta(self, meta: ResponseMeta, platform: PlatformType):
+        self.__segment_ttfb_hist.labels(platform=platform.value).observe(meta.ttfb_sec)
+        self.__segment_transfer_duration_hist.labels(platform=platform.value).observe(meta.transfer_sec)
+        status = get_cache_status(meta.headers)
+        self.__segment_cache_status_counter.labels(platform=platform.value, status=status).inc()
+        if meta.retries > 0:
+            self.__segment_local_retry_counter.labels(platform=platform.value).inc(meta.retries)
+
     async def set_segment_request_retry(self, retry_cnt: int, platform: PlatformType, extra: Histogram | None = None):
         self.__segment_request_retry_hist.labels(platform=platform.value).observe(retry_cnt)
         if extra is not None:
@@ -129,4 +218,31 @@ class MetricManager:
         return Histogram(segment_request_retry_buckets)
 
 
+def is_multiprocess() -> bool:  # PROMETHEUS_MULTIPROC_DIR must be set before prometheus_client is imported
+    return os.getenv("PROMETHEUS_MULTIPROC_DIR") is not None
+
+
+def get_metric_registry() -> CollectorRegistry:
+    if not is_multiprocess():
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def get_cache_status(headers: dict[str, str]) -> str:
+    for name in CDN_CACHE_HEADERS:
+        value = headers.get(name)
+        if value is None:
+            continue
+        # e.g. "MISS, HIT" (shield, edge): the last entry is the one closest to the client
+        status = value.split(",")[-1].strip().upper()
+        if "HIT" in status:
+            return "hit"
+        if "MISS" in status or status in ("EXPIRED", "BYPASS", "DYNAMIC"):
+            return "miss"
+        return "unknown"
+    return "unknown"
+
+
 metric = MetricManager()
@@ -2,7 +2,9 @@ import os
 import sys
 
 from .manager.recording_scheduler import RecordingScheduler
+from .manager.recorder_host import RecorderHost
 from .manager.recorder_resolver import RecorderResolver
+from .manager.recording_worker_pool import RecordingWorkerPool
 
 targets = [
     "manger",
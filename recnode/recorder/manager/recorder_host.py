@@ -0,0 +1,87 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+
+from pyutils import log, error_dict
+
+from ..stream.stream_recorder import StreamRecorder
+from ...data.redis import RedisPoolRegistry
+
+STOP_TIMEOUT_SEC = 10
+
+
+class HostLoop:
+    def __init__(self, idx: int):
+        self.idx = idx
+        self.loop = asyncio.new_event_loop()
+        self.recording_count = 0
+        self.__thread = threading.Thread(target=self.__run, name=f"recorder-loop:{idx}", daemon=True)
+
+    def start(self):
+        self.__thread.start()
+
+    def stop(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.__thread.join(timeout=STOP_TIMEOUT_SEC)
+
+    def __run(self):
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_forever()
+        finally:
+            self.loop.close()
+
+
+# Runs recordings as tasks on a small pool of long-lived event loops instead of one thread + loop per recording.
+# A recording's segment tasks stay on its loop (they are grouped by the record id task name prefix).
+class RecorderHost:
+    def __init__(self, loop_count: int, redis_pools: RedisPoolRegistry | None = None):
+        if loop_count < 1:
+            raise ValueError("loop_count must be at least 1")
+        self.__loops = [HostLoop(idx) for idx in range(loop_count)]
+        self.__redis_pools = redis_pools
+        self.__lock = threading.Lock()
+        self.__started = False
+
+    def start(self):
+        with self.__lock:
+            if self.__started:
+                return
+            for host_loop in self.__loops:
+                host_loop.start()
+            self.__started = True
+
+    def submit(self, recorder: StreamRecorder) -> Future:
+        with self.__lock:
+            if not self.__started:
+                raise ValueError("RecorderHost is not started")
+            host_loop = min(self.__loops, key=lambda lp: lp.recording_count)
+            host_loop.recording_count += 1
+
+        future = recorder.record_on(host_loop.loop)
+        future.add_done_callback(lambda f: self.__on_done(host_loop, recorder, f))
+        return future
+
+    def get_loads(self) -> list[int]:  # active recordings per loop
+        with self.__lock:
+            return [host_loop.recording_count for host_loop in self.__loops]
+
+    def stop(self):
+        with self.__lock:
+            if not self.__started:
+                return
+            self.__started = False
+        for host_loop in self.__loops:
+            if self.__redis_pools is not None:
+                future = asyncio.run_coroutine_threadsafe(self.__redis_pools.close_loop(), host_loop.loop)
+                try:
+                    future.result(timeout=STOP_TIMEOUT_SEC)
+                except Exception as ex:
+                    log.error("Failed to close Redis pools of the recorder loop", error_dict(ex))
+            host_loop.stop()
+
+    def __on_done(self, host_loop: HostLoop, recorder: StreamRecorder, future: Future):
+        with self.__lock:
+            host_loop.recording_count -= 1
+        if not future.cancelled() and future.exception() is not None:
+            log.error("Recording task failed", recorder.ctx.to_err(future.exception()))  # type: ignore
@@ -1,7 +1,7 @@
 from aiohttp_socks import ProxyType
 from pyutils import path_join
-from redis.asyncio import Redis
 
+from ..manager.segment_scheduler import SegmentScheduler
 from ..schema.recording_arguments import RecordingArgs
 from ..stream.stream_recorder import StreamRecorder
 from ..stream.stream_recorder_seg import SegmentedStreamRecorder
@@ -9,14 +9,20 @@ from ...common import PlatformType
 from ...config import Env
 from ...data.live import LiveState
 from ...data.live import LocationType
-from ...data.redis import create_redis_pool
+from ...data.redis import RedisPoolRegistry
+from ...data.segment import SegmentNumberMirrorHub
 from ...file import create_fs_writer, read_fs_config_by_file
 from ...utils import StreamLinkSessionArgs, ProxyConnectorConfig
 
 
 class RecorderResolver:
-    def __init__(self, env: Env, my_public_ip: str):
+    def __init__(self, env: Env, my_public_ip: str, redis_pools: RedisPoolRegistry):
         self.__env = env
+        self.__redis_pools = redis_pools
+        self.__seg_scheduler = SegmentScheduler(env.req_conf.seg_node_concurrency_limit or None)
+        self.__num_mirror_hub: SegmentNumberMirrorHub | None = None
+        if env.redis_data.seg_num_mirror_enabled:
+            self.__num_mirror_hub = SegmentNumberMirrorHub(redis_pools, env.redis_data.seg_num_mirror_resync_sec)
         self.__fs_configs = read_fs_config_by_file(env.fs_config_path)
         self.__my_public_ip = my_public_ip
 
@@ -65,13 +71,20 @@ class RecorderResolver:
             ),
             incomplete_dir_path=path_join(self.__env.out_dir_path, "incomplete"),
             writer=create_fs_writer(state.fs_name, self.__fs_configs, self.__env.proxy_server),
-            redis_master=Redis(connection_pool=create_redis_pool(self.__env.redis_master)),
-            redis_replica=Redis(connection_pool=create_redis_pool(self.__env.redis_replica)),
+            redis_master=self.__redis_pools.master(),
+            redis_replica=self.__redis_pools.replica(),
             redis_data_conf=self.__env.redis_data,
             req_conf=self.__env.req_conf,
             proxy=self.__get_proxy_connector_config(state.location),
+            seg_scheduler=self.__seg_scheduler,
+            num_mirror_hub=self.__num_mirror_hub,
+            redis_pools=self.__redis_pools,
         )
 
+    def close(self):
+        if self.__num_mirror_hub is not None:
+            self.__num_mirror_hub.stop()
+
     def __get_proxy_connector_config(self, location: LocationType) -> ProxyConnectorConfig | None:
         if self.__env.proxy is None:
             return None
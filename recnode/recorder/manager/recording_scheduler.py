@@ -4,12 +4,16 @@ import time
 from pydantic import BaseModel
 from pyutils import log, error_dict
 
+from ..manager.recorder_host import RecorderHost
 from ..manager.recorder_resolver import RecorderResolver
 from ..schema.recording_constants import SCHEDULER_CHECK_DELAY_SEC
 from ..stream.stream_recorder import StreamRecorder
 from ...common import PlatformType
 from ...config import Env
 from ...data.live import LiveState
+from ...data.redis import RedisPoolRegistry
+
+CLOSE_TIMEOUT_SEC = 30
 
 
 class RecordingSummary(BaseModel):
@@ -19,9 +23,13 @@ class RecordingSummary(BaseModel):
 
 
 class RecordingScheduler:
-    def __init__(self, env: Env, my_public_ip: str):
+    def __init__(self, env: Env, my_public_ip: str, redis_pools: RedisPoolRegistry):
         self.__env = env
-        self.__resolver = RecorderResolver(self.__env, my_public_ip)
+        self.__resolver = RecorderResolver(self.__env, my_public_ip, redis_pools)
+        self.__host: RecorderHost | None = None
+        if env.stream.recorder_loop_count > 0:
+            self.__host = RecorderHost(env.stream.recorder_loop_count, redis_pools)
+            self.__host.start()
 
         self.__recorder_map: dict[str, StreamRecorder] = {}
         self.__check_thread: threading.Thread | None = None
@@ -36,6 +44,8 @@ class RecordingScheduler:
         if with_resources:
             result["thread_counts"] = len(threading.enumerate())
             result["thread_names"] = [thread.name for thread in threading.enumerate()]
+            if self.__host is not None:
+                result["loop_recording_counts"] = self.__host.get_loads()
         return result
 
     def get_recorder_summaries(self):
@@ -49,22 +59,41 @@ class RecordingScheduler:
             result.append(summary)
         return result
 
+    def count_recordings(self) -> int:
+        return len(self.__recorder_map)
+
     def record(self, state: LiveState):
         recorder = self.__resolver.create_recorder(state)
-        key = _parse_key(state)
+        key = parse_recording_key(state)
         if self.__recorder_map.get(key):
             log.info("Already Recording")
             return
         self.__recorder_map[key] = recorder
-        recorder.record()
+        if self.__host is not None:
+            self.__host.submit(recorder)
+        else:
+            recorder.record()
 
     def cancel(self, state: LiveState):
-        recorder = self.__recorder_map.get(_parse_key(state))
+        recorder = self.__recorder_map.get(parse_recording_key(state))
         if recorder is not None:
             recorder.cancel()
         else:
             log.error(f"Not found recorder", state.model_dump(mode="json"))
 
+    def close(self):
+        # aborted recordings still flush their pending segments, so give them a moment before the loops stop
+        recorders = list(self.__recorder_map.values())
+        for recorder in recorders:
+            recorder.cancel()
+        deadline = time.monotonic() + CLOSE_TIMEOUT_SEC
+        for recorder in recorders:
+            while not recorder.is_done and time.monotonic() < deadline:
+                time.sleep(SCHEDULER_CHECK_DELAY_SEC)
+        if self.__host is not None:
+            self.__host.stop()
+        self.__resolver.close()
+
     def __start_monitoring_states(self):
         self.__check_thread = threading.Thread(target=self.__monitor_states)
         self.__check_thread.daemon = True
@@ -77,8 +106,7 @@ class RecordingScheduler:
                 for key in keys:
                     recorder = self.__recorder_map.get(key)
                     if recorder is not None and recorder.is_done:
-                        if recorder.recording_thread is not None:
-                            recorder.recording_thread.join()
+                        recorder.join()
                         log.info(f"Remove Done Recorder", recorder.ctx.to_dict())
                         del self.__recorder_map[key]
                 time.sleep(SCHEDULER_CHECK_DELAY_SEC)
@@ -87,5 +115,5 @@ class RecordingScheduler:
                 time.sleep(SCHEDULER_CHECK_DELAY_SEC)
 
 
-def _parse_key(state: LiveState) -> str:
+def parse_recording_key(state: LiveState) -> str:
     return f"{state.platform.value}:{state.channel_id}:{state.video_name}"
@@ -0,0 +1,264 @@
+import asyncio
+import multiprocessing
+import threading
+import time
+from multiprocessing.connection import Connection
+from multiprocessing.process import BaseProcess
+from typing import Any
+
+from pyutils import log, error_dict
+
+from ..manager.recording_scheduler import RecordingScheduler, RecordingSummary, parse_recording_key, CLOSE_TIMEOUT_SEC
+from ...config import Env, get_env
+from ...data.live import LiveState
+from ...data.redis import RedisPoolRegistry
+from ...metric import metric
+
+CMD_RECORD = "record"
+CMD_CANCEL = "cancel"
+CMD_STATUS = "status"
+CMD_SUMMARIES = "summaries"
+CMD_LOAD = "load"
+
+GAUGE_REFRESH_INTERVAL_SEC = 5
+
+
+class WorkerDeadError(Exception):
+    pass
+
+
+class WorkerHandle:
+    def __init__(self, idx: int, process: BaseProcess, conn: Connection):
+        self.idx = idx
+        self.process = process
+        self.dead = False
+        self.__conn = conn
+        self.__lock = threading.Lock()  # one request in flight per pipe
+
+    def is_alive(self) -> bool:
+        return not self.dead and self.process.is_alive()
+
+    def close(self):
+        # the worker sees EOF, closes its scheduler and exits
+        with self.__lock:
+            self.__conn.close()
+        self.process.join(timeout=CLOSE_TIMEOUT_SEC * 2)
+        if self.process.is_alive():
+            self.process.terminate()
+
+    def discard(self):  # the process is gone (or stuck), so do not wait for a graceful shutdown
+        self.dead = True
+        self.__conn.close()
+        if self.process.is_alive():
+            self.process.terminate()
+        self.process.join(timeout=CLOSE_TIMEOUT_SEC)
+
+    def request(self, cmd: str, payload=None):
+        with self.__lock:
+            if self.dead:
+                raise WorkerDeadError(f"Worker {self.idx} is dead")
+            try:
+                self.__conn.send((cmd, payload))
+                ok, result = self.__conn.recv()
+            except (EOFError, OSError) as ex:
+                self.dead = True
+                raise WorkerDeadError(f"Worker {self.idx} is dead") from ex
+        if not ok:
+            raise ValueError(f"Worker {self.idx} failed on {cmd}: {result}")
+        return result
+
+
+# Shards recordings across K worker processes, each running its own RecordingScheduler (and event loops).
+# Same interface as RecordingScheduler, so the server controller works with either.
+# Dead workers are replaced on the next call; their recordings are gone and can be requested again.
+class RecordingWorkerPool:
+    def __init__(self, worker_count: int, my_public_ip: str):
+        self.__ctx = multiprocessing.get_context("spawn")
+        self.__my_public_ip = my_public_ip
+        self.__workers: list[WorkerHandle] = [self.__start_worker(idx) for idx in range(worker_count)]
+        self.__owners: dict[str, WorkerHandle] = {}  # recording key -> worker
+        # recording key -> sequence at which the worker confirmed it (absent while the record command is in flight)
+        self.__confirmed_seqs: dict[str, int] = {}
+        self.__seq = 0
+        self.__lock = threading.Lock()
+
+    async def get_status(self, with_stats: bool = False, full_stats: bool = False, with_resources: bool = False):
+        payload = {"with_stats": with_stats, "full_stats": full_stats, "with_resources": with_resources}
+        workers = self.__live_workers()
+        results = await asyncio.gather(
+            *[asyncio.to_thread(worker.request, CMD_STATUS, payload) for worker in workers],
+            return_exceptions=True,
+        )
+        replies = [(w, result) for w, result in zip(workers, results) if not isinstance(result, WorkerDeadError)]
+        for _, result in replies:
+            if isinstance(result, BaseException):
+                raise result
+        recordings: list = []
+        for _, result in replies:
+            recordings.extend(result["recordings"])  # type: ignore
+        merged: dict = {"recordings": recordings}
+        if with_resources:
+            merged["workers"] = [
+                {"idx": w.idx, "pid": w.process.pid, **{k: v for k, v in result.items() if k != "recordings"}}
+                for w, result in replies  # type: ignore
+            ]
+        return merged
+
+    def get_recorder_summaries(self) -> list[RecordingSummary]:
+        result: list[RecordingSummary] = []
+        with self.__lock:
+            seq = self.__seq
+        active_keys: dict[WorkerHandle, set[str]] = {}
+        for worker, summaries in self.__request_all(CMD_SUMMARIES):
+            result.extend(summaries)
+            active_keys[worker] = {parse_summary_key(summary) for summary in summaries}
+        self.__prune_owners(active_keys, seq)
+        return result
+
+    def count_recordings(self) -> int:
+        return sum(load for _, load in self.__request_all(CMD_LOAD))
+
+    def record(self, state: LiveState):
+        key = parse_recording_key(state)
+        loads = self.__request_all(CMD_LOAD)
+        if len(loads) == 0:
+            raise ValueError("No recording worker is available")
+        # assign to the worker with the fewest active recordings
+        worker = min(loads, key=lambda item: (item[1], item[0].idx))[0]
+        with self.__lock:  # reserve the key, so concurrent requests cannot start it on two workers
+            if key in self.__owners:
+                log.info("Already Recording")
+                return
+            self.__owners[key] = worker
+        try:
+            worker.request(CMD_RECORD, state)
+        except Exception:
+            with self.__lock:
+                if self.__owners.get(key) is worker:
+                    del self.__owners[key]
+            raise
+        with self.__lock:
+            if self.__owners.get(key) is worker:
+                self.__seq += 1
+                self.__confirmed_seqs[key] = self.__seq
+
+    def cancel(self, state: LiveState):
+        with self.__lock:
+            worker = self.__owners.pop(parse_recording_key(state), None)
+            self.__confirmed_seqs.pop(parse_recording_key(state), None)
+        if worker is not None and worker.is_alive():
+            worker.request(CMD_CANCEL, state)
+            return
+        log.error("Not found recorder", state.model_dump(mode="json"))
+
+    def close(self):
+        with self.__lock:
+            workers = list(self.__workers)
+        threads = [threading.Thread(target=worker.close) for worker in workers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def __start_worker(self, idx: int) -> WorkerHandle:
+        parent_conn, child_conn = self.__ctx.Pipe()
+        process = self.__ctx.Process(
+            target=run_worker,
+            args=(idx, child_conn, self.__my_public_ip),
+            name=f"recording-worker:{idx}",
+            daemon=True,
+        )
+        process.start()
+        child_conn.close()  # keep only the worker's end open, so a dead worker surfaces as EOF
+        return WorkerHandle(idx, process, parent_conn)
+
+    def __live_workers(self) -> list[WorkerHandle]:  # restarts dead workers
+        dead: list[WorkerHandle] = []
+        with self.__lock:
+            for pos, worker in enumerate(self.__workers):
+                if worker.is_alive():
+                    continue
+                dead.append(worker)
+                self.__workers[pos] = self.__start_worker(worker.idx)
+                for key in [key for key, owner in self.__owners.items() if owner is worker]:
+                    del self.__owners[key]
+                    self.__confirmed_seqs.pop(key, None)
+            workers = list(self.__workers)
+        for worker in dead:
+            log.error("Recording worker died, restarted", {"worker_idx": worker.idx, "exitcode": worker.process.exitcode})
+            worker.discard()
+        return workers
+
+    def __request_all(self, cmd: str, payload=None) -> list[tuple[WorkerHandle, Any]]:  # skips dead workers
+        results = []
+        for worker in self.__live_workers():
+            try:
+                results.append((worker, worker.request(cmd, payload)))
+            except WorkerDeadError:
+                log.error("Recording worker is dead", {"worker_idx": worker.idx, "cmd": cmd})
+        return results
+
+    # Forgets finished recordings. Only keys confirmed before the summaries were requested are judged,
+    # since a recording started in between is legitimately missing from them.
+    def __prune_owners(self, active_keys: dict[WorkerHandle, set[str]], seq: int):
+        with self.__lock:
+            for key, worker in list(self.__owners.items()):
+                keys = active_keys.get(worker)
+                confirmed_seq = self.__confirmed_seqs.get(key)
+                if keys is None or confirmed_seq is None or confirmed_seq > seq or key in keys:
+                    continue
+                del self.__owners[key]
+                del self.__confirmed_seqs[key]
+
+
+def run_worker(idx: int, conn: Connection, my_public_ip: str):
+    env: Env = get_env()
+    redis_pools = RedisPoolRegistry(env.redis_master, env.redis_replica, env.redis_data)
+    scheduler = RecordingScheduler(env, my_public_ip, redis_pools)
+    attr = {"worker_idx": idx}
+    log.info("Recording worker started", attr)
+
+    next_refresh = time.monotonic()
+    while True:
+        if time.monotonic() >= next_refresh:
+            metric.refresh_gauges()
+            next_refresh = time.monotonic() + GAUGE_REFRESH_INTERVAL_SEC
+        if not conn.poll(GAUGE_REFRESH_INTERVAL_SEC):
+            continue
+        try:
+            cmd, payload = conn.recv()
+        except EOFError:
+            scheduler.close()
+            log.info("Recording worker stopped", attr)
+            return
+        try:
+            conn.send((True, handle_command(scheduler, redis_pools, cmd, payload)))
+        except Exception as ex:
+            log.error("Failed to handle worker command", {**attr, "cmd": cmd, **error_dict(ex)})
+            conn.send((False, str(ex)))
+
+
+def handle_command(scheduler: RecordingScheduler, redis_pools: RedisPoolRegistry, cmd: str, payload):
+    if cmd == CMD_RECORD:
+        return scheduler.record(payload)
+    elif cmd == CMD_CANCEL:
+        return scheduler.cancel(payload)
+    elif cmd == CMD_STATUS:
+        return asyncio.run(get_worker_status(scheduler, redis_pools, payload))
+    elif cmd == CMD_SUMMARIES:
+        return scheduler.get_recorder_summaries()
+    elif cmd == CMD_LOAD:
+        return scheduler.count_recordings()
+    else:
+        raise ValueError(f"Unknown worker command: {cmd}")
+
+
+async def get_worker_status(scheduler: RecordingScheduler, redis_pools: RedisPoolRegistry, payload: dict):
+    try:
+        return await scheduler.get_status(**payload)
+    finally:
+        await redis_pools.close_loop()  # asyncio.run gives every call a new loop
+
+
+def parse_summary_key(summary: RecordingSummary) -> str:
+    return f"{summary.platform.value}:{summary.channel_id}:{summary.video_name}"
@@ -0,0 +1,140 @@
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+
+from ...metric import metric
+
+UNLIMITED = 2**31
+# a recording has at most a few segment groups waiting at once (new segments, retries);
+# more waiters mean duplicate submissions, which are refused instead of queued
+MAX_WAITERS_PER_RECORDING = 4
+
+
+class SlotWaiter:
+    def __init__(self, record_id: str, deadline: float, want: int, seq: int):
+        self.record_id = record_id
+        self.deadline = deadline  # time.monotonic() by which the most urgent segment must be downloaded
+        self.want = want
+        self.seq = seq
+        self.loop = asyncio.get_running_loop()
+        self.future: asyncio.Future[int] = self.loop.create_future()
+        self.granted = 0
+
+    def __lt__(self, other: "SlotWaiter") -> bool:
+        return (self.deadline, self.seq) < (other.deadline, other.seq)
+
+
+# Node-wide cap on in-flight segment downloads, shared by every recording (and event loop) of the process.
+# Free slots go to the recording with the fewest in-flight downloads first, then to the earliest deadline.
+# A recording gets at most its fair share of the capacity at once, but a grant may cover several segments,
+# so a batch can still be downloaded in one request.
+# Waiters are queued per recording by deadline, so a dispatch only compares the head of each recording's queue.
+class SegmentScheduler:
+    def __init__(self, concurrency_limit: int | None):
+        self.__capacity = concurrency_limit
+        self.__in_use = 0
+        self.__in_flight: dict[str, int] = {}
+        self.__waiters: dict[str, list[SlotWaiter]] = {}  # record id -> heap of waiters
+        self.__seq = itertools.count()
+        self.__lock = threading.Lock()
+
+    # return granted slot count (>= 1), or 0 if the recording already has MAX_WAITERS_PER_RECORDING waiters
+    async def acquire(self, record_id: str, deadlines: list[float]) -> int:
+        if len(deadlines) == 0:
+            return 0
+        start = time.monotonic()
+        waiter = SlotWaiter(record_id, min(deadlines), len(deadlines), next(self.__seq))
+        with self.__lock:
+            queue = self.__waiters.setdefault(record_id, [])
+            if len(queue) >= MAX_WAITERS_PER_RECORDING:
+                return 0
+            heapq.heappush(queue, waiter)
+            granted = self.__dispatch()
+        self.__notify(granted)
+        try:
+            result = await waiter.future
+        except asyncio.CancelledError:
+            with self.__lock:
+                self.__remove_waiter(waiter)
+            if waiter.granted > 0:
+                self.release(record_id, waiter.granted)
+            raise
+        metric.set_segment_schedule_wait(time.monotonic() - start)
+        return result
+
+    def release(self, record_id: str, count: int = 1):
+        if count <= 0:
+            return
+        with self.__lock:
+            self.__in_use -= count
+            left = self.__in_flight.get(record_id, 0) - count
+            if left > 0:
+                self.__in_flight[record_id] = left
+            else:
+                self.__in_flight.pop(record_id, None)
+            granted = self.__dispatch()
+        self.__notify(granted)
+
+    def get_stats(self) -> dict:
+        with self.__lock:
+            return {
+                "capacity": self.__capacity,
+                "in_use": self.__in_use,
+                "waiting": sum(waiter.want for queue in self.__waiters.values() for waiter in queue),
+                "in_flight": dict(self.__in_flight),
+            }
+
+    def __dispatch(self) -> list[SlotWaiter]:  # caller holds the lock
+        granted = []
+        while len(self.__waiters) > 0:
+            free = self.__free()
+            if free <= 0:
+                break
+            heads = [queue[0] for queue in self.__waiters.values()]
+            waiter = min(heads, key=lambda w: (self.__in_flight.get(w.record_id, 0), w.deadline, w.seq))
+            in_flight = self.__in_flight.get(waiter.record_id, 0)
+            count = min(waiter.want, free, max(1, self.__fair_share() - in_flight))
+            queue = self.__waiters[waiter.record_id]
+            heapq.heappop(queue)
+            if len(queue) == 0:
+                del self.__waiters[waiter.record_id]
+            waiter.granted = count
+            self.__in_use += count
+            self.__in_flight[waiter.record_id] = in_flight + count
+            granted.append(waiter)
+        return granted
+
+    def __remove_waiter(self, waiter: SlotWaiter):  # caller holds the lock
+        queue = self.__waiters.get(waiter.record_id)
+        if queue is None or waiter not in queue:
+            return
+        queue.remove(waiter)
+        if len(queue) == 0:
+            del self.__waiters[waiter.record_id]
+        else:
+            heapq.heapify(queue)
+
+    def __notify(self, granted: list[SlotWaiter]):
+        for waiter in granted:
+            try:
+                waiter.loop.call_soon_threadsafe(resolve_waiter, waiter)
+            except RuntimeError:  # the waiter's loop is closed
+                self.release(waiter.record_id, waiter.granted)
+
+    def __free(self) -> int:
+        if self.__capacity is None:
+            return UNLIMITED
+        return self.__capacity - self.__in_use
+
+    def __fair_share(self) -> int:
+        if self.__capacity is None:
+            return UNLIMITED
+        recordings = set(self.__in_flight.keys()) | set(self.__waiters.keys())
+        return max(1, self.__capacity // max(1, len(recordings)))
+
+
+def resolve_waiter(waiter: SlotWaiter):
+    if not waiter.future.done():
+        waiter.future.set_result(waiter.granted)
@@ -0,0 +1,15 @@
+# Next playlist reload following the HLS reload rules (RFC 8216, 6.3.4):
+# wait one target duration after a reload that brought new segments, half of it after an unchanged one,
+# both measured from when the reload started.
+class PlaylistReloadPolicy:
+    def __init__(self, adaptive: bool, min_time_sec: float, changed_ratio: float, unchanged_ratio: float):
+        self.__adaptive = adaptive
+        self.__min_time_sec = min_time_sec
+        self.__changed_ratio = changed_ratio
+        self.__unchanged_ratio = unchanged_ratio
+
+    def wait_sec(self, elapsed_sec: float, target_duration: float | None, changed: bool) -> float:
+        interval_sec = self.__min_time_sec
+        if self.__adaptive and target_duration is not None and target_duration > 0:
+            interval_sec = target_duration * (self.__changed_ratio if changed else self.__unchanged_ratio)
+        return max(interval_sec - elapsed_sec, 0)
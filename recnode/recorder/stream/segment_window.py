@@ -0,0 +1,68 @@
+import math
+import time
+from enum import Enum
+
+# segments expiring within this many target durations are retried every interval at full parallelism
+URGENT_TARGET_DURATIONS = 2
+
+
+class RetryAction(Enum):
+    RETRY = "retry"
+    WAIT = "wait"
+    ABANDON = "abandon"
+
+
+# Estimates when each segment leaves the live window of one playlist reload:
+# the oldest segment rolls out after one target duration, the next after two, and so on.
+# Segments that are no longer in the playlist get a zero or negative remaining time (expired).
+class SegmentWindow:
+    def __init__(self, first_num: int, target_duration: float, now: float | None = None):
+        self.first_num = first_num
+        self.target_duration = target_duration
+        self.now = now if now is not None else time.monotonic()
+
+    def expires_at(self, num: int) -> float:  # time.monotonic() based
+        return self.now + (num - self.first_num + 1) * self.target_duration
+
+    def remaining_sec(self, num: int) -> float:
+        return self.expires_at(num) - self.now
+
+
+def create_segment_window(nums: list[int], durations: list[float], target_duration: float | None) -> SegmentWindow:
+    if target_duration is None or target_duration <= 0:
+        target_duration = max(durations)
+    return SegmentWindow(first_num=nums[0], target_duration=target_duration)
+
+
+# Paces retries of a recording's retrying segments by how long they can still be downloaded.
+# Urgent segments get the full parallel limit on every interval, segments with time to spare fewer parallel
+# requests at most once per target duration, and expired segments get a single request per interval during the grace
+# and are abandoned after it.
+class SegmentRetryPlanner:
+    def __init__(self, max_parallel_limit: int, expire_grace_sec: float):
+        self.__max_parallel_limit = max(1, max_parallel_limit)
+        self.__expire_grace_sec = expire_grace_sec
+        self.__next_retry_at: dict[int, float] = {}
+
+    def plan(self, num: int, window: SegmentWindow) -> tuple[RetryAction, int]:  # (action, parallel limit)
+        remaining = window.remaining_sec(num)
+        if remaining <= 0:  # left the playlist window
+            if remaining <= -self.__expire_grace_sec:
+                self.__next_retry_at.pop(num, None)
+                return RetryAction.ABANDON, 0
+            return RetryAction.RETRY, 1
+
+        urgent_sec = URGENT_TARGET_DURATIONS * window.target_duration
+        if remaining <= urgent_sec:
+            return RetryAction.RETRY, self.__max_parallel_limit
+
+        next_retry_at = self.__next_retry_at.get(num)
+        if next_retry_at is not None and window.now < next_retry_at:
+            return RetryAction.WAIT, 0
+        self.__next_retry_at[num] = window.now + window.target_duration
+        limit = math.ceil(self.__max_parallel_limit * urgent_sec / remaining)
+        return RetryAction.RETRY, min(max(limit, 1), self.__max_parallel_limit)
+
+    def retain(self, nums: set[int]):  # forget segments that are no longer retrying
+        for num in [num for num in self.__next_retry_at if num not in nums]:
+            del self.__next_retry_at[num]
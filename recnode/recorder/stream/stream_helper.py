@@ -19,6 +19,7 @@ from ...utils import random_string, FIREFOX_USER_AGENT, stem, get_streams
 
 OBJECT_TASK_NAME = "object"
 FILE_WAIT_SEC = 2
+PARTIAL_FILE_SUFFIX = ".part"  # segments being written by rust_request
 
 
 class StreamHelper:
@@ -159,7 +160,10 @@ class StreamHelper:
             log.debug("Detect And Write Segment", ctx_info)
             await self.write_segment(tar_path, ctx)
 
-        # Clear tmp dir
+        # Clear tmp dir (partial files of downloads aborted at the end of the recording are never completed)
+        for file_name in await aos.listdir(ctx.tmp_dir_path):
+            if file_name.endswith(PARTIAL_FILE_SUFFIX):
+                await aos.remove(path_join(ctx.tmp_dir_path, file_name))
         if len(await aos.listdir(ctx.tmp_dir_path)) == 0:
             await aos.rmdir(ctx.tmp_dir_path)
         tmp_channel_dir_path = dirpath(ctx.tmp_dir_path)
@@ -176,8 +180,8 @@ class StreamHelper:
 
         for retry_cnt in range(self.__write_retry_limit + 1):
             try:
-                with open(tmp_file_path, "rb") as f:
-                    await self.__writer.write(path_join(ctx.out_dir_path, filename(tmp_file_path)), f.read())
+                data = await asyncio.to_thread(read_file_bytes, tmp_file_path)
+                await self.__writer.write(path_join(ctx.out_dir_path, filename(tmp_file_path)), data)
                 break
             except Exception as e:
                 err = ctx.to_err(e, with_stream_url=False)
@@ -203,5 +207,14 @@ class StreamHelper:
 
 
 async def _get_seg_paths(ctx: RecordingContext) -> list[str]:
-    segment_names = [file_name for file_name in await aos.listdir(ctx.tmp_dir_path) if not file_name.endswith(".tar")]
+    segment_names = [
+        file_name
+        for file_name in await aos.listdir(ctx.tmp_dir_path)
+        if not file_name.endswith(".tar") and not file_name.endswith(PARTIAL_FILE_SUFFIX)
+    ]
     return [path_join(ctx.tmp_dir_path, seg_name) for seg_name in sorted(segment_names, key=lambda x: int(stem(x)))]
+
+
+def read_file_bytes(file_path: str) -> bytes:
+    with open(file_path, "rb") as f:
+        return f.read()
@@ -1,6 +1,7 @@
 import asyncio
 import threading
 from abc import ABC, abstractmethod
+from concurrent import futures
 
 from .stream_types import RecordingContext
 from ..schema.recording_arguments import RecordingArgs
@@ -25,7 +26,7 @@ class StreamRecorder(ABC):
         self._status: RecordingStatus = RecordingStatus.WAITING
 
         self._writer = writer
-        fetcher_http = AsyncHttpClient(
+        self._fetcher_http = AsyncHttpClient(
             timeout_sec=30,
             retry_limit=3,
             retry_delay_sec=0.5,
@@ -33,7 +34,7 @@ class StreamRecorder(ABC):
             print_error=True,
             proxy=proxy,
         )
-        self._fetcher = PlatformFetcher(fetcher_http)
+        self._fetcher = PlatformFetcher(self._fetcher_http)
         self._helper = StreamHelper(
             args=args,
             state=self._state,
@@ -45,18 +46,44 @@ class StreamRecorder(ABC):
         self.ctx: RecordingContext = self._helper.get_ctx(live)
         self.is_done = False
         self.recording_thread: threading.Thread | None = None
+        self.recording_future: futures.Future | None = None
 
     def record(self):
         self.recording_thread = threading.Thread(target=self.__record_with_thread)
         self.recording_thread.name = f"recording:{self.ctx.record_id}"
         self.recording_thread.start()
 
+    def record_on(self, loop: asyncio.AbstractEventLoop) -> futures.Future:
+        # run as a task on a loop shared with other recordings (see RecorderHost)
+        self.recording_future = asyncio.run_coroutine_threadsafe(self._record(), loop)
+        return self.recording_future
+
+    def join(self):
+        if self.recording_thread is not None:
+            self.recording_thread.join()
+        if self.recording_future is not None:
+            futures.wait([self.recording_future])
+
     def __record_with_thread(self):
-        asyncio.run(self._record())
+        asyncio.run(self.__record_on_own_loop())
+
+    async def __record_on_own_loop(self):
+        try:
+            await self._record()
+        finally:
+            await self._close_loop_resources()
 
     def cancel(self):
         self._state.cancel()
 
+    async def _close_http(self, *clients: AsyncHttpClient):
+        # must run on the recording loop, where the sessions were created
+        await asyncio.gather(self._fetcher_http.aclose(), *[client.aclose() for client in clients])
+
+    async def _close_loop_resources(self):
+        # called when the recording owned its event loop, right before the loop stops
+        pass
+
     @abstractmethod
     async def _record(self):
         pass
@@ -6,25 +6,40 @@ from datetime import datetime
 from aiofiles import os as aos
 from pyutils import log, path_join, error_dict, merge_query_string
 from redis.asyncio import Redis
-from streamlink.stream.hls.m3u8 import M3U8Parser, M3U8
-from streamlink.stream.hls.segment import HLSSegment
 
+from .playlist_reload import PlaylistReloadPolicy
+from .segment_window import SegmentRetryPlanner, SegmentWindow, RetryAction, create_segment_window
 from .stream_recorder import StreamRecorder
+from ..manager.segment_scheduler import SegmentScheduler
 from ..schema.recording_arguments import RecordingArgs
 from ..schema.recording_schema import RecordingStatus
 from ...config import RequestConfig, RedisDataConfig
 from ...data.live import LiveState, LiveStateService
-from ...data.segment import SegmentNumberSet, SegmentStateService, SegmentStateValidator, SegmentState
+from ...data.redis import RedisPoolRegistry, count_pool_connections
+from ...data.segment import (
+    SegmentNumberMirror,
+    SegmentNumberMirrorHub,
+    SegmentNumberSet,
+    SegmentNumberSetType,
+    SegmentStateCodec,
+    SegmentStateEncoding,
+    SegmentStateService,
+    SegmentStateStorage,
+    SegmentStateValidator,
+    SegmentState,
+    SegmentLock,
+    SegmentFailureState,
+)
 from ...file import ObjectWriter
 from ...metric import metric
-from ...utils import AsyncHttpClient, AsyncCounter, ProxyConnectorConfig, AsyncSet
+from ...utils import AsyncHttpClient, AsyncCounter, ProxyConnectorConfig, AsyncSet, parse_media_playlist
 
 TEST_FLAG = False
 # TEST_FLAG = True  # TODO: remove this line after testing
 
 MAP_NUM = -1
-FIRST_SEG_LOCK_NUM = 0
 SEG_TASK_PREFIX = "seg"
+SEG_TIMEOUT_LOCK_RATIO = 0.8
 
 
 class SegmentedStreamRecorder(StreamRecorder):
@@ -39,17 +54,31 @@ class SegmentedStreamRecorder(StreamRecorder):
         req_conf: RequestConfig,
         incomplete_dir_path: str,
         proxy: ProxyConnectorConfig | None,
+        seg_scheduler: SegmentScheduler | None = None,
+        num_mirror_hub: SegmentNumberMirrorHub | None = None,
+        redis_pools: RedisPoolRegistry | None = None,
     ):
         super().__init__(live, args, writer, incomplete_dir_path, proxy)
+        self.__seg_scheduler = seg_scheduler if seg_scheduler is not None else SegmentScheduler(None)
         self.__m3u8_retry_limit = req_conf.m3u8_retry_limit
         self.__seg_parallel_retry_limit = req_conf.seg_parallel_retry_limit
         self.__seg_failure_threshold_ratio = req_conf.seg_failure_threshold_ratio
         self.__interval_wait_weight_sec = req_conf.interval_wait_weight_sec
-        self.__interval_min_time_sec = req_conf.interval_min_time_sec
+        self.__reload_policy = PlaylistReloadPolicy(
+            adaptive=live.platform.value in req_conf.interval_adaptive_platforms,
+            min_time_sec=req_conf.interval_min_time_sec,
+            changed_ratio=req_conf.interval_changed_target_ratio,
+            unchanged_ratio=req_conf.interval_unchanged_target_ratio,
+        )
+        self.__retry_planner = SegmentRetryPlanner(
+            max_parallel_limit=self.__seg_parallel_retry_limit,
+            expire_grace_sec=req_conf.seg_retry_expire_grace_sec,
+        )
 
         self.__redis_master = redis_master
         self.__redis_replica = redis_replica
         self.__redis_data_conf = redis_data_conf
+        self.__redis_pools = redis_pools
 
         self.__idx = 0
         self.__done_flag = False
@@ -71,16 +100,39 @@ class SegmentedStreamRecorder(StreamRecorder):
             retry_delay_sec=0,
             print_error=False,
             proxy=proxy,
+            pool_max_idle_per_host=req_conf.http_pool_max_idle_per_host,
+            pool_idle_timeout_sec=req_conf.http_pool_idle_timeout_sec,
+            connect_timeout_sec=req_conf.http_connect_timeout_sec,
+            read_timeout_sec=req_conf.http_read_timeout_sec,
         )
+        # a stalled download must give up before its segment lock expires
+        seg_timeout_sec = min(req_conf.seg_timeout_sec, redis_data_conf.lock_expire_sec * SEG_TIMEOUT_LOCK_RATIO)
         self.__seg_http = AsyncHttpClient(
-            timeout_sec=req_conf.seg_timeout_sec,
+            timeout_sec=seg_timeout_sec,
             retry_limit=0,
             retry_delay_sec=0,
             print_error=False,
             proxy=proxy,
+            pool_max_idle_per_host=req_conf.http_pool_max_idle_per_host,
+            pool_idle_timeout_sec=req_conf.http_pool_idle_timeout_sec,
+            connect_timeout_sec=req_conf.http_connect_timeout_sec,
+            read_timeout_sec=req_conf.http_read_timeout_sec,
+            local_retry_limit=req_conf.seg_local_retry_limit,
+            local_retry_base_delay_sec=req_conf.seg_local_retry_base_delay_sec,
+            local_retry_max_delay_sec=req_conf.seg_local_retry_max_delay_sec,
         )
 
         self.__processing_nums: AsyncSet[int] = AsyncSet()
+        # segments submitted to the scheduler and not yet released; only touched on the recording loop
+        self.__pending_nums: set[int] = set()
+        self.__num_set_type = SegmentNumberSetType(redis_data_conf.seg_num_set_type)
+        self.__num_mirror: SegmentNumberMirror | None = None
+        if num_mirror_hub is not None:
+            self.__num_mirror = SegmentNumberMirror(
+                hub=num_mirror_hub,
+                live_record_id=self.__record_id,
+                attr=self.ctx.to_dict(),
+            )
         self.__retrying_nums = self.__create_num_seg("retrying")
         self.__success_nums = self.__create_num_seg("success")
         self.__failed_nums = self.__create_num_seg("failed")
@@ -92,6 +144,12 @@ class SegmentedStreamRecorder(StreamRecorder):
             lock_expire_sec=redis_data_conf.lock_expire_sec,
             retry_parallel_retry_limit=self.__seg_parallel_retry_limit,
             attr=self.ctx.to_dict(),
+            num_set_type=self.__num_set_type,
+            state_storage=SegmentStateStorage(redis_data_conf.seg_state_storage),
+            codec=SegmentStateCodec(
+                encoding=SegmentStateEncoding(redis_data_conf.seg_state_encoding),
+                url_prefix=None if self.ctx.stream_base_url is None else f"{self.ctx.stream_base_url}/",
+            ),
         )
         self.__live_service = LiveStateService(master=redis_master, replica=redis_replica)
         self.__seg_validator = SegmentStateValidator(
@@ -127,8 +185,9 @@ class SegmentedStreamRecorder(StreamRecorder):
         }
         if full:
             result["processing_nums"] = ",".join(processing_nums)
-            result["redis_using_connection_count"] = len(self.__redis_master.connection_pool._in_use_connections)
-            result["redis_available_connection_count"] = len(self.__redis_master.connection_pool._available_connections)
+            in_use, available = count_pool_connections(self.__redis_master.connection_pool)
+            result["redis_using_connection_count"] = in_use
+            result["redis_available_connection_count"] = available
         return result
 
     async def __check_status(self):
@@ -143,6 +202,8 @@ class SegmentedStreamRecorder(StreamRecorder):
         # Start recording
         log.info("Start Recording", self.ctx.to_dict(with_stream_url=True))
         await aos.makedirs(self.__tmp_dpath, exist_ok=True)
+        if self.__num_mirror is not None:
+            self.__num_mirror.start()
 
         # if TEST_FLAG:
         #     _ = asyncio.create_task(self.__check_status())
@@ -172,6 +233,16 @@ class SegmentedStreamRecorder(StreamRecorder):
             log.error("Error during closing recording", self.ctx.to_err(e))
         self.is_done = True
 
+    async def _close_loop_resources(self):
+        # the loop dies with the recording thread, so its pools must be closed here or their sockets leak
+        if self.__redis_pools is not None:
+            await self.__redis_pools.close_loop()
+            return
+        await asyncio.gather(
+            self.__redis_master.connection_pool.aclose(),
+            self.__redis_replica.connection_pool.aclose(),
+        )
+
     async def __interval(self, is_init: bool = False):
         start_time = asyncio.get_event_loop().time()
         await self.__renew()
@@ -191,35 +262,34 @@ class SegmentedStreamRecorder(StreamRecorder):
                 self.__done_flag = True
             return
 
-        playlist: M3U8 = M3U8Parser().parse(m3u8_text)
+        playlist = parse_media_playlist(m3u8_text)
         if playlist.is_master:
             raise ValueError("Expected a media playlist, got a master playlist")
-        raw_segments: list[HLSSegment] = playlist.segments
-        if len(raw_segments) == 0:
+        if len(playlist.nums) == 0:
             raise ValueError("No segments found in the playlist")
 
         # If the first segment has a map, download it
-        map_seg = raw_segments[0].map
-        if is_init and map_seg is not None:
-            map_url = map_seg.uri
+        if is_init and playlist.map_uri is not None:
+            map_url = playlist.map_uri
             if self.ctx.stream_base_url is not None:
-                map_url = "/".join([self.ctx.stream_base_url, map_seg.uri])
+                map_url = "/".join([self.ctx.stream_base_url, playlist.map_uri])
 
             file_path = path_join(self.__tmp_dpath, f"{MAP_NUM}.ts")
             await self.__seg_http.request_file(url=map_url, file_path=file_path, attr=self.ctx.to_dict())
 
         segments = []
         now = datetime.now()
-        for raw_seg in raw_segments:
+        window = create_segment_window(playlist.nums, playlist.durations, playlist.target_duration)
+        for num, uri, duration in zip(playlist.nums, playlist.uris, playlist.durations):
             if self.ctx.stream_base_url is not None:
-                seg_url = "/".join([self.ctx.stream_base_url, raw_seg.uri])
+                seg_url = "/".join([self.ctx.stream_base_url, uri])
             else:  # twitch
-                seg_url = raw_seg.uri
+                seg_url = uri
 
             if self.ctx.stream_params is not None:
                 seg_url = merge_query_string(seg_url, self.ctx.stream_params, overwrite=True, url_encode=False)
 
-            segments.append(SegmentState.new(url=seg_url, num=raw_seg.num, duration=raw_seg.duration, now=now))
+            segments.append(SegmentState.new(url=seg_url, num=num, duration=duration, now=now))
 
         latest_num = await self.__success_nums.get_highest(use_master=False)
 
@@ -237,19 +307,37 @@ class SegmentedStreamRecorder(StreamRecorder):
             self._status = RecordingStatus.RECORDING
 
         # Process segments
-        for new_seg in segments:
-            if self.__processing_nums.contains(new_seg.num):
-                continue
-            task_name = self.seg_task_name("req", new_seg.num)
-            _ = asyncio.create_task(self.__process_segment(new_seg, latest_num), name=task_name)
+        # settled segments are filtered with replica (or mirror) reads, so they do not cost a master script call each
+        # the acquire script still checks the skip sets on the master
+        settled_nums: set[int] = set()
+        for nums in await asyncio.gather(
+            *[
+                num_set.range(playlist.nums[0], playlist.nums[-1], use_master=False)
+                for num_set in [self.__success_nums, self.__failed_nums, self.__retrying_nums]
+            ]
+        ):
+            settled_nums.update(nums)
+        new_segs = [seg for seg in segments if seg.num not in settled_nums]
+        self.__submit_segments("req", new_segs, latest_num, window)
 
         # If the first segment is not MAP_NUM, it means it is a valid segment
         retry_nums = await self.__retrying_nums.all(use_master=False)
-        for retrying in await self.__seg_service.get_batch(retry_nums, use_master=False):
-            if self.__processing_nums.contains(retrying.num):
+        self.__retry_planner.retain(set(retry_nums))
+        retrying_segs = []
+        abandoned_segs = []
+        for seg in await self.__seg_service.get_batch(retry_nums, use_master=False):
+            if seg.num in self.__pending_nums:
                 continue
-            task_name = self.seg_task_name("retry", retrying.num)
-            _ = asyncio.create_task(self.__process_segment(retrying, latest_num), name=task_name)
+            action, parallel_limit = self.__retry_planner.plan(seg.num, window)
+            if action == RetryAction.RETRY:
+                seg.parallel_limit = parallel_limit
+                retrying_segs.append(seg)
+            elif action == RetryAction.ABANDON:
+                abandoned_segs.append(seg)
+        self.__submit_segments("retry", retrying_segs, latest_num, window)
+        if len(abandoned_segs) > 0:
+            task_name = self.seg_task_name("abandon", abandoned_segs[0].num)
+            _ = asyncio.create_task(self.__abandon_segments(abandoned_segs, window), name=task_name)
 
         # Upload segments tar
         tgt_seg_paths = await self._helper.check_segments(self.ctx)
@@ -257,94 +345,143 @@ class SegmentedStreamRecorder(StreamRecorder):
             tar_path = await asyncio.to_thread(self._helper.archive_files, tgt_seg_paths, self.__tmp_dpath)
             self._helper.start_write_segment_task(tar_path, self.ctx)
 
-        self.__idx = raw_segments[-1].num
+        changed = is_init or playlist.nums[-1] != self.__idx
+        self.__idx = playlist.nums[-1]
 
         if playlist.is_endlist:
             self.__done_flag = True
             return
 
-        exc_duration = cur_duration(start_time)
-        wait_sec = 0
-        if exc_duration < self.__interval_min_time_sec:
-            wait_sec += self.__interval_min_time_sec - exc_duration
+        wait_sec = self.__reload_policy.wait_sec(cur_duration(start_time), playlist.target_duration, changed)
         # to prevent segment requests from being concentrated on a specific node
         wait_sec += random.uniform(0, self.__interval_wait_weight_sec)
         await asyncio.sleep(wait_sec)
         metric.set_interval_duration(cur_duration(start_time), self.__pf)
 
-    async def __process_segment(self, seg: SegmentState, latest_num: int | None):
-        if seg.num == MAP_NUM:
-            raise ValueError(f"{MAP_NUM} is not a valid segment number")
-
-        process_start = asyncio.get_event_loop().time()
+    def __submit_segments(self, kind: str, segs: list[SegmentState], latest_num: int | None, window: SegmentWindow):
+        # a segment waiting for a slot or downloading is not submitted again by later intervals
+        segs = [seg for seg in segs if seg.num not in self.__pending_nums]
+        if len(segs) == 0:
+            return
+        self.__pending_nums.update(seg.num for seg in segs)
+        task_name = self.seg_task_name(kind, segs[0].num)
+        _ = asyncio.create_task(self.__process_segments(segs, latest_num, window), name=task_name)
+
+    async def __process_segments(self, segs: list[SegmentState], latest_num: int | None, window: SegmentWindow):
+        # segments closest to leaving the playlist window are the most urgent
+        remaining = sorted(segs, key=lambda seg: seg.num)
+        batches = []
+        try:
+            while len(remaining) > 0:
+                # wait for node-wide download slots; each grant is downloaded as one batch
+                deadlines = [window.expires_at(seg.num) for seg in remaining]
+                count = await self.__seg_scheduler.acquire(self.__record_id, deadlines)
+                if count == 0:  # too many waiters for this recording, the next interval submits the rest again
+                    break
+                batch, remaining = remaining[:count], remaining[count:]
+                batches.append(asyncio.create_task(self.__process_batch(batch, latest_num)))
+        finally:
+            self.__pending_nums.difference_update(seg.num for seg in remaining)
+        await asyncio.gather(*batches)
 
+    async def __process_batch(self, segs: list[SegmentState], latest_num: int | None):
+        released = 0
         try:
-            coroutines = [
-                self.__success_nums.contains(seg.num, use_master=False),
-                self.__failed_nums.contains(seg.num, use_master=False),
-            ]
-            if not seg.is_retrying:
-                coroutines.append(self.__retrying_nums.contains(seg.num, use_master=False))
-                coroutines.append(
-                    self.__seg_service.is_locked(seg_num=seg.num, lock_num=FIRST_SEG_LOCK_NUM, use_master=False)
-                )
-            if any(await asyncio.gather(*coroutines)):
+            locks = await asyncio.gather(*[self.__acquire_segment(seg, latest_num) for seg in segs])
+            targets = [(seg, lock) for seg, lock in zip(segs, locks) if lock is not None]
+            released += len(segs) - len(targets)
+            self.__seg_scheduler.release(self.__record_id, len(segs) - len(targets))
+            if len(targets) == 0:
                 return
 
-            inspected = await self.__seg_validator.validate_segment(seg, latest_num, self.__success_nums)
-            if not inspected.ok:
-                duration = cur_duration(process_start)
-                if duration > self.__redis_data_conf.lock_expire_sec:
-                    attr = self.ctx.to_dict()
-                    attr["seg_num"] = seg.num
-                    attr["duration"] = duration
-                    log.error("Failed to validate segment: timeout", attr)
-                    return
+            # Download all locked segments of this batch in a single request
+            jobs = [(seg.url, path_join(self.__tmp_dpath, f"{seg.num}.ts")) for seg, _ in targets]
+            req_start = asyncio.get_event_loop().time()
+            tasks = []
+            done_idxes = set()
+            try:
+                # every granted segment gets a download slot, so none of them waits out its timeout in the rust queue
+                results = self.__seg_http.request_files(jobs, attr=self.ctx.to_dict(), concurrency=len(jobs))
+                async for idx, size, meta, err, duration in results:
+                    done_idxes.add(idx)
+                    released += 1
+                    self.__seg_scheduler.release(self.__record_id)
+                    seg, lock = targets[idx]
+                    if meta is not None:
+                        metric.set_segment_response_meta(meta, self.__pf)
+                    tasks.append(asyncio.create_task(self.__complete_segment(seg, lock, duration, size, err)))
+            except Exception as ex:
+                log.error("Failed to request segments", self.__error_attr(ex))
+                duration = cur_duration(req_start)
+                for idx, (seg, lock) in enumerate(targets):
+                    if idx not in done_idxes:
+                        tasks.append(asyncio.create_task(self.__complete_segment(seg, lock, duration, 0, ex)))
+            await asyncio.gather(*tasks)
+        finally:
+            self.__seg_scheduler.release(self.__record_id, len(segs) - released)
+            self.__pending_nums.difference_update(seg.num for seg in segs)
+
+    async def __abandon_segments(self, segs: list[SegmentState], window: SegmentWindow):
+        for seg in segs:
+            try:
+                retry_count = await self.__seg_service.abandon_retry(
+                    state=seg,
+                    retrying_nums=self.__retrying_nums,
+                    failed_nums=self.__failed_nums,
+                )  # master +1
+            except Exception as ex:
+                log.error("Failed to abandon segment", self.__error_attr(ex, num=seg.num))
+                continue
+            if retry_count is not None:
+                attr = self.ctx.to_dict({"num": seg.num, "first_num": window.first_num, "retry_count": retry_count})
+                log.error("Segment left the playlist window", attr)
+                await asyncio.gather(
+                    metric.inc_segment_request_failures(self.__pf, self.__seg_failure_counter),
+                    metric.set_segment_request_retry(retry_count, self.__pf, self.__seg_retry_hist),
+                )
+
+    async def __acquire_segment(self, seg: SegmentState, latest_num: int | None) -> SegmentLock | None:
+        # failures are handled per segment, so they never discard the locks acquired for the rest of the batch
+        try:
+            if seg.num == MAP_NUM:
+                raise ValueError(f"{MAP_NUM} is not a valid segment number")
 
+            inspected = self.__seg_validator.validate_segment_num(seg, latest_num)
+            if not inspected.ok:
                 if inspected.critical:
                     self._status = RecordingStatus.FAILED
-                    await self.__live_service.update_is_invalid(record_id=self.__record_id, is_invalid=True)
                     self.__done_flag = True
-                return
-        except Exception as ex:
-            log.error("Failed to check segment", self.__error_attr(ex, num=seg.num))
-            return
+                    await self.__live_service.update_is_invalid(record_id=self.__record_id, is_invalid=True)
+                return None
 
-        try:
-            lock = await self.__seg_service.acquire_lock(seg)  # master +1
+            skip_sets = [self.__success_nums, self.__failed_nums]
+            if not seg.is_retrying:
+                skip_sets.append(self.__retrying_nums)
+            lock = await self.__seg_service.try_acquire(seg, skip_sets)  # master +1
         except Exception as ex:
             log.error("Failed to acquire segment lock", self.__error_attr(ex, num=seg.num))
-            return
+            return None
         if lock is None:
             # log.debug(f"Failed to acquire segment {seg.num}")
-            return
+            return None
         # log.debug(f"{lock}")
 
         await self.__processing_nums.add(seg.num)
+        await self.__seg_request_counter.increment()
+        return lock
 
-        req_start = asyncio.get_event_loop().time()
+    async def __complete_segment(
+        self,
+        seg: SegmentState,
+        lock: SegmentLock,
+        duration: float,
+        size: int,
+        err: BaseException | None,
+    ):
         try:
-            if not seg.is_retrying:
-                ok = await self.__seg_service.set_seg(seg, nx=True)  # master +1
-                if not ok:
-                    # log.debug("Segment already exists", self.ctx.to_dict({"num": seg.num}))
-                    return
-            else:
-                await self.__seg_service.increment_retry_count(seg.num)  # master +1~2
-            await self.__seg_request_counter.increment()
-
-            # await asyncio.sleep(4)
-            # if TEST_FLAG:  # TODO: remove (only for test)
-            #     if random.random() < 0.7:
-            #         raise ValueError("Simulated error")
-
-            file_path = path_join(self.__tmp_dpath, f"{seg.num}.ts")
-            attr = self.ctx.to_dict({"num": seg.num})
-            size = await self.__seg_http.request_file(url=seg.url, file_path=file_path, attr=attr)
-            await metric.set_segment_request_duration(cur_duration(req_start), self.__pf, self.__seg_duration_hist)
-
-            if await self.__success_nums.contains(seg.num, use_master=False):
-                return
+            if err is not None:
+                raise err
+            await metric.set_segment_request_duration(duration, self.__pf, self.__seg_duration_hist)
 
             try:
                 await self.__on_segment_request_success(seg, size=size)
@@ -352,58 +489,51 @@ class SegmentedStreamRecorder(StreamRecorder):
                 log.error("Failed to success process", self.__error_attr(ex, num=seg.num))
         except Exception as ex:
             try:
-                await self.__on_segment_request_failure(seg, req_start, ex)
+                await self.__on_segment_request_failure(seg, duration, ex)
             except Exception as ex:
                 log.error("Failed to failure process", self.__error_attr(ex, num=seg.num))
         finally:
-            await self.__processing_nums.remove(seg.num)
-            try:
-                await self.__seg_service.release_lock(lock)  # master +2
-            except BaseException as ex:
-                attr = self.__error_attr(ex)
-                attr["seg_num"] = seg.num
-                attr["lock_num"] = lock.lock_num
-                attr["duration"] = cur_duration(req_start)
-                log.error("Failed to release segment lock", attr)
+            await self.__release_segment(seg, lock, duration)
 
-    async def __on_segment_request_success(self, seg: SegmentState, size: int):
-        if seg.is_retrying:
-            retry_count = await self.__seg_service.get_retry_count(seg.num, use_master=False)
-            await metric.set_segment_request_retry(retry_count, self.__pf, self.__seg_retry_hist)
-        async with self.__success_nums.lock():  # master +2
-            await self.__success_nums.set_num(seg.num)  # master +1
-        await asyncio.gather(
-            self.__seg_service.update_to_success(state=seg, size=size),  # master +1
-            self.__seg_service.clear_retry_count(seg.num),  # master +0~1
-            self.__retrying_nums.remove(seg.num),  # master +0~1
-            self.__failed_nums.remove(seg.num),  # master +0~1
-        )
+    async def __release_segment(self, seg: SegmentState, lock: SegmentLock, duration: float):
+        await self.__processing_nums.remove(seg.num)
+        try:
+            await self.__seg_service.release_lock(lock)  # master +1
+        except BaseException as ex:
+            attr = self.__error_attr(ex)
+            attr["seg_num"] = seg.num
+            attr["lock_num"] = lock.lock_num
+            attr["duration"] = duration
+            log.error("Failed to release segment lock", attr)
 
-    async def __on_segment_request_failure(self, seg: SegmentState, req_start: float, ex: BaseException):
-        await metric.set_segment_request_duration(cur_duration(req_start), self.__pf, self.__seg_duration_hist)
-
-        if not seg.is_retrying:  # failed to first request:
-            async with self.__success_nums.lock():  # master +2
-                if not await self.__success_nums.contains(seg.num, use_master=True):  # master +1
-                    await asyncio.gather(
-                        self.__seg_service.update_to_retrying(seg),  # master +1
-                        self.__retrying_nums.set_num(seg.num),  # master +1
-                    )
-        else:  # failed to retry request:
-            retry_count = await self.__seg_service.get_retry_count(seg.num, use_master=False)
-            if retry_count >= (self.__seg_parallel_retry_limit * self.__seg_failure_threshold_ratio):
-                async with self.__success_nums.lock():  # master +2
-                    if not await self.__success_nums.contains(seg.num, use_master=True):  # master +1
-                        await asyncio.gather(
-                            self.__failed_nums.set_num(seg.num),  # master +1
-                            metric.inc_segment_request_failures(self.__pf, self.__seg_failure_counter),
-                        )
-                        log.error("Failed to process segment", self.__error_attr(ex, num=seg.num))
-                await asyncio.gather(
-                    self.__retrying_nums.remove(seg.num),  # master +1
-                    self.__seg_service.clear_retry_count(seg.num),  # master +1
-                    metric.set_segment_request_retry(retry_count, self.__pf, self.__seg_retry_hist),
-                )
+    async def __on_segment_request_success(self, seg: SegmentState, size: int):
+        retry_count = await self.__seg_service.commit_success(
+            state=seg,
+            size=size,
+            success_nums=self.__success_nums,
+            retrying_nums=self.__retrying_nums,
+            failed_nums=self.__failed_nums,
+        )  # master +1
+        if retry_count is not None and seg.is_retrying:
+            # retry_count holds the failed retries, +1 for this successful one
+            await metric.set_segment_request_retry(retry_count + 1, self.__pf, self.__seg_retry_hist)
+
+    async def __on_segment_request_failure(self, seg: SegmentState, duration: float, ex: BaseException):
+        await metric.set_segment_request_duration(duration, self.__pf, self.__seg_duration_hist)
+
+        state, retry_count = await self.__seg_service.record_failure(
+            state=seg,
+            threshold=self.__seg_parallel_retry_limit * self.__seg_failure_threshold_ratio,
+            success_nums=self.__success_nums,
+            retrying_nums=self.__retrying_nums,
+            failed_nums=self.__failed_nums,
+        )  # master +1
+        if state == SegmentFailureState.FAILED:
+            log.error("Failed to process segment", self.__error_attr(ex, num=seg.num))
+            await asyncio.gather(
+                metric.inc_segment_request_failures(self.__pf, self.__seg_failure_counter),
+                metric.set_segment_request_retry(retry_count, self.__pf, self.__seg_retry_hist),
+            )
 
     async def __close_recording(self):
         current_task = asyncio.current_task()
@@ -414,6 +544,9 @@ class SegmentedStreamRecorder(StreamRecorder):
             if task.get_name().startswith(f"{SEG_TASK_PREFIX}:{self.__record_id}"):
                 tgt_tasks.append(task)
         await asyncio.gather(*tgt_tasks)
+        if self.__num_mirror is not None:
+            await self.__num_mirror.stop()
+        await self._close_http(self.__m3u8_http, self.__seg_http)
         await self._helper.check_tmp_dir(self.ctx)
 
     def __error_attr(self, ex: BaseException, num: int | None = None):
@@ -431,16 +564,13 @@ class SegmentedStreamRecorder(StreamRecorder):
             live_record_id=self.__record_id,
             key_suffix=suffix,
             seg_expire_sec=self.__redis_data_conf.seg_expire_sec,
-            lock_expire_sec=self.__redis_data_conf.lock_expire_sec,
-            lock_wait_timeout_sec=self.__redis_data_conf.lock_wait_sec,
             attr=self.ctx.to_dict(),
+            mirror=self.__num_mirror,
+            set_type=self.__num_set_type,
         )
 
     async def __renew(self):
-        co1 = self.__retrying_nums.renew()
-        co2 = self.__success_nums.renew()
-        co3 = self.__failed_nums.renew()
-        await asyncio.gather(co1, co2, co3)
+        await self.__seg_service.renew([self.__retrying_nums, self.__success_nums, self.__failed_nums])
 
     def seg_task_name(self, sub_name: str, num: int) -> str:
         return f"{SEG_TASK_PREFIX}:{self.__record_id}:{sub_name}:{num}"
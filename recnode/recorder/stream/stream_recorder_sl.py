@@ -121,4 +121,5 @@ class StreamlinkStreamRecorder(StreamRecorder):
             stream.close()
             stream.worker.join()
             stream.writer.join()
+        await self._close_http(self.http)
         await self._helper.check_tmp_dir(self.ctx)
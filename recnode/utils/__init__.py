@@ -3,8 +3,9 @@ import sys
 
 from .async_types import *
 from .http import FIREFOX_USER_AGENT, fetch_my_public_ip
-from .http_async import AsyncHttpClient, AsyncHttpClientMock, ProxyConnectorConfig
-from .errors import HttpError, HttpRequestError
+from .http_async import AsyncHttpClient, AsyncHttpClientMock, ProxyConnectorConfig, ResponseMeta
+from .errors import HttpError, HttpRequestError, HttpRequestTimeoutError
+from .m3u8 import MediaPlaylist, parse_media_playlist
 from .path import *
 from .streamlink import *
 from .string import random_string
@@ -14,6 +15,7 @@ targets = [
     "errors",
     "http",
     "http_async",
+    "m3u8",
     "path",
     "streamlink",
     "string",
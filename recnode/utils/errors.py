@@ -33,3 +33,8 @@ class HttpRequestError(HttpError):
             method=res.method,
             reason=res.reason,
         )
+
+
+class HttpRequestTimeoutError(HttpRequestError):
+    def __init__(self, message: str, url: str | None = None, method: str | None = None):
+        super().__init__(message=message, status=504, url=url, method=method, reason="Timeout")
@@ -1,16 +1,24 @@
 import asyncio
 from enum import Enum
-from typing import Any
+from typing import Any, AsyncIterator, Protocol
 
 import aiofiles
 import aiohttp
-from aiohttp import BaseConnector, ClientTimeout
+from aiohttp import BaseConnector, ClientSession, ClientTimeout, TCPConnector
 from aiohttp_socks import ProxyConnector, ProxyType
 import rust_request
 from pydantic import BaseModel
 from pyutils import log, error_dict
 
-from .errors import HttpRequestError
+from .errors import HttpRequestError, HttpRequestTimeoutError
+
+DEFAULT_POOL_MAX_IDLE_PER_HOST = 32
+DEFAULT_POOL_IDLE_TIMEOUT_SEC = 90
+DEFAULT_BATCH_CONCURRENCY = 16
+DEFAULT_CONN_LIMIT = 100
+DEFAULT_DNS_CACHE_TTL_SEC = 300
+DEFAULT_LOCAL_RETRY_BASE_DELAY_SEC = 0.1
+DEFAULT_LOCAL_RETRY_MAX_DELAY_SEC = 1.0
 
 
 class ReturnType(Enum):
@@ -19,6 +27,13 @@ class ReturnType(Enum):
     RAW = "raw"
 
 
+class ResponseMeta(Protocol):
+    headers: dict[str, str]  # selected response headers (lowercase names)
+    ttfb_sec: float
+    transfer_sec: float
+    retries: int  # local retries done inside rust_request before this response
+
+
 class ProxyConnectorConfig(BaseModel):
     proxy_type: ProxyType
     host: str
@@ -37,6 +52,15 @@ class AsyncHttpClient:
         use_backoff: bool = False,
         print_error: bool = True,
         proxy: ProxyConnectorConfig | None = None,
+        pool_max_idle_per_host: int = DEFAULT_POOL_MAX_IDLE_PER_HOST,
+        pool_idle_timeout_sec: float = DEFAULT_POOL_IDLE_TIMEOUT_SEC,
+        connect_timeout_sec: float | None = None,
+        read_timeout_sec: float | None = None,
+        conn_limit: int = DEFAULT_CONN_LIMIT,
+        dns_cache_ttl_sec: int = DEFAULT_DNS_CACHE_TTL_SEC,
+        local_retry_limit: int = 0,
+        local_retry_base_delay_sec: float = DEFAULT_LOCAL_RETRY_BASE_DELAY_SEC,
+        local_retry_max_delay_sec: float = DEFAULT_LOCAL_RETRY_MAX_DELAY_SEC,
     ):
         self.__retry_limit = retry_limit
         self.__retry_delay_sec = retry_delay_sec
@@ -45,6 +69,25 @@ class AsyncHttpClient:
         self.__headers = {}
         self.__print_error = print_error
         self.__proxy_connector_config = proxy
+        self.__conn_limit = conn_limit
+        self.__dns_cache_ttl_sec = dns_cache_ttl_sec
+        # created lazily: a session is bound to the event loop it was created on, so there is one per loop
+        self.__sessions: dict[asyncio.AbstractEventLoop, ClientSession] = {}
+        # reused by request_file/request_file_text to keep connections alive between segment requests
+        self.__rust_client = rust_request.HttpClient(  # type: ignore
+            pool_max_idle_per_host=pool_max_idle_per_host,
+            pool_idle_timeout_sec=pool_idle_timeout_sec,
+            proxy_url=get_rust_proxy_url(proxy) if proxy is not None else None,
+            proxy_username=proxy.username if proxy is not None else None,
+            proxy_password=proxy.password if proxy is not None else None,
+            timeout_sec=timeout_sec,
+            connect_timeout_sec=connect_timeout_sec,
+            read_timeout_sec=read_timeout_sec,
+            # transient failures (connection reset, 5xx, timeout) of request_file/request_files are retried in rust
+            retry_limit=local_retry_limit,
+            retry_base_delay_sec=local_retry_base_delay_sec,
+            retry_max_delay_sec=local_retry_max_delay_sec,
+        )
 
     def set_headers(self, headers: dict):
         for k, v in headers.items():
@@ -52,9 +95,9 @@ class AsyncHttpClient:
                 raise ValueError(f"Header {k} already set")
             self.__headers[k] = v
 
-    def __proxy_connector(self) -> BaseConnector | None:
+    def __connector(self) -> BaseConnector:
         if self.__proxy_connector_config is None:
-            return None
+            return TCPConnector(limit=self.__conn_limit, ttl_dns_cache=self.__dns_cache_ttl_sec)
 
         return ProxyConnector(
             proxy_type=ProxyType.SOCKS5,
@@ -63,8 +106,34 @@ class AsyncHttpClient:
             username=self.__proxy_connector_config.username,
             password=self.__proxy_connector_config.password,
             rdns=self.__proxy_connector_config.rdns,
+            limit=self.__conn_limit,
+            ttl_dns_cache=self.__dns_cache_ttl_sec,
         )
 
+    def __get_session(self) -> ClientSession:
+        loop = asyncio.get_running_loop()
+        session = self.__sessions.get(loop)
+        if session is None or session.closed:
+            # sessions of closed loops cannot be closed anymore: drop them (aiohttp warns about them when collected)
+            for session_loop in [lp for lp in self.__sessions if lp.is_closed()]:
+                del self.__sessions[session_loop]
+            session = ClientSession(timeout=self.__timeout, connector=self.__connector())
+            self.__sessions[loop] = session
+        return session
+
+    async def aclose(self):
+        loop = asyncio.get_running_loop()
+        sessions = self.__sessions
+        self.__sessions = {}
+        for session_loop, session in sessions.items():
+            if session.closed:
+                continue
+            # a session is closed on its own loop; the sessions of stopped loops are only dropped
+            if session_loop is loop:
+                await session.close()
+            elif session_loop.is_running():
+                await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(session.close(), session_loop))
+
     async def get_text(
         self,
         url: str,
@@ -150,11 +219,15 @@ class AsyncHttpClient:
     async def request_file_text(self, url: str, attr: dict | None = None) -> str:
         start = asyncio.get_event_loop().time()
         try:
-            status, _, content = await rust_request.request_file(url, self.__headers, None, True)  # type: ignore
+            # the body goes straight into a str, without an intermediate bytes object (text is None if status >= 400)
+            status, _, text = await self.__rust_client.request_text(url, self.__headers)  # type: ignore
             if status >= 400:
                 log.error("Failed to request", get_err_dict(url, start, attr, status=status))
                 raise HttpRequestError("Failed to request", status)
-            return content.decode("utf-8")
+            return text
+        except rust_request.RequestTimeoutError as ex:  # type: ignore
+            log.error("Request timeout", get_err_dict(url, start, attr, status=504))
+            raise HttpRequestTimeoutError("Request timeout", url) from ex
         except RuntimeError as ex:
             log.error("Failed to request", get_err_dict(url, start, attr, status=500))
             raise HttpRequestError("Failed to request", 500) from ex
@@ -162,15 +235,46 @@ class AsyncHttpClient:
     async def request_file(self, url: str, file_path: str | None, attr: dict | None = None) -> int:
         start = asyncio.get_event_loop().time()
         try:
-            status, size, _ = await rust_request.request_file(url, self.__headers, file_path, False)  # type: ignore
+            status, size, _, _ = await self.__rust_client.request_file(url, self.__headers, file_path, False)  # type: ignore
             if status >= 400:
                 log.error("Failed to request", get_err_dict(url, start, attr, status=status))
                 raise HttpRequestError("Failed to request", status)
             return size
+        except rust_request.RequestTimeoutError as ex:  # type: ignore
+            log.error("Request timeout", get_err_dict(url, start, attr, status=504))
+            raise HttpRequestTimeoutError("Request timeout", url) from ex
         except RuntimeError as ex:
             log.error("Failed to request", get_err_dict(url, start, attr, status=500))
             raise HttpRequestError("Failed to request", 500) from ex
 
+    async def request_files(
+        self,
+        jobs: list[tuple[str, str]],  # (url, file_path)
+        attr: dict | None = None,
+        concurrency: int = DEFAULT_BATCH_CONCURRENCY,
+    ) -> AsyncIterator[tuple[int, int, ResponseMeta | None, HttpRequestError | None, float]]:
+        # yields (job index, size, meta, error, duration): duration is measured per job, from its download slot to the result
+        results = self.__rust_client.request_files(jobs, self.__headers, concurrency)  # type: ignore
+        try:
+            async for idx, status, size, err_msg, is_timeout, meta, elapsed_sec in results:
+                url = jobs[idx][0]
+                start = asyncio.get_event_loop().time() - elapsed_sec
+                if err_msg is not None:
+                    if is_timeout:
+                        log.error("Request timeout", get_err_dict(url, start, attr, status=504))
+                        yield idx, 0, None, HttpRequestTimeoutError("Request timeout", url), elapsed_sec
+                    else:
+                        log.error("Failed to request", get_err_dict(url, start, attr, status=500))
+                        yield idx, 0, None, HttpRequestError(f"Failed to request: {err_msg}", 500, url), elapsed_sec
+                elif status >= 400:
+                    log.error("Failed to request", get_err_dict(url, start, attr, status=status))
+                    yield idx, size, meta, HttpRequestError("Failed to request", status, url), elapsed_sec
+                else:
+                    yield idx, size, meta, None, elapsed_sec
+        finally:
+            # cancelled or stopped early: abort the downloads still running on the tokio runtime
+            results.cancel()
+
     async def fetch(
         self,
         method: str,
@@ -192,9 +296,8 @@ class AsyncHttpClient:
         req_print_error = print_error if print_error is not None else self.__print_error
         req_retry_limit = retry_limit if retry_limit is not None else self.__retry_limit
 
-        proxy_connector = connector
-        if proxy_connector is None:
-            proxy_connector = self.__proxy_connector()
+        # an explicit connector gets a one-off session, otherwise the long-lived session is reused
+        session = self.__get_session() if connector is None else None
 
         for retry_cnt in range(req_retry_limit + 1):
             start = asyncio.get_event_loop().time()
@@ -206,7 +309,8 @@ class AsyncHttpClient:
                     headers=req_headers,
                     json=json,
                     timeout=self.__timeout,
-                    connector=proxy_connector,
+                    connector=connector,
+                    session=session,
                 )
             except Exception as ex:
                 err = error_dict(ex)
@@ -248,19 +352,33 @@ async def request(
     json: dict | None = None,
     timeout: ClientTimeout = ClientTimeout(total=60),
     connector: BaseConnector | None = None,
+    session: ClientSession | None = None,
 ) -> Any:
+    if session is not None:
+        return await request_with_session(session, method, url, headers, return_type, json)
     async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
-        async with session.request(method=method, url=url, headers=headers, json=json) as res:
-            if res.status >= 400:
-                raise HttpRequestError("Failed to request", res.status, url, res.method, res.reason)
-            if return_type == ReturnType.TEXT:
-                return await res.text()
-            elif return_type == ReturnType.JSON:
-                return await res.json()
-            elif return_type == ReturnType.RAW:
-                return await res.read()
-            else:
-                raise ValueError(f"Invalid return type: {return_type}")
+        return await request_with_session(session, method, url, headers, return_type, json)
+
+
+async def request_with_session(
+    session: ClientSession,
+    method: str,
+    url: str,
+    headers: dict,
+    return_type: ReturnType,
+    json: dict | None = None,
+) -> Any:
+    async with session.request(method=method, url=url, headers=headers, json=json) as res:
+        if res.status >= 400:
+            raise HttpRequestError("Failed to request", res.status, url, res.method, res.reason)
+        if return_type == ReturnType.TEXT:
+            return await res.text()
+        elif return_type == ReturnType.JSON:
+            return await res.json()
+        elif return_type == ReturnType.RAW:
+            return await res.read()
+        else:
+            raise ValueError(f"Invalid return type: {return_type}")
 
 
 class AsyncHttpClientMock(AsyncHttpClient):
@@ -280,6 +398,12 @@ class AsyncHttpClientMock(AsyncHttpClient):
         return b"0" * self.b_size
 
 
+def get_rust_proxy_url(conf: ProxyConnectorConfig) -> str:
+    # socks5h: hostnames are resolved by the proxy, same as rdns=True in aiohttp_socks
+    scheme = "socks5h" if conf.rdns else "socks5"
+    return f"{scheme}://{conf.host}:{conf.port}"
+
+
 def get_err_dict(url: str, start: float, attr: dict | None = None, status: int | None = None) -> dict:
     err = {"url": url, "duration": round(asyncio.get_event_loop().time() - start, 2)}
     if status is not None:
@@ -0,0 +1,18 @@
+from typing import Protocol
+
+import rust_request
+
+
+class MediaPlaylist(Protocol):
+    is_master: bool
+    media_sequence: int
+    target_duration: float | None
+    is_endlist: bool
+    map_uri: str | None
+    nums: list[int]
+    uris: list[str]
+    durations: list[float]
+
+
+def parse_media_playlist(text: str, min_num: int | None = None) -> MediaPlaylist:
+    return rust_request.parse_media_playlist(text, min_num)  # type: ignore
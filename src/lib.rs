@@ -1,81 +1,654 @@
+use bytes::Bytes;
+use pyo3::create_exception;
+use pyo3::exceptions::PyStopAsyncIteration;
 use pyo3::prelude::*;
-use pyo3::types::PyDict;
+use pyo3::types::{PyBytes, PyDict, PyString};
 use pyo3_async_runtimes::tokio::future_into_py;
 use reqwest::header::{HeaderMap, HeaderName, HeaderValue};
+use reqwest::{Client, Proxy, Response, Url};
+use std::collections::hash_map::RandomState;
+use std::collections::HashMap;
+use std::hash::{BuildHasher, Hasher};
 use std::str::FromStr;
+use std::sync::{Arc, OnceLock};
+use std::time::{Duration, Instant};
 use tokio::fs::File;
 use tokio::io::AsyncWriteExt;
+use tokio::sync::{mpsc, Mutex, Semaphore};
+use tokio::task::AbortHandle;
+
+mod m3u8;
+
+const DEFAULT_POOL_MAX_IDLE_PER_HOST: usize = 32;
+const DEFAULT_POOL_IDLE_TIMEOUT_SEC: f64 = 90.0;
+const TCP_KEEPALIVE_SEC: u64 = 60;
+const PARTIAL_FILE_SUFFIX: &str = ".part";
+const DEFAULT_BATCH_CONCURRENCY: usize = 16;
+const DEFAULT_RETRY_BASE_DELAY_SEC: f64 = 0.1;
+const DEFAULT_RETRY_MAX_DELAY_SEC: f64 = 1.0;
+// 응답 메타데이터로 돌려줄 헤더 (CDN 캐시 적중 여부 판단용 포함)
+const META_HEADERS: [&str; 10] = [
+    "content-length",
+    "etag",
+    "last-modified",
+    "age",
+    "date",
+    "x-cache",
+    "x-cache-status",
+    "x-cache-hits",
+    "cf-cache-status",
+    "x-served-by",
+];
+
+// 모듈 함수(request_file)에서 공유하는 노드 단위 클라이언트
+static DEFAULT_CLIENT: OnceLock<Client> = OnceLock::new();
+
+type DownloadError = Box<dyn std::error::Error + Send + Sync>;
+type DownloadResult<T> = Result<T, DownloadError>;
+// (job index, status, size, error message, is timeout, response meta, elapsed seconds)
+type FileResult = (usize, u16, u64, Option<String>, bool, Option<ResponseMeta>, f64);
+
+// 타임아웃은 일반 요청 실패와 구분해서 처리할 수 있도록 별도 예외로 노출 (TimeoutError 하위 타입)
+create_exception!(rust_request, RequestTimeoutError, pyo3::exceptions::PyTimeoutError);
+
+struct ClientConfig {
+    pool_max_idle_per_host: usize,
+    pool_idle_timeout_sec: f64,
+    proxy_url: Option<String>,
+    proxy_username: Option<String>,
+    proxy_password: Option<String>,
+    timeout_sec: Option<f64>,
+    connect_timeout_sec: Option<f64>,
+    read_timeout_sec: Option<f64>,
+}
+
+impl Default for ClientConfig {
+    fn default() -> Self {
+        ClientConfig {
+            pool_max_idle_per_host: DEFAULT_POOL_MAX_IDLE_PER_HOST,
+            pool_idle_timeout_sec: DEFAULT_POOL_IDLE_TIMEOUT_SEC,
+            proxy_url: None,
+            proxy_username: None,
+            proxy_password: None,
+            timeout_sec: None,
+            connect_timeout_sec: None,
+            read_timeout_sec: None,
+        }
+    }
+}
+
+// 일시적 오류(연결 끊김, 5xx, 타임아웃)에 대한 로컬 재시도 설정 (limit 0: 재시도 없음)
+#[derive(Clone, Copy)]
+struct RetryPolicy {
+    limit: u32,
+    base_delay: Duration,
+    max_delay: Duration,
+}
+
+impl Default for RetryPolicy {
+    fn default() -> Self {
+        RetryPolicy {
+            limit: 0,
+            base_delay: Duration::from_secs_f64(DEFAULT_RETRY_BASE_DELAY_SEC),
+            max_delay: Duration::from_secs_f64(DEFAULT_RETRY_MAX_DELAY_SEC),
+        }
+    }
+}
+
+impl RetryPolicy {
+    // capped exponential backoff + full jitter: [0, min(max, base * 2^attempt)]
+    fn backoff(&self, attempt: u32) -> Duration {
+        let cap = self.base_delay.saturating_mul(1u32 << attempt.min(16)).min(self.max_delay);
+        cap.mul_f64(jitter_ratio())
+    }
+}
+
+// rand 의존성 없이 0.0 ~ 1.0 난수 생성 (RandomState는 생성마다 다른 키를 사용)
+fn jitter_ratio() -> f64 {
+    let hash = RandomState::new().build_hasher().finish();
+    hash as f64 / u64::MAX as f64
+}
+
+// socks5h://host:port 형식의 URL에 인증 정보를 채워 Proxy 생성 (socks5h: 프록시 측 DNS 해석)
+fn build_proxy(conf: &ClientConfig, proxy_url: &str) -> DownloadResult<Proxy> {
+    let mut url = Url::parse(proxy_url)?;
+    if let Some(username) = &conf.proxy_username {
+        url.set_username(username).map_err(|_| "Invalid proxy username")?;
+    }
+    if let Some(password) = &conf.proxy_password {
+        url.set_password(Some(password)).map_err(|_| "Invalid proxy password")?;
+    }
+    Ok(Proxy::all(url)?)
+}
+
+fn build_client(conf: &ClientConfig) -> DownloadResult<Client> {
+    let mut builder = Client::builder()
+        .pool_max_idle_per_host(conf.pool_max_idle_per_host)
+        .pool_idle_timeout(Duration::try_from_secs_f64(conf.pool_idle_timeout_sec)?)
+        .tcp_keepalive(Duration::from_secs(TCP_KEEPALIVE_SEC));
+    if let Some(sec) = conf.timeout_sec {
+        builder = builder.timeout(Duration::try_from_secs_f64(sec)?);
+    }
+    if let Some(sec) = conf.connect_timeout_sec {
+        builder = builder.connect_timeout(Duration::try_from_secs_f64(sec)?);
+    }
+    if let Some(sec) = conf.read_timeout_sec {
+        builder = builder.read_timeout(Duration::try_from_secs_f64(sec)?);
+    }
+    if let Some(proxy_url) = &conf.proxy_url {
+        builder = builder.proxy(build_proxy(conf, proxy_url)?);
+    }
+    Ok(builder.build()?)
+}
+
+fn default_client() -> PyResult<Client> {
+    if let Some(client) = DEFAULT_CLIENT.get() {
+        return Ok(client.clone());
+    }
+    let client = build_client(&ClientConfig::default()).map_err(to_py_err)?;
+    Ok(DEFAULT_CLIENT.get_or_init(|| client).clone())
+}
+
+fn is_timeout(e: &DownloadError) -> bool {
+    if let Some(err) = e.downcast_ref::<reqwest::Error>() {
+        return err.is_timeout();
+    }
+    if let Some(err) = e.downcast_ref::<std::io::Error>() {
+        return err.kind() == std::io::ErrorKind::TimedOut;
+    }
+    false
+}
+
+// 재시도해도 되는 일시적 오류인지 판단 (파일 쓰기 등 로컬 I/O 오류는 제외)
+fn is_transient(e: &DownloadError) -> bool {
+    if let Some(err) = e.downcast_ref::<reqwest::Error>() {
+        return err.is_timeout() || err.is_connect() || err.is_request() || err.is_body();
+    }
+    if let Some(err) = e.downcast_ref::<std::io::Error>() {
+        use std::io::ErrorKind::*;
+        return matches!(err.kind(), TimedOut | ConnectionReset | ConnectionAborted | BrokenPipe | UnexpectedEof);
+    }
+    false
+}
+
+// Rust 에러를 Python 예외로 변환 (타임아웃: RequestTimeoutError, 그 외: RuntimeError)
+fn to_py_err(e: DownloadError) -> PyErr {
+    if is_timeout(&e) {
+        RequestTimeoutError::new_err(format!("Rust Timeout: {}", e))
+    } else {
+        PyErr::new::<pyo3::exceptions::PyRuntimeError, _>(format!("Rust Error: {}", e))
+    }
+}
+
+// Python에서 넘어온 초 단위 값 검증 (음수, NaN, inf는 Duration 변환 시 panic 대신 ValueError)
+fn to_duration(sec: f64, name: &str) -> PyResult<Duration> {
+    Duration::try_from_secs_f64(sec)
+        .map_err(|e| PyErr::new::<pyo3::exceptions::PyValueError, _>(format!("Invalid {}: {}", name, e)))
+}
+
+fn to_timeout(timeout_sec: Option<f64>) -> PyResult<Option<Duration>> {
+    timeout_sec.map(|sec| to_duration(sec, "timeout")).transpose()
+}
+
+fn to_header_map(headers: &Bound<'_, PyDict>) -> PyResult<HeaderMap> {
+    let mut header_map = HeaderMap::new();
+    for (key, value) in headers.iter() {
+        let key_str: String = key.extract()?;
+        let value_str: String = value.extract()?;
+
+        let h_name = HeaderName::from_str(&key_str)
+            .map_err(|e| PyErr::new::<pyo3::exceptions::PyValueError, _>(format!("Invalid header: {}", e)))?;
+        let h_value = HeaderValue::from_str(&value_str)
+            .map_err(|e| PyErr::new::<pyo3::exceptions::PyValueError, _>(format!("Invalid value: {}", e)))?;
+
+        header_map.insert(h_name, h_value);
+    }
+    Ok(header_map)
+}
+
+async fn write_chunks(response: &mut Response, tmp_path: &str) -> DownloadResult<u64> {
+    let mut file = File::create(tmp_path).await?;
+    let mut size: u64 = 0;
+    while let Some(chunk) = response.chunk().await? {
+        file.write_all(&chunk).await?;
+        size += chunk.len() as u64;
+    }
+    file.flush().await?;
+    Ok(size)
+}
+
+// rename 전에 끝난 임시 파일을 drop 시 삭제 (에러, 빈 응답, abort로 future가 쓰기 도중 drop된 경우 모두 포함)
+struct PartialFile {
+    path: String,
+    committed: bool,
+}
+
+impl PartialFile {
+    fn new(path: &str) -> Self {
+        PartialFile {
+            path: format!("{}{}", path, PARTIAL_FILE_SUFFIX),
+            committed: false,
+        }
+    }
+
+    async fn commit(&mut self, path: &str) -> DownloadResult<()> {
+        tokio::fs::rename(&self.path, path).await?;
+        self.committed = true;
+        Ok(())
+    }
+}
+
+impl Drop for PartialFile {
+    fn drop(&mut self) {
+        if !self.committed {
+            let _ = std::fs::remove_file(&self.path);
+        }
+    }
+}
+
+// 응답 본문을 청크 단위로 임시 파일에 기록한 뒤 rename (부분 파일이 세그먼트로 인식되지 않도록)
+async fn stream_to_file(mut response: Response, path: String) -> DownloadResult<u64> {
+    let mut partial = PartialFile::new(&path);
+    let size = write_chunks(&mut response, &partial.path).await?;
+    if size > 0 {
+        partial.commit(&path).await?;
+    }
+    Ok(size)
+}
+
+// 이미 받은 본문도 같은 방식으로 임시 파일 + rename (쓰기 실패 시 잘린 세그먼트가 남지 않도록)
+async fn write_to_file(content: &[u8], path: String) -> DownloadResult<()> {
+    let mut partial = PartialFile::new(&path);
+    let mut file = File::create(&partial.path).await?;
+    file.write_all(content).await?;
+    file.flush().await?;
+    drop(file);
+    partial.commit(&path).await
+}
+
+async fn discard_body(mut response: Response) -> DownloadResult<u64> {
+    let mut size: u64 = 0;
+    while let Some(chunk) = response.chunk().await? {
+        size += chunk.len() as u64;
+    }
+    Ok(size)
+}
+
+// 응답 헤더 일부와 구간별 소요 시간 (ttfb: 요청 시작 ~ 응답 헤더 수신, transfer: 본문 수신)
+#[pyclass(get_all)]
+#[derive(Clone)]
+struct ResponseMeta {
+    headers: HashMap<String, String>,
+    ttfb_sec: f64,
+    transfer_sec: f64,
+    retries: u32,
+}
+
+fn select_headers(headers: &HeaderMap) -> HashMap<String, String> {
+    let mut result = HashMap::new();
+    for name in META_HEADERS {
+        if let Some(value) = headers.get(name).and_then(|v| v.to_str().ok()) {
+            result.insert(name.to_string(), value.to_string());
+        }
+    }
+    result
+}
 
 async fn download_impl(
+    client: Client,
     url: String,
     headers: HeaderMap,
     file_path: Option<String>,
     return_value: bool,
-) -> Result<(u16, u64, Option<Vec<u8>>), Box<dyn std::error::Error>> {
+    timeout: Option<Duration>,
+) -> DownloadResult<(u16, u64, Option<Bytes>, ResponseMeta)> {
 
-    let client = reqwest::Client::new();
-    let response = client.get(&url)
-        .headers(headers)
-        .send()
-        .await?;
+    let mut request = client.get(&url).headers(headers);
+    if let Some(timeout) = timeout {
+        request = request.timeout(timeout);
+    }
+    let started = Instant::now();
+    let response = request.send().await?;
+    let ttfb = started.elapsed();
 
     let status = response.status().as_u16();
+    let resp_headers = select_headers(response.headers());
+    let to_meta = |headers: HashMap<String, String>| ResponseMeta {
+        headers,
+        ttfb_sec: ttfb.as_secs_f64(),
+        transfer_sec: started.elapsed().saturating_sub(ttfb).as_secs_f64(),
+        retries: 0,
+    };
+
+    if !return_value {
+        let size = match file_path {
+            Some(path) if status < 400 => stream_to_file(response, path).await?,
+            _ => discard_body(response).await?,
+        };
+        return Ok((status, size, None, to_meta(resp_headers)));
+    }
+
     let content = response.bytes().await?;
     let size = content.len() as u64;
 
     if let Some(path) = file_path {
         if status < 400 && size > 0 {
-            let mut file = File::create(path).await?;
-            file.write_all(&content).await?;
+            write_to_file(&content, path).await?;
         }
     }
 
-    let ret_content = if return_value {
-        Some(content.to_vec())
-    } else {
-        None
-    };
-
-    Ok((status, size, ret_content))
+    Ok((status, size, Some(content), to_meta(resp_headers)))
 }
 
-// Python 노출 함수 Wrapper
-#[pyfunction]
-#[pyo3(signature = (url, headers, file_path=None, return_value=false))]
-fn request_file<'a>(
-    py: Python<'a>,
+// timeout은 전체 재시도에 걸친 deadline으로 사용 (세그먼트 lock 만료 전에 끝나도록)
+async fn download_with_retry(
+    client: Client,
     url: String,
-    headers: Bound<'a, PyDict>,
+    headers: HeaderMap,
     file_path: Option<String>,
     return_value: bool,
-) -> PyResult<Bound<'a, PyAny>> {
-
-    let mut header_map = HeaderMap::new();
-    for (key, value) in headers.iter() {
-        let key_str: String = key.extract()?;
-        let value_str: String = value.extract()?;
+    timeout: Option<Duration>,
+    retry: RetryPolicy,
+) -> DownloadResult<(u16, u64, Option<Bytes>, ResponseMeta)> {
+    let deadline = timeout.map(|t| Instant::now() + t);
+    let mut attempt: u32 = 0;
+    loop {
+        let remaining = deadline.map(|d| d.saturating_duration_since(Instant::now()));
+        let result = download_impl(
+            client.clone(),
+            url.clone(),
+            headers.clone(),
+            file_path.clone(),
+            return_value,
+            remaining,
+        )
+        .await
+        .map(|(status, size, content, mut meta)| {
+            meta.retries = attempt;
+            (status, size, content, meta)
+        });
 
-        let h_name = HeaderName::from_str(&key_str)
-            .map_err(|e| PyErr::new::<pyo3::exceptions::PyValueError, _>(format!("Invalid header: {}", e)))?;
-        let h_value = HeaderValue::from_str(&value_str)
-            .map_err(|e| PyErr::new::<pyo3::exceptions::PyValueError, _>(format!("Invalid value: {}", e)))?;
+        let retryable = match &result {
+            Ok((status, ..)) => *status >= 500,
+            Err(e) => is_transient(e),
+        };
+        if !retryable || attempt >= retry.limit {
+            return result;
+        }
 
-        header_map.insert(h_name, h_value);
+        let delay = retry.backoff(attempt);
+        if let Some(deadline) = deadline {
+            // 대기 후 요청할 시간이 남지 않으면 마지막 결과를 그대로 반환
+            if deadline.saturating_duration_since(Instant::now()) <= delay {
+                return result;
+            }
+        }
+        tokio::time::sleep(delay).await;
+        attempt += 1;
     }
+}
+
+fn spawn_download<'py>(
+    py: Python<'py>,
+    client: Client,
+    url: String,
+    headers: Bound<'py, PyDict>,
+    file_path: Option<String>,
+    return_value: bool,
+    timeout: Option<Duration>,
+    retry: RetryPolicy,
+    with_meta: bool,
+) -> PyResult<Bound<'py, PyAny>> {
+    let header_map = to_header_map(&headers)?;
 
     // future_into_py: Rust의 Future를 Python의 Awaitable로 변환
     future_into_py(py, async move {
-        match download_impl(url, header_map, file_path, return_value).await {
-            Ok((status, size, content)) => Ok((status, size, content)),
-            // Rust 에러를 Python 예외(RuntimeError)로 변환
-            Err(e) => Err(PyErr::new::<pyo3::exceptions::PyRuntimeError, _>(format!("Rust Error: {}", e))),
-        }
+        let (status, size, content, meta) =
+            download_with_retry(client, url, header_map, file_path, return_value, timeout, retry)
+                .await
+                .map_err(to_py_err)?;
+        Python::with_gil(|py| {
+            // Bytes -> PyBytes 로 바로 복사 (중간 Vec 생성 없음)
+            let content = content.map(|c| PyBytes::new(py, &c).unbind());
+            let result: PyObject = if with_meta {
+                (status, size, content, meta).into_pyobject(py)?.into_any().unbind()
+            } else {
+                (status, size, content).into_pyobject(py)?.into_any().unbind()
+            };
+            Ok(result)
+        })
     })
 }
 
+// 본문은 Bytes에서 PyString으로 한 번만 복사 (중간 PyBytes 없음)
+// from_utf8은 &str 변환을 위한 검증일 뿐, PyString::new가 GIL을 잡은 상태에서 다시 디코딩/복사함
+// 에러 응답(status >= 400)은 본문을 디코딩하지 않고 None 반환 (UTF-8이 아닌 에러 본문이 상태 코드를 가리지 않도록)
+async fn download_text_impl(
+    client: Client,
+    url: String,
+    headers: HeaderMap,
+    timeout: Option<Duration>,
+) -> DownloadResult<(u16, u64, Option<Py<PyString>>)> {
+    let (status, size, content, _) = download_impl(client, url, headers, None, true, timeout).await?;
+    if status >= 400 {
+        return Ok((status, size, None));
+    }
+    let content = content.unwrap_or_default();
+    let text = std::str::from_utf8(&content)?;
+    Ok((status, size, Some(Python::with_gil(|py| PyString::new(py, text).unbind()))))
+}
+
+// request_files 결과를 완료 순서대로 돌려주는 async iterator
+#[pyclass]
+struct FileResultStream {
+    rx: Arc<Mutex<mpsc::UnboundedReceiver<FileResult>>>,
+    handles: Vec<AbortHandle>,
+}
+
+impl FileResultStream {
+    fn abort_all(&self) {
+        for handle in &self.handles {
+            handle.abort();
+        }
+    }
+}
+
+// Python 측에서 반복을 중단(취소)하면 남은 다운로드도 중단
+impl Drop for FileResultStream {
+    fn drop(&mut self) {
+        self.abort_all();
+    }
+}
+
+#[pymethods]
+impl FileResultStream {
+    fn cancel(&self) {
+        self.abort_all();
+    }
+
+    fn __aiter__(slf: PyRef<'_, Self>) -> PyRef<'_, Self> {
+        slf
+    }
+
+    fn __anext__<'py>(&self, py: Python<'py>) -> PyResult<Bound<'py, PyAny>> {
+        let rx = self.rx.clone();
+        future_into_py(py, async move {
+            match rx.lock().await.recv().await {
+                Some(result) => Ok(result),
+                // 모든 작업이 끝나 sender가 drop되면 반복 종료
+                None => Err(PyStopAsyncIteration::new_err("All requests are completed")),
+            }
+        })
+    }
+}
+
+// 커넥션 풀(keep-alive)을 유지하는 장기 클라이언트
+#[pyclass]
+struct HttpClient {
+    client: Client,
+    timeout: Option<Duration>,
+    retry: RetryPolicy,
+}
+
+impl HttpClient {
+    fn request_timeout(&self, timeout_sec: Option<f64>) -> PyResult<Option<Duration>> {
+        Ok(to_timeout(timeout_sec)?.or(self.timeout))
+    }
+}
+
+#[pymethods]
+impl HttpClient {
+    #[new]
+    #[pyo3(signature = (
+        pool_max_idle_per_host=DEFAULT_POOL_MAX_IDLE_PER_HOST,
+        pool_idle_timeout_sec=DEFAULT_POOL_IDLE_TIMEOUT_SEC,
+        proxy_url=None,
+        proxy_username=None,
+        proxy_password=None,
+        timeout_sec=None,
+        connect_timeout_sec=None,
+        read_timeout_sec=None,
+        retry_limit=0,
+        retry_base_delay_sec=DEFAULT_RETRY_BASE_DELAY_SEC,
+        retry_max_delay_sec=DEFAULT_RETRY_MAX_DELAY_SEC,
+    ))]
+    fn new(
+        pool_max_idle_per_host: usize,
+        pool_idle_timeout_sec: f64,
+        proxy_url: Option<String>,
+        proxy_username: Option<String>,
+        proxy_password: Option<String>,
+        timeout_sec: Option<f64>,
+        connect_timeout_sec: Option<f64>,
+        read_timeout_sec: Option<f64>,
+        retry_limit: u32,
+        retry_base_delay_sec: f64,
+        retry_max_delay_sec: f64,
+    ) -> PyResult<Self> {
+        let conf = ClientConfig {
+            pool_max_idle_per_host,
+            pool_idle_timeout_sec,
+            proxy_url,
+            proxy_username,
+            proxy_password,
+            timeout_sec,
+            connect_timeout_sec,
+            read_timeout_sec,
+        };
+        let client = build_client(&conf)
+            .map_err(|e| PyErr::new::<pyo3::exceptions::PyValueError, _>(format!("Invalid client config: {}", e)))?;
+        let retry = RetryPolicy {
+            limit: retry_limit,
+            base_delay: to_duration(retry_base_delay_sec, "retry delay")?,
+            max_delay: to_duration(retry_max_delay_sec, "retry delay")?,
+        };
+        Ok(HttpClient { client, timeout: to_timeout(timeout_sec)?, retry })
+    }
+
+    #[pyo3(signature = (url, headers, file_path=None, return_value=false, timeout_sec=None))]
+    fn request_file<'py>(
+        &self,
+        py: Python<'py>,
+        url: String,
+        headers: Bound<'py, PyDict>,
+        file_path: Option<String>,
+        return_value: bool,
+        timeout_sec: Option<f64>,
+    ) -> PyResult<Bound<'py, PyAny>> {
+        let timeout = self.request_timeout(timeout_sec)?;
+        spawn_download(py, self.client.clone(), url, headers, file_path, return_value, timeout, self.retry, true)
+    }
+
+    #[pyo3(signature = (url, headers, timeout_sec=None))]
+    fn request_text<'py>(
+        &self,
+        py: Python<'py>,
+        url: String,
+        headers: Bound<'py, PyDict>,
+        timeout_sec: Option<f64>,
+    ) -> PyResult<Bound<'py, PyAny>> {
+        let header_map = to_header_map(&headers)?;
+        let timeout = self.request_timeout(timeout_sec)?;
+        let client = self.client.clone();
+        future_into_py(py, async move {
+            download_text_impl(client, url, header_map, timeout).await.map_err(to_py_err)
+        })
+    }
+
+    // (url, file_path) 작업들을 tokio 런타임에서 concurrency 만큼 동시에 처리
+    #[pyo3(signature = (jobs, headers, concurrency=DEFAULT_BATCH_CONCURRENCY, timeout_sec=None))]
+    fn request_files(
+        &self,
+        jobs: Vec<(String, String)>,
+        headers: Bound<'_, PyDict>,
+        concurrency: usize,
+        timeout_sec: Option<f64>,
+    ) -> PyResult<FileResultStream> {
+        let header_map = to_header_map(&headers)?;
+        let timeout = self.request_timeout(timeout_sec)?;
+        let retry = self.retry;
+        let semaphore = Arc::new(Semaphore::new(concurrency.max(1)));
+        let runtime = pyo3_async_runtimes::tokio::get_runtime();
+        let (tx, rx) = mpsc::unbounded_channel::<FileResult>();
+        // deadline은 permit 대기 전부터 계산 (호출 측 세그먼트 lock은 이미 잡혀 있으므로)
+        let deadline = timeout.map(|t| Instant::now() + t);
+
+        let mut handles = Vec::with_capacity(jobs.len());
+        for (idx, (url, file_path)) in jobs.into_iter().enumerate() {
+            let client = self.client.clone();
+            let headers = header_map.clone();
+            let semaphore = semaphore.clone();
+            let tx = tx.clone();
+            let handle = runtime.spawn(async move {
+                let _permit = semaphore.acquire_owned().await;
+                // 작업별 소요 시간은 permit 획득 이후부터 측정 (재시도 포함)
+                let started = Instant::now();
+                let remaining = deadline.map(|d| d.saturating_duration_since(started));
+                if remaining == Some(Duration::ZERO) {
+                    let err = Some("Timed out waiting for a download slot".to_string());
+                    let _ = tx.send((idx, 0, 0, err, true, None, 0.0));
+                    return;
+                }
+                let download = download_with_retry(client, url, headers, Some(file_path), false, remaining, retry);
+                let downloaded = download.await;
+                let elapsed = started.elapsed().as_secs_f64();
+                let result = match downloaded {
+                    Ok((status, size, _, meta)) => (idx, status, size, None, false, Some(meta), elapsed),
+                    Err(e) => (idx, 0, 0, Some(e.to_string()), is_timeout(&e), None, elapsed),
+                };
+                let _ = tx.send(result);
+            });
+            handles.push(handle.abort_handle());
+        }
+
+        Ok(FileResultStream { rx: Arc::new(Mutex::new(rx)), handles })
+    }
+}
+
+// Python 노출 함수 Wrapper
+#[pyfunction]
+#[pyo3(signature = (url, headers, file_path=None, return_value=false, timeout_sec=None))]
+fn request_file<'a>(
+    py: Python<'a>,
+    url: String,
+    headers: Bound<'a, PyDict>,
+    file_path: Option<String>,
+    return_value: bool,
+    timeout_sec: Option<f64>,
+) -> PyResult<Bound<'a, PyAny>> {
+    let timeout = to_timeout(timeout_sec)?;
+    spawn_download(py, default_client()?, url, headers, file_path, return_value, timeout, RetryPolicy::default(), false)
+}
+
 // 모듈 등록 (이름은 Cargo.toml의 name과 같아야 함)
 #[pymodule]
 fn rust_request(m: &Bound<'_, PyModule>) -> PyResult<()> {
+    m.add_class::<HttpClient>()?;
+    m.add_class::<FileResultStream>()?;
+    m.add_class::<ResponseMeta>()?;
+    m.add("RequestTimeoutError", m.py().get_type::<RequestTimeoutError>())?;
     m.add_function(wrap_pyfunction!(request_file, m)?)?;
+    m.add_class::<m3u8::MediaPlaylist>()?;
+    m.add_function(wrap_pyfunction!(m3u8::parse_media_playlist, m)?)?;
     Ok(())
 }
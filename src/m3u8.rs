@@ -0,0 +1,98 @@
+use pyo3::prelude::*;
+
+// HLS media playlist 파싱 결과 (세그먼트 정보는 병렬 배열로 보관)
+#[pyclass(get_all)]
+pub struct MediaPlaylist {
+    pub is_master: bool,
+    pub media_sequence: i64,
+    pub target_duration: Option<f64>,
+    pub is_endlist: bool,
+    pub map_uri: Option<String>,
+    pub nums: Vec<i64>,
+    pub uris: Vec<String>,
+    pub durations: Vec<f64>,
+}
+
+fn parse_attr(attrs: &str, name: &str) -> Option<String> {
+    let prefix = format!("{}=", name);
+    let start = attrs.find(&prefix)? + prefix.len();
+    let value = &attrs[start..];
+    match value.strip_prefix('"') {
+        Some(quoted) => quoted.find('"').map(|end| quoted[..end].to_string()),
+        None => Some(value.split(',').next().unwrap_or("").to_string()),
+    }
+}
+
+fn parse_extinf(value: &str) -> f64 {
+    let duration = value.split(',').next().unwrap_or("");
+    duration.trim().parse::<f64>().unwrap_or(0.0)
+}
+
+// streamlink M3U8Parser와 같은 규칙: EXTINF 다음 URI 라인만 세그먼트로 취급, num = media sequence + index
+pub fn parse(text: &str, min_num: Option<i64>) -> MediaPlaylist {
+    let mut playlist = MediaPlaylist {
+        is_master: false,
+        media_sequence: 0,
+        target_duration: None,
+        is_endlist: false,
+        map_uri: None,
+        nums: Vec::new(),
+        uris: Vec::new(),
+        durations: Vec::new(),
+    };
+
+    let mut cur_map: Option<String> = None;
+    let mut extinf: Option<f64> = None;
+    let mut seg_idx: i64 = 0;
+
+    for raw_line in text.lines() {
+        let line = raw_line.trim();
+        if line.is_empty() {
+            continue;
+        }
+
+        if let Some(tag) = line.strip_prefix('#') {
+            let (name, value) = match tag.find(':') {
+                Some(idx) => (&tag[..idx], &tag[idx + 1..]),
+                None => (tag, ""),
+            };
+            match name {
+                "EXTINF" => extinf = Some(parse_extinf(value)),
+                "EXT-X-MEDIA-SEQUENCE" => playlist.media_sequence = value.trim().parse().unwrap_or(0),
+                "EXT-X-TARGETDURATION" => playlist.target_duration = value.trim().parse().ok(),
+                "EXT-X-ENDLIST" => playlist.is_endlist = true,
+                "EXT-X-MAP" => cur_map = parse_attr(value, "URI"),
+                "EXT-X-STREAM-INF" => playlist.is_master = true,
+                _ => {}
+            }
+            continue;
+        }
+
+        let Some(duration) = extinf.take() else {
+            continue;
+        };
+        if seg_idx == 0 {
+            playlist.map_uri = cur_map.clone();
+        }
+        let num = playlist.media_sequence + seg_idx;
+        seg_idx += 1;
+
+        if let Some(min_num) = min_num {
+            if num <= min_num {
+                continue;
+            }
+        }
+        playlist.nums.push(num);
+        playlist.uris.push(line.to_string());
+        playlist.durations.push(duration);
+    }
+
+    playlist
+}
+
+#[pyfunction]
+#[pyo3(signature = (text, min_num=None))]
+pub fn parse_media_playlist(py: Python<'_>, text: &str, min_num: Option<i64>) -> MediaPlaylist {
+    // 파싱 중에는 GIL을 해제
+    py.allow_threads(|| parse(text, min_num))
+}
@@ -8,7 +8,10 @@ from recnode.data.redis import (
     RedisQueue,
     create_redis_pool,
     RedisSortedSet,
+    RedisHash,
+    RedisPipeline,
 )
+from recnode.data.redis.redis_utils import is_queued
 
 load_dotenv(path_join(find_project_root(), "dev", ".env"))
 conf = get_env().redis_master
@@ -18,6 +21,7 @@ client = Redis(connection_pool=pool)
 redis_str = RedisString(client)
 redis_queue = RedisQueue(client)
 redis_sorted_set = RedisSortedSet(client)
+redis_hash = RedisHash(client)
 
 
 @pytest.mark.asyncio
@@ -83,8 +87,59 @@ async def test_redis_sorted_set():
     assert await redis_sorted_set.clear(key) == 1
 
 
+@pytest.mark.asyncio
+async def test_redis_hash():
+    key = "test4"
+    await test_clear()
+    assert await redis_hash.get_pttl(key) == -2
+    assert await redis_hash.get(key, "a") is None
+    assert await redis_hash.set(key, "a", "1", nx=True)
+    assert not await redis_hash.set(key, "a", "2", nx=True)
+    assert await redis_hash.set(key, "b", "2")
+    assert await redis_hash.mget(key, ["a", "b", "c"]) == ["1", "2", None]
+    assert await redis_hash.get_pttl(key) == -1
+    assert await redis_hash.set_pexpire(key, 10_000)
+    assert 0 < await redis_hash.get_pttl(key) <= 10_000
+    assert await redis_hash.incr(key, "c", 2) == 2
+    assert await redis_hash.incr(key, "c") == 3
+    assert await redis_hash.delete(key, "a", "c", "d") == 2
+    assert await redis_hash.mget(key, ["a", "b", "c"]) == [None, "2", None]
+    assert await redis_hash.clear(key) == 1
+
+
+@pytest.mark.asyncio
+async def test_redis_pipeline():
+    key = "test5"
+    await test_clear()
+    async with RedisPipeline(client) as p:
+        strings = p.string()
+        assert is_queued(await strings.set(key, "a"))
+        assert is_queued(await strings.incr(f"{key}:count", 2, px=10_000))  # INCR + PEXPIRE NX
+        assert is_queued(await p.sorted_set().set(f"{key}:set", "b", 1))
+        assert is_queued(await strings.get(key))
+        assert p.size() == 5
+    assert p.results == [True, 2, True, 1, "a"]
+    assert 0 < await redis_str.get_pttl(f"{key}:count") <= 10_000
+
+    # PEXPIRE NX (Redis >= 7) keeps the TTL set by the first increment
+    assert await redis_str.set_pexpire(f"{key}:count", 20_000)
+    async with RedisPipeline(client) as p:
+        await p.string().incr(f"{key}:count", 1, px=10_000)
+    assert p.results == [3, False]
+    assert await redis_str.get_pttl(f"{key}:count") > 10_000
+
+    # nothing is sent when the block fails
+    with pytest.raises(ValueError):
+        async with RedisPipeline(client) as p:
+            await p.string().set(f"{key}:2", "a")
+            raise ValueError("abort")
+    assert not await redis_str.exists(f"{key}:2")
+
+
 @pytest.mark.asyncio
 async def test_clear():
     await client.delete("test1")
     await client.delete("test2")
     await client.delete("test3")
+    await client.delete("test4")
+    await client.delete("test5", "test5:count", "test5:set")
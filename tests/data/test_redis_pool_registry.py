@@ -0,0 +1,92 @@
+import asyncio
+
+import pytest
+from redis.exceptions import ConnectionError
+
+from recnode.data.redis.redis_pool_registry import BudgetedConnectionPool, RedisConnectionBudget
+
+# connections are never opened: the pools only create them, and ensure_connection is replaced where they are handed out
+HOST = "127.0.0.1"
+PORT = 1
+
+
+def create_pool(budget: RedisConnectionBudget, timeout: float = 0.2, max_connections: int = 10) -> BudgetedConnectionPool:
+    pool = BudgetedConnectionPool(budget, timeout, host=HOST, port=PORT, max_connections=max_connections)
+
+    async def ensure_connection(connection):
+        pass
+
+    pool.ensure_connection = ensure_connection  # type: ignore
+    return pool
+
+
+@pytest.mark.asyncio
+async def test_budget_exhausted():
+    budget = RedisConnectionBudget(2)
+    pool1 = create_pool(budget)
+    pool2 = create_pool(budget)
+
+    conns = [pool1.get_available_connection(), pool2.get_available_connection()]
+    assert budget.used() == 2
+    assert not pool1.can_get_connection()
+    with pytest.raises(ConnectionError):
+        pool1.get_available_connection()
+    assert pool1.count_in_use() == 1
+
+    # an available connection of the pool is reused without taking more budget
+    await pool2.release(conns.pop())
+    assert pool2.can_get_connection()
+    conns.append(pool2.get_available_connection())
+    assert budget.used() == 2
+
+
+@pytest.mark.asyncio
+async def test_get_connection_timeout():
+    budget = RedisConnectionBudget(1)
+    pool1 = create_pool(budget, timeout=0.2)
+    pool2 = create_pool(budget, timeout=0.2)
+    conn = await pool1.get_connection("GET")
+
+    start = asyncio.get_running_loop().time()
+    with pytest.raises(ConnectionError):
+        await pool2.get_connection("GET")
+    assert asyncio.get_running_loop().time() - start >= 0.2
+    assert pool2.count_in_use() == 0
+
+    await pool1.release(conn)
+
+
+@pytest.mark.asyncio
+async def test_get_connection_waits_for_budget():
+    budget = RedisConnectionBudget(1)
+    pool1 = create_pool(budget, timeout=1)
+    pool2 = create_pool(budget, timeout=1)
+    conn = await pool1.get_connection("GET")
+
+    # the budget is freed by another pool, whose release does not notify this pool's waiters
+    waiter = asyncio.create_task(pool2.get_connection("GET"))
+    await asyncio.sleep(0.1)
+    assert not waiter.done()
+    await pool1.release(conn)
+    pool1.discard()
+    assert await asyncio.wait_for(waiter, 0.5) is not None
+    assert budget.used() == 1
+
+
+@pytest.mark.asyncio
+async def test_discard_and_close_release_budget():
+    budget = RedisConnectionBudget(None)
+    pool1 = create_pool(budget)
+    pool2 = create_pool(budget)
+    conns = [await pool1.get_connection("GET"), await pool1.get_connection("GET"), await pool2.get_connection("GET")]
+    await pool1.release(conns[0])
+    assert budget.used() == 3
+
+    # available and in-use connections are both given back to the budget
+    pool1.discard()
+    assert budget.used() == 1
+    assert pool1.count_in_use() == pool1.count_available() == 0
+
+    await pool2.close()
+    assert budget.used() == 0
+    assert pool2.count_in_use() == pool2.count_available() == 0
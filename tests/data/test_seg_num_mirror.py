@@ -0,0 +1,134 @@
+import uuid
+
+import pytest
+from pyutils import load_dotenv, path_join, find_project_root
+from redis.asyncio import Redis
+
+from recnode.config import get_env
+from recnode.data.redis import create_redis_pool
+from recnode.data.segment import SegmentNumberMirror, SegmentNumberSet
+
+load_dotenv(path_join(find_project_root(), "dev", ".env"))
+master = Redis(connection_pool=create_redis_pool(get_env().redis_master))
+
+KEY1 = "live:test:segments:success"
+KEY2 = "live:test:segments:failed"
+
+
+class MockHub:
+    def __init__(self):
+        self.mirrors: list[SegmentNumberMirror] = []
+
+    def register(self, mirror: SegmentNumberMirror):
+        self.mirrors.append(mirror)
+
+    def unregister(self, mirror: SegmentNumberMirror):
+        self.mirrors.remove(mirror)
+
+
+def loader(nums: list[int]):
+    # the source list is read on every resync, so tests can change it between resyncs
+    async def load(replica: Redis) -> list[int]:
+        return list(nums)
+
+    return load
+
+
+def create_mirror(hub: MockHub | None = None) -> SegmentNumberMirror:
+    return SegmentNumberMirror(hub or MockHub(), str(uuid.uuid4()), {})  # type: ignore
+
+
+@pytest.mark.asyncio
+async def test_apply_events():
+    mirror = create_mirror()
+    mirror.track(KEY1, loader([3, 1]))
+    mirror.track(KEY2, loader([]))
+    assert mirror.get(KEY1) is None
+
+    await mirror.resync(None)  # type: ignore
+    nums = mirror.get(KEY1)
+    assert nums is not None
+    assert nums.all() == [1, 3]
+
+    mirror.apply(f"add {KEY1} 2")
+    mirror.apply(f"add {KEY1} 2")
+    mirror.apply(f"add {KEY1} 10")
+    assert nums.all() == [1, 2, 3, 10]
+    assert nums.range(2, 3) == [2, 3]
+    assert nums.highest() == 10
+    assert nums.size() == 4
+    assert nums.contains(2)
+
+    mirror.apply(f"rem {KEY1} 2")
+    mirror.apply(f"rem {KEY1} 7")
+    assert nums.all() == [1, 3, 10]
+    assert not nums.contains(2)
+
+    # events of other keys or untracked keys leave the set as is
+    mirror.apply(f"add {KEY2} 5")
+    mirror.apply("add live:test:segments:other 6")
+    assert nums.all() == [1, 3, 10]
+    assert mirror.get(KEY2).all() == [5]  # type: ignore
+
+    mirror.apply(f"clr {KEY1}")
+    assert nums.all() == []
+    assert nums.highest() is None
+
+
+@pytest.mark.asyncio
+async def test_resync_after_missed_message():
+    source = [1, 2]
+    mirror = create_mirror()
+    mirror.track(KEY1, loader(source))
+    await mirror.resync(None)  # type: ignore
+
+    # the removal of 1 and the addition of 3 are never delivered
+    source.remove(1)
+    source.append(3)
+    mirror.apply(f"add {KEY1} 4")
+    assert mirror.get(KEY1).all() == [1, 2, 4]  # type: ignore
+
+    # the next resync replaces the local state with the source
+    await mirror.resync(None)  # type: ignore
+    assert mirror.get(KEY1).all() == [2, 3]  # type: ignore
+
+
+@pytest.mark.asyncio
+async def test_stop_unregisters():
+    hub = MockHub()
+    mirror = create_mirror(hub)
+    mirror.track(KEY1, loader([1]))
+    mirror.start()
+    assert hub.mirrors == [mirror]
+    await mirror.resync(None)  # type: ignore
+
+    await mirror.stop()
+    assert hub.mirrors == []
+    assert mirror.get(KEY1) is None
+
+
+@pytest.mark.asyncio
+async def test_num_set_reads_redis_until_ready():
+    live_record_id = str(uuid.uuid4())
+    mirror = SegmentNumberMirror(MockHub(), live_record_id, {})  # type: ignore
+    # the master also serves replica reads, so the reads are not affected by replication lag
+    nums = SegmentNumberSet(master, master, live_record_id, "success", 10, {}, mirror=mirror)
+
+    # while the mirror is not ready, replica reads go to Redis
+    await nums.set_num(1)
+    await nums.set_num(2)
+    assert await nums.all(use_master=False) == [1, 2]
+    assert await nums.contains(2, use_master=False)
+
+    # once ready, replica reads are answered by the mirror, which misses changes not delivered to it
+    await mirror.resync(master)
+    await master.zrem(nums.key, "2")
+    assert await nums.all(use_master=False) == [1, 2]
+    assert await nums.all(use_master=True) == [1]
+
+    # unsubscribed (e.g. the hub disconnected): back to Redis reads
+    mirror.ready = False
+    assert await nums.all(use_master=False) == [1]
+    assert await nums.get_highest(use_master=False) == 1
+
+    await nums.clear()
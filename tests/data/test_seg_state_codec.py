@@ -0,0 +1,35 @@
+from datetime import datetime
+
+from recnode.data.segment import SegmentState, SegmentStateCodec, SegmentStateEncoding
+
+URL_PREFIX = "https://example.com/live/"
+
+
+def test_compact_round_trip():
+    codec = SegmentStateCodec(encoding=SegmentStateEncoding.COMPACT, url_prefix=URL_PREFIX)
+    state = SegmentState.new(url=f"{URL_PREFIX}seg_10.ts?a=1|b", num=10, duration=2.002, now=datetime.now())
+
+    txt = codec.encode(state)
+    assert txt.startswith("1|")
+    assert URL_PREFIX not in txt
+
+    decoded = codec.decode(txt, 10)
+    assert decoded.url == state.url
+    assert decoded.duration == state.duration
+    assert decoded.size is None
+    assert abs((decoded.created_at - state.created_at).total_seconds()) < 0.001
+
+
+def test_compact_full_url():
+    codec = SegmentStateCodec(encoding=SegmentStateEncoding.COMPACT, url_prefix=URL_PREFIX)
+    state = SegmentState.new(url="https://other.com/seg_1.ts", num=1, duration=1.0, now=datetime.now(), size=100)
+    decoded = codec.decode(codec.encode(state), 1)
+    assert decoded.url == state.url
+    assert decoded.size == 100
+
+
+def test_decode_legacy_json():
+    state = SegmentState.new(url=f"{URL_PREFIX}seg_3.ts", num=3, duration=2.0, now=datetime.now())
+    json_txt = SegmentStateCodec().encode(state)
+    compact = SegmentStateCodec(encoding=SegmentStateEncoding.COMPACT, url_prefix=URL_PREFIX)
+    assert compact.decode(json_txt, 3) == state
@@ -0,0 +1,240 @@
+import asyncio
+import uuid
+
+import pytest
+from pyutils import load_dotenv, path_join, find_project_root
+from redis.asyncio import Redis
+
+from recnode.config import get_env
+from recnode.data.redis import create_redis_pool
+from recnode.data.segment import (
+    SegmentNumberSet,
+    SegmentNumberSetType,
+    SegmentStateService,
+    SegmentFailureState,
+    SegmentState,
+    SegmentStateStorage,
+)
+from tests.data.mock_helpers import seg
+
+load_dotenv(path_join(find_project_root(), "dev", ".env"))
+env = get_env()
+master = Redis(connection_pool=create_redis_pool(env.redis_master))
+replica = Redis(connection_pool=create_redis_pool(env.redis_replica))
+
+ex = 10
+
+
+def create_num_sets(live_record_id: str, **kwargs) -> tuple[SegmentNumberSet, SegmentNumberSet, SegmentNumberSet]:
+    success_nums = SegmentNumberSet(master, replica, live_record_id, "success", ex, {}, **kwargs)
+    retrying_nums = SegmentNumberSet(master, replica, live_record_id, "retrying", ex, {}, **kwargs)
+    failed_nums = SegmentNumberSet(master, replica, live_record_id, "failed", ex, {}, **kwargs)
+    return success_nums, retrying_nums, failed_nums
+
+
+def retrying(num: int) -> SegmentState:
+    state = seg(num)
+    state.is_retrying = True
+    return state
+
+
+async def clear(seg_service: SegmentStateService, *num_sets: SegmentNumberSet):
+    for nums in num_sets:
+        await seg_service.delete_mapped(nums)
+
+
+@pytest.mark.asyncio
+async def test_commit_success():
+    live_record_id = str(uuid.uuid4())
+    seg_service = SegmentStateService(master, replica, live_record_id, ex, ex, 3, {})
+    num_sets = create_num_sets(live_record_id)
+    success_nums, retrying_nums, failed_nums = num_sets
+
+    await retrying_nums.set_num(1)
+    await failed_nums.set_num(2)
+    assert await seg_service.commit_success(seg(1, size=None), 100, *num_sets) == 0
+    assert await seg_service.commit_success(seg(2, size=None), 200, *num_sets) == 0
+
+    # committed segments leave the retrying and failed sets
+    assert await success_nums.all(use_master=True) == [1, 2]
+    assert await retrying_nums.all(use_master=True) == []
+    assert await failed_nums.all(use_master=True) == []
+    state = await seg_service.get_seg(2, use_master=True)
+    assert state is not None
+    assert state.size == 200
+    assert not state.is_retrying
+
+    # a segment is committed only once
+    assert await seg_service.commit_success(seg(1), 100, *num_sets) is None
+
+    await clear(seg_service, *num_sets)
+
+
+@pytest.mark.asyncio
+async def test_record_failure_threshold():
+    live_record_id = str(uuid.uuid4())
+    seg_service = SegmentStateService(master, replica, live_record_id, ex, ex, 3, {})
+    num_sets = create_num_sets(live_record_id)
+    success_nums, retrying_nums, failed_nums = num_sets
+    threshold = 2
+
+    # the first failure moves the segment to retrying without counting a retry
+    assert await seg_service.record_failure(seg(1), threshold, *num_sets) == (SegmentFailureState.RETRYING, 0)
+    assert await retrying_nums.all(use_master=True) == [1]
+    state = await seg_service.get_seg(1, use_master=True)
+    assert state is not None
+    assert state.is_retrying
+    assert state.parallel_limit == 3
+
+    # failed retries are counted until the threshold moves the segment to failed
+    assert await seg_service.record_failure(retrying(1), threshold, *num_sets) == (SegmentFailureState.RETRYING, 1)
+    assert await seg_service.record_failure(retrying(1), threshold, *num_sets) == (SegmentFailureState.FAILED, 2)
+    assert await retrying_nums.all(use_master=True) == []
+    assert await failed_nums.all(use_master=True) == [1]
+
+    # a committed segment ignores late failures, and its retry count is cleared
+    assert await seg_service.record_failure(seg(2), threshold, *num_sets) == (SegmentFailureState.RETRYING, 0)
+    assert await seg_service.record_failure(retrying(2), threshold, *num_sets) == (SegmentFailureState.RETRYING, 1)
+    assert await seg_service.commit_success(retrying(2), 100, *num_sets) == 1
+    assert await seg_service.record_failure(retrying(2), threshold, *num_sets) == (SegmentFailureState.SUCCESS, 0)
+    assert await retrying_nums.all(use_master=True) == []
+    assert await success_nums.all(use_master=True) == [2]
+
+    await clear(seg_service, *num_sets)
+
+
+@pytest.mark.asyncio
+async def test_acquire_lease_expiry():
+    live_record_id = str(uuid.uuid4())
+    lease_expire_sec = 0.5
+    seg_service = SegmentStateService(master, replica, live_record_id, ex, lease_expire_sec, 3, {})
+    num_sets = create_num_sets(live_record_id)
+    success_nums, retrying_nums, failed_nums = num_sets
+
+    # the first request creates the state, so a second first request is refused
+    lock = await seg_service.try_acquire(seg(1), [success_nums, failed_nums, retrying_nums])
+    assert lock is not None
+    assert lock.lock_num == 0
+    assert await seg_service.try_acquire(seg(1), [success_nums, failed_nums, retrying_nums]) is None
+
+    # parallel_limit=1: the only lease is held until it expires
+    assert await seg_service.try_acquire(retrying(1), [success_nums, failed_nums]) is None
+    await asyncio.sleep(lease_expire_sec + 0.1)
+    lock = await seg_service.try_acquire(retrying(1), [success_nums, failed_nums])
+    assert lock is not None
+    assert lock.lock_num == 0
+
+    await seg_service.release_lock(lock)
+    with pytest.raises(ValueError):
+        await seg_service.release_lock(lock)
+
+    # segments in a skip set are not acquired
+    await success_nums.set_num(1)
+    assert await seg_service.try_acquire(retrying(1), [success_nums, failed_nums]) is None
+
+    await clear(seg_service, *num_sets)
+
+
+@pytest.mark.asyncio
+async def test_num_set_parity():
+    live_record_id = str(uuid.uuid4())
+    zset_nums = SegmentNumberSet(master, replica, live_record_id, "zset", ex, {})
+    bitmap_nums = SegmentNumberSet(master, replica, live_record_id, "bitmap", ex, {}, set_type=SegmentNumberSetType.BITMAP)
+
+    for nums in [zset_nums, bitmap_nums]:
+        for num in [105, 100, 131, 102, 100]:
+            await nums.set_num(num)
+        await nums.remove(102, check_replica=False)
+
+    assert await zset_nums.all(use_master=True) == await bitmap_nums.all(use_master=True) == [100, 105, 131]
+    assert await zset_nums.range(101, 131, use_master=True) == await bitmap_nums.range(101, 131, use_master=True)
+    assert await zset_nums.get_highest(use_master=True) == await bitmap_nums.get_highest(use_master=True) == 131
+    assert await zset_nums.size(use_master=True) == await bitmap_nums.size(use_master=True) == 3
+    for num in [100, 102, 99, 132]:
+        assert await zset_nums.contains(num, use_master=True) == await bitmap_nums.contains(num, use_master=True)
+
+    for nums in [zset_nums, bitmap_nums]:
+        await nums.clear()
+        assert await nums.all(use_master=True) == []
+
+
+@pytest.mark.asyncio
+async def test_script_num_set_parity():
+    results = []
+    for set_type in [SegmentNumberSetType.ZSET, SegmentNumberSetType.BITMAP]:
+        live_record_id = str(uuid.uuid4())
+        seg_service = SegmentStateService(master, replica, live_record_id, ex, ex, 3, {}, num_set_type=set_type)
+        num_sets = create_num_sets(live_record_id, set_type=set_type)
+        success_nums, retrying_nums, failed_nums = num_sets
+
+        assert await seg_service.try_acquire(seg(1), [success_nums, failed_nums, retrying_nums]) is not None
+        await seg_service.record_failure(seg(1), 1, *num_sets)
+        await seg_service.record_failure(retrying(1), 1, *num_sets)
+        await seg_service.record_failure(seg(2), 1, *num_sets)
+        await seg_service.commit_success(seg(3), 100, *num_sets)
+        assert await seg_service.try_acquire(retrying(3), [success_nums, failed_nums]) is None
+        results.append([await nums.all(use_master=True) for nums in num_sets])
+
+        await clear(seg_service, *num_sets)
+
+    assert results[0] == results[1] == [[3], [2], [1]]
+
+
+@pytest.mark.asyncio
+async def test_hash_state_storage():
+    live_record_id = str(uuid.uuid4())
+    seg_service = SegmentStateService(master, replica, live_record_id, ex, ex, 3, {}, state_storage=SegmentStateStorage.HASH)
+    num_sets = create_num_sets(live_record_id)
+    success_nums, retrying_nums, failed_nums = num_sets
+    state_key = f"live:{live_record_id}:segments:state"
+
+    assert await seg_service.set_seg_nx(seg(1))
+    assert not await seg_service.set_seg_nx(seg(1, size=200))
+    assert await seg_service.set_seg(seg(2, size=200), nx=False)
+    assert [state.size for state in await seg_service.get_batch([1, 2, 3], use_master=True)] == [100, 200]
+
+    # all states share one hash with a single TTL, set on creation
+    ttl = await master.pttl(state_key)
+    assert 0 < ttl <= ex * 1000
+    assert await seg_service.try_acquire(seg(3), [success_nums, failed_nums, retrying_nums]) is not None
+    assert await master.hlen(state_key) == 3
+
+    # retry counts are fields of the same hash
+    await seg_service.record_failure(seg(3), 3, *num_sets)
+    assert await seg_service.record_failure(retrying(3), 3, *num_sets) == (SegmentFailureState.RETRYING, 1)
+    assert await master.hget(state_key, "3:retry") == "1"
+    assert await seg_service.commit_success(retrying(3), 100, *num_sets) == 1
+    assert await master.hget(state_key, "3:retry") is None
+
+    await seg_service.delete(2, check_replica=False)
+    assert await seg_service.get_seg(2, use_master=True) is None
+
+    # only the states of mapped segments are deleted, the rest of the hash is kept
+    await clear(seg_service, *num_sets)
+    assert await master.hkeys(state_key) == ["1"]
+    await master.delete(state_key)
+
+
+@pytest.mark.asyncio
+async def test_abandon_retry():
+    live_record_id = str(uuid.uuid4())
+    seg_service = SegmentStateService(master, replica, live_record_id, ex, ex, 3, {})
+    num_sets = create_num_sets(live_record_id)
+    success_nums, retrying_nums, failed_nums = num_sets
+
+    await seg_service.record_failure(seg(1), 5, *num_sets)
+    await seg_service.record_failure(retrying(1), 5, *num_sets)
+
+    # moves retrying -> failed without counting another retry
+    assert await seg_service.abandon_retry(retrying(1), retrying_nums, failed_nums) == 1
+    assert await retrying_nums.all(use_master=True) == []
+    assert await failed_nums.all(use_master=True) == [1]
+
+    # idempotent, and only retrying segments are abandoned
+    assert await seg_service.abandon_retry(retrying(1), retrying_nums, failed_nums) is None
+    await seg_service.commit_success(seg(2), 100, *num_sets)
+    assert await seg_service.abandon_retry(retrying(2), retrying_nums, failed_nums) is None
+    assert await failed_nums.all(use_master=True) == [1]
+    assert await success_nums.all(use_master=True) == [2]
+
+    await clear(seg_service, *num_sets)
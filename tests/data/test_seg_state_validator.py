@@ -18,14 +18,13 @@ master = Redis(connection_pool=create_redis_pool(env.redis_master))
 replica = Redis(connection_pool=create_redis_pool(env.redis_replica))
 
 ex = 10
-lw = 2
 
 
 @pytest.mark.asyncio
 async def test_validate_segments():
     log.set_level(logging.DEBUG)
     live_record_id = "cc23b367-bc45-40cd-9523-e334b1bcd52d"
-    success_nums = SegmentNumberSet(master, replica, live_record_id, "success", ex, ex, lw, {})
+    success_nums = SegmentNumberSet(master, replica, live_record_id, "success", ex, {})
     http_mock = AsyncHttpClientMock(b_size=100)
     invalid_seg_num_diff_threshold = 150
     live_service = LiveStateService(master=master, replica=replica)
@@ -77,34 +76,3 @@ async def test_validate_segments():
 
     await seg_service.delete_mapped(success_nums)
     await live_service.delete(live_record_id)
-
-
-@pytest.mark.asyncio
-async def test_validate_segment():
-    log.set_level(logging.DEBUG)
-    live_record_id = "31cad56f-3d77-41d6-85b1-0cc77272aac0"
-    success_nums = SegmentNumberSet(master, replica, live_record_id, "success", ex, ex, lw, {})
-    http_mock = AsyncHttpClientMock(b_size=100)
-    invalid_seg_time_diff_threshold_sec = 2 * 60
-    live_service = LiveStateService(master=master, replica=replica)
-    seg_service = SegmentStateService(master, replica, live_record_id, ex, ex, 3, {})
-    validator = SegmentStateValidator(live_service, seg_service, http_mock, {}, invalid_seg_time_diff_threshold_sec)
-
-    await seg_service.delete_mapped(success_nums)
-
-    now = datetime.now()
-    await seg_service.set_seg_nx(seg(301))
-    await success_nums.set_num(301)
-    await seg_service.set_seg_nx(seg(302, created_at=now - timedelta(seconds=50)))
-    await success_nums.set_num(302)
-    await seg_service.set_seg_nx(seg(303, created_at=now - timedelta(seconds=200)))
-    await success_nums.set_num(303)
-
-    l = await success_nums.get_highest(use_master=True)
-
-    assert await validator.validate_segment(seg(304), l, success_nums) == ok()
-    assert await validator.validate_segment(seg(302), l, success_nums) == no()
-    assert await validator.validate_segment(seg(303), l, success_nums) == crit()
-    assert await validator.validate_segment(seg(102), l, success_nums) == crit()
-
-    await seg_service.delete_mapped(success_nums)
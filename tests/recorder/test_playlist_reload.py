@@ -0,0 +1,16 @@
+from recnode.recorder.stream.playlist_reload import PlaylistReloadPolicy
+
+
+def test_fixed():
+    policy = PlaylistReloadPolicy(adaptive=False, min_time_sec=1, changed_ratio=1, unchanged_ratio=0.5)
+    assert policy.wait_sec(0.25, 6, changed=True) == 0.75
+    assert policy.wait_sec(2, 6, changed=False) == 0
+
+
+def test_adaptive():
+    policy = PlaylistReloadPolicy(adaptive=True, min_time_sec=1, changed_ratio=1, unchanged_ratio=0.5)
+    assert policy.wait_sec(0.5, 6, changed=True) == 5.5
+    assert policy.wait_sec(0.5, 6, changed=False) == 2.5
+    assert policy.wait_sec(0.5, 1, changed=False) == 0
+    # without EXT-X-TARGETDURATION it falls back to the fixed interval
+    assert policy.wait_sec(0.5, None, changed=True) == 0.5
@@ -0,0 +1,85 @@
+import asyncio
+
+import pytest
+
+from recnode.recorder.manager.segment_scheduler import SegmentScheduler, MAX_WAITERS_PER_RECORDING
+
+
+@pytest.mark.asyncio
+async def test_unlimited():
+    scheduler = SegmentScheduler(None)
+    assert await scheduler.acquire("a", [1.0, 2.0, 3.0]) == 3
+    scheduler.release("a", 3)
+    assert scheduler.get_stats()["in_use"] == 0
+
+
+@pytest.mark.asyncio
+async def test_fair_share():
+    scheduler = SegmentScheduler(4)
+    assert await scheduler.acquire("a", [1.0] * 10) == 4
+
+    waiter_a = asyncio.create_task(scheduler.acquire("a", [1.0] * 6))
+    waiter_b = asyncio.create_task(scheduler.acquire("b", [2.0] * 6))
+    await asyncio.sleep(0)
+    scheduler.release("a", 2)
+
+    # "b" has nothing in flight, so it is served first with its fair share
+    assert await waiter_b == 2
+    assert not waiter_a.done()
+    scheduler.release("a", 2)
+    assert await waiter_a == 2
+    assert scheduler.get_stats()["in_flight"] == {"a": 2, "b": 2}
+
+
+@pytest.mark.asyncio
+async def test_earliest_deadline_first():
+    scheduler = SegmentScheduler(1)
+    assert await scheduler.acquire("a", [1.0]) == 1
+    scheduler.release("a")
+
+    late = asyncio.create_task(scheduler.acquire("b", [9.0]))
+    await asyncio.sleep(0)
+    assert await late == 1
+    early = asyncio.create_task(scheduler.acquire("c", [1.0]))
+    later = asyncio.create_task(scheduler.acquire("d", [5.0]))
+    await asyncio.sleep(0)
+    scheduler.release("b")
+    assert await early == 1
+    assert not later.done()
+    scheduler.release("c")
+    assert await later == 1
+
+
+@pytest.mark.asyncio
+async def test_cancel_waiter():
+    scheduler = SegmentScheduler(1)
+    assert await scheduler.acquire("a", [1.0]) == 1
+    waiter = asyncio.create_task(scheduler.acquire("b", [1.0]))
+    await asyncio.sleep(0)
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    scheduler.release("a")
+    assert scheduler.get_stats() == {"capacity": 1, "in_use": 0, "waiting": 0, "in_flight": {}}
+
+
+@pytest.mark.asyncio
+async def test_waiter_cap():
+    scheduler = SegmentScheduler(1)
+    assert await scheduler.acquire("a", [1.0]) == 1
+    waiters = [asyncio.create_task(scheduler.acquire("a", [1.0])) for _ in range(MAX_WAITERS_PER_RECORDING)]
+    await asyncio.sleep(0)
+
+    # a recording cannot queue more waiters, but another recording can
+    assert await scheduler.acquire("a", [1.0]) == 0
+    other = asyncio.create_task(scheduler.acquire("b", [0.5]))
+    await asyncio.sleep(0)
+    assert scheduler.get_stats()["waiting"] == MAX_WAITERS_PER_RECORDING + 1
+
+    scheduler.release("a")
+    assert await other == 1
+    for waiter in waiters:
+        waiter.cancel()
+    await asyncio.gather(*waiters, return_exceptions=True)
+    scheduler.release("b")
+    assert scheduler.get_stats() == {"capacity": 1, "in_use": 0, "waiting": 0, "in_flight": {}}
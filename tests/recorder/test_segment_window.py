@@ -0,0 +1,47 @@
+from recnode.recorder.stream.segment_window import SegmentRetryPlanner, SegmentWindow, RetryAction, create_segment_window
+
+
+def test_window_expiry():
+    window = SegmentWindow(first_num=10, target_duration=2, now=100)
+    assert window.expires_at(10) == 102
+    assert window.expires_at(14) == 110
+    assert window.remaining_sec(9) == 0
+    assert window.remaining_sec(8) == -2
+
+
+def test_window_target_duration_fallback():
+    window = create_segment_window([1, 2, 3], [2.0, 1.5, 2.5], None)
+    assert window.target_duration == 2.5
+
+
+def test_retry_plan():
+    planner = SegmentRetryPlanner(max_parallel_limit=4, expire_grace_sec=1)
+    window = SegmentWindow(first_num=10, target_duration=2, now=100)
+
+    # urgent: full parallelism on every interval
+    assert planner.plan(10, window) == (RetryAction.RETRY, 4)
+    assert planner.plan(10, window) == (RetryAction.RETRY, 4)
+
+    # time to spare: fewer requests, at most once per target duration
+    assert planner.plan(17, window) == (RetryAction.RETRY, 1)
+    assert planner.plan(17, window) == (RetryAction.WAIT, 0)
+    assert planner.plan(17, SegmentWindow(first_num=11, target_duration=2, now=102)) == (RetryAction.RETRY, 2)
+
+    # left the window: within the grace it gets a single request, past it abandoned
+    assert planner.plan(9, window) == (RetryAction.RETRY, 1)
+    assert planner.plan(8, window) == (RetryAction.ABANDON, 0)
+
+
+def test_retry_plan_without_grace():
+    planner = SegmentRetryPlanner(max_parallel_limit=4, expire_grace_sec=0)
+    window = SegmentWindow(first_num=10, target_duration=2, now=100)
+    assert planner.plan(10, window) == (RetryAction.RETRY, 4)
+    assert planner.plan(9, window) == (RetryAction.ABANDON, 0)
+
+
+def test_retry_plan_retain():
+    planner = SegmentRetryPlanner(max_parallel_limit=2, expire_grace_sec=0)
+    window = SegmentWindow(first_num=10, target_duration=2, now=100)
+    assert planner.plan(20, window)[0] == RetryAction.RETRY
+    planner.retain(set())
+    assert planner.plan(20, window)[0] == RetryAction.RETRY
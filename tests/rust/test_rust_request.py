@@ -19,3 +19,52 @@ async def test_rust_request():
     assert status >= 200
     assert size > 0
     assert content is not None
+
+
+def test_invalid_timeout():
+    with pytest.raises(ValueError):
+        rust_request.HttpClient(timeout_sec=-1)  # type: ignore
+    client = rust_request.HttpClient()  # type: ignore
+    with pytest.raises(ValueError):
+        client.request_text("https://example.com", {}, float("nan"))
+    with pytest.raises(ValueError):
+        client.request_files([("https://example.com", "/tmp/x")], {}, timeout_sec=float("inf"))
+
+
+def test_parse_media_playlist():
+    text = "\n".join(
+        [
+            "#EXTM3U",
+            "#EXT-X-VERSION:6",
+            "#EXT-X-TARGETDURATION:2",
+            "#EXT-X-MEDIA-SEQUENCE:301",
+            '#EXT-X-MAP:URI="init.m4s",BYTERANGE="720@0"',
+            "#EXTINF:2.000,",
+            "301.m4s",
+            "#EXTINF:1.967,live",
+            "302.m4s",
+            "#EXT-X-DISCONTINUITY",
+            "#EXTINF:2.000,",
+            "303.m4s?token=abc",
+            "ignored_without_extinf.m4s",
+        ]
+    )
+
+    playlist = rust_request.parse_media_playlist(text)  # type: ignore
+    assert not playlist.is_master
+    assert not playlist.is_endlist
+    assert playlist.media_sequence == 301
+    assert playlist.target_duration == 2
+    assert playlist.map_uri == "init.m4s"
+    assert playlist.nums == [301, 302, 303]
+    assert playlist.uris == ["301.m4s", "302.m4s", "303.m4s?token=abc"]
+    assert playlist.durations == [2.0, 1.967, 2.0]
+
+    playlist = rust_request.parse_media_playlist(text + "\n#EXT-X-ENDLIST", 302)  # type: ignore
+    assert playlist.is_endlist
+    assert playlist.nums == [303]
+    assert playlist.map_uri == "init.m4s"
+
+    playlist = rust_request.parse_media_playlist("#EXTM3U\n#EXT-X-STREAM-INF:BANDWIDTH=1\nchunklist.m3u8")  # type: ignore
+    assert playlist.is_master
+    assert playlist.nums == []